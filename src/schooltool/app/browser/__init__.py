@@ -41,6 +41,7 @@ from schooltool.app.interfaces import IApplicationPreferences
 from schooltool.app.interfaces import ISchoolToolApplication
 from schooltool.skin.flourish.interfaces import IContentProviders, IPageBase
 from schooltool.person.interfaces import IPerson
+from schooltool.securitypolicy.policy import canAccessMany
 
 from schooltool.common import SchoolToolMessage as _
 
@@ -308,8 +309,9 @@ class FilterAccessible(PathAdapterUtil):
 
     def traverse(self, name, furtherPath=()):
         """XXX"""
-        return [item for item in self.context
-                if canAccess(item, name)]
+        items = list(self.context)
+        return [item for item, ok in zip(items, canAccessMany(items, name))
+                if ok]
 
 
 class SortedFilterAccessible(PathAdapterUtil):
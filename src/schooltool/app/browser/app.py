@@ -383,10 +383,12 @@ class RelationshipAddTableMixin(RelationshipButtonTableMixin):
     button_image = 'add-icon.png'
 
     def submitItems(self):
+        items = []
         for item in self.view.getAvailableItems():
             key = '%s.%s' % (self.button_prefix, self.view.getKey(item))
             if key in self.request:
-                self.view.add(removeSecurityProxy(item))
+                items.append(removeSecurityProxy(item))
+        self.view.addItems(items)
 
     def updateFormatter(self):
         ommit = self.view.getOmmitedItems()
@@ -454,13 +456,15 @@ class ResultsButton(flourish.viewlet.Viewlet):
         item_ids = self.request[self.token_key]
         if not isinstance(item_ids, list):
             item_ids = [item_ids]
-        changed = False
         relationship_view = self.manager.view
-        for item in self.view_items(relationship_view):
-            if relationship_view.getKey(item) in item_ids:
-                self.process_item(relationship_view, item)
-                changed = True
-        return changed
+        items = [item for item in self.view_items(relationship_view)
+                 if relationship_view.getKey(item) in item_ids]
+        self.process_items(relationship_view, items)
+        return bool(items)
+
+    def process_items(self, relationship_view, items):
+        for item in items:
+            self.process_item(relationship_view, item)
 
     def update(self):
         self.processSearchResults()
@@ -485,6 +489,10 @@ class AddAllResultsButton(ResultsButton):
     def process_item(self, relationship_view, item):
         relationship_view.add(removeSecurityProxy(item))
 
+    def process_items(self, relationship_view, items):
+        relationship_view.addItems(
+            [removeSecurityProxy(item) for item in items])
+
 
 class RemoveAllResultsButton(ResultsButton):
 
@@ -511,6 +519,10 @@ class EditRelationships(flourish.page.Page):
         if item not in collection:
             collection.add(item)
 
+    def addItems(self, items):
+        for item in items:
+            self.add(item)
+
     def remove(self, item):
         collection = removeSecurityProxy(self.getCollection())
         if item in collection:
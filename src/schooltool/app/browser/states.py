@@ -80,6 +80,11 @@ class EditTemporalRelationships(EditRelationships):
         active = state.active if state is not None else ACTIVE
         collection.on(date).relate(item, active, code)
 
+    def addItems(self, items, state=None, code=None, date=None):
+        collection = removeSecurityProxy(self.getCollection())
+        active = state.active if state is not None else ACTIVE
+        collection.on(date).relate_many(items, active, code)
+
     def remove(self, item, state=None, code=None, date=None):
         collection = removeSecurityProxy(self.getCollection())
         active = state.active if state is not None else INACTIVE
@@ -653,6 +658,11 @@ class TemporalAddAllResultsButton(TemporalResultsButton,
         item = removeSecurityProxy(item)
         relationship_view.add(item, self.state, self.state.code, self.date)
 
+    def process_items(self, relationship_view, items):
+        items = [removeSecurityProxy(item) for item in items]
+        relationship_view.addItems(
+            items, self.state, self.state.code, self.date)
+
 
 class TemporalRemoveAllResultsButton(TemporalResultsButton,
                                      RemoveAllResultsButton):
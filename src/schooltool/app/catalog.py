@@ -18,10 +18,20 @@
 """
 SchoolTool catalogs.
 """
+import hashlib
+import sys
+import threading
+import traceback
+
+import transaction
+import transaction.interfaces
+from ZODB.POSException import ConflictError
 from zope.interface import implementer, implements, implementsOnly
+from zope.interface import providedBy
 from zope.intid.interfaces import IIntIds, IIntIdAddedEvent, IIntIdRemovedEvent
 from zope.component import adapter, queryUtility, getUtility
-from zope.component.hooks import getSite
+from zope.component.hooks import getSite, setSite
+from zope.app.publication.zopepublication import ZopePublication
 from zope.container import btree
 from zope.container.contained import Contained
 from zope.lifecycleevent import IObjectModifiedEvent
@@ -35,19 +45,69 @@ from schooltool.app.interfaces import ICatalogStartUp
 from schooltool.app.interfaces import ICatalogs
 from schooltool.app.interfaces import IVersionedCatalog
 from schooltool.app.app import ActionBase
+from schooltool.common import LRUCache
 from schooltool.table.catalog import FilterImplementing
 
 
 APP_CATALOGS_KEY = 'schooltool.app.catalog:Catalogs'
 
+# Number of objects indexed per transaction by background rebuilds.
+REBUILD_CHUNK_SIZE = 1000
+
 
 class CatalogStartupBase(ActionBase):
     implementsOnly(ICatalogStartUp)
 
 
+# Keys of catalogs objects are routed to, by routing table version and
+# by what objects provide.
+route_cache = LRUCache(1000)
+
+
 class Catalogs(btree.BTreeContainer):
     implements(ICatalogs)
 
+    # Pairs of catalog keys and interfaces of objects they hold (None
+    # for any object), compiled at startup.
+    routes = None
+    routes_version = None
+
+    def __setitem__(self, key, value):
+        super(Catalogs, self).__setitem__(key, value)
+        self.routes = None
+
+    def __delitem__(self, key):
+        super(Catalogs, self).__delitem__(key)
+        self.routes = None
+
+    def compileRoutes(self):
+        routes = []
+        signature = []
+        for key, entry in self.items():
+            interface = catalogInterface(entry.catalog)
+            routes.append((key, interface))
+            signature.append((key, entry.version, interface and
+                              interface.__identifier__))
+        # The version is derived from the catalogs, so compiling the
+        # same routes on every startup does not write to the database.
+        version = hashlib.sha1(repr(signature)).hexdigest()
+        if self.routes is None or version != self.routes_version:
+            self.routes = tuple(routes)
+            self.routes_version = version
+
+    def route(self, obj):
+        if self.routes is None:
+            return [key for key, entry in self.items()
+                    if accepts(entry.catalog, obj)]
+        spec = providedBy(obj)
+        cache_key = self.routes_version, spec
+        keys = route_cache.get(cache_key)
+        if keys is None:
+            keys = route_cache[cache_key] = tuple([
+                key for key, interface in self.routes
+                if interface is None or spec.isOrExtends(interface)])
+        return keys
+
 
 @adapter(ISchoolToolApplication)
 @implementer(ICatalogs)
@@ -64,6 +124,12 @@ class VersionedCatalog(Contained):
     version = 0
     catalog = None
 
+    # Set while the catalog is populated in the background.  cursor is
+    # the last intid indexed, so that the rebuild resumes after a restart.
+    rebuilding = False
+    cursor = None
+    indexed = 0
+
     def __init__(self, catalog, version):
         self.catalog = catalog
         self.catalog.__parent__ = self
@@ -74,6 +140,30 @@ class VersionedCatalog(Contained):
         return '<%s v. %r>: %s' % (
             self.__class__.__name__, self.version, self.catalog)
 
+    def rebuild(self, int_ids, count):
+        """Index up to count objects following the cursor.
+
+        Returns True when all objects got indexed.
+        """
+        refs = int_ids.refs
+        if self.cursor is None:
+            uids = refs.keys()
+        else:
+            uids = refs.keys(min=self.cursor, excludemin=True)
+        n = 0
+        for uid in uids:
+            if n == count:
+                return False
+            obj = refs[uid]()
+            if accepts(self.catalog, obj):
+                self.catalog.index_doc(uid, obj)
+            self.cursor = uid
+            self.indexed += 1
+            n += 1
+        self.rebuilding = False
+        self.cursor = None
+        return True
+
 
 class PrepareCatalogContainer(CatalogStartupBase):
 
@@ -92,6 +182,14 @@ class ExpiredCatalogCleanup(CatalogStartupBase):
                 del catalogs[key]
 
 
+class CompileCatalogRoutes(CatalogStartupBase):
+
+    after = ('expired-catalog-cleanup', )
+
+    def __call__(self):
+        ICatalogs(self.app).compileRoutes()
+
+
 class CatalogFactory(CatalogStartupBase):
 
     after = ('prepare-catalog-container', )
@@ -99,12 +197,18 @@ class CatalogFactory(CatalogStartupBase):
 
     version = u''
 
+    # Populate a catalog replaced because of a version change in the
+    # background, see CatalogRebuildThread.  Only for catalogs whose
+    # users can do without it until it is ready.
+    background_rebuild = False
+
     @classmethod
     def key(cls):
         return u'catalog:%s.%s' % (cls.__module__, cls.__name__)
 
     @classmethod
     def get(cls, ignored=None):
+        flushIndexingQueue()
         app = getSite()
         catalogs = app[APP_CATALOGS_KEY]
         versioned = catalogs[cls.key()]
@@ -125,17 +229,29 @@ class CatalogFactory(CatalogStartupBase):
         key = self.key()
         version = self.getVersion()
 
+        stale = False
         if key in catalogs:
             if catalogs[key].version == version:
                 catalogs[key].expired = False
             else:
                 del catalogs[key]
+                stale = True
 
         if key not in catalogs:
             catalog = self.createCatalog()
-            catalogs[key] = VersionedCatalog(catalog, version)
-            # XXX: if setIndexes throw, delete the catalog and rethrow
-            self.setIndexes(catalog)
+            versioned = catalogs[key] = VersionedCatalog(catalog, version)
+            if (stale and self.background_rebuild and
+                isinstance(catalog, extentcatalog.Catalog)):
+                versioned.rebuilding = True
+                # Do not let new indexes index all objects right away.
+                catalog.UIDSource = ()
+                try:
+                    self.setIndexes(catalog)
+                finally:
+                    catalog.UIDSource = None
+            else:
+                # XXX: if setIndexes throw, delete the catalog and rethrow
+                self.setIndexes(catalog)
 
 
 class CatalogImplementing(CatalogFactory):
@@ -170,6 +286,151 @@ class AttributeCatalog(CatalogImplementing):
             catalog[name] = catalogindex.ValueIndex(name)
 
 
+class IndexingQueueSavepoint(object):
+    """Restores the queued operations when a savepoint is rolled back."""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.pending = dict(queue.pending)
+
+    def rollback(self):
+        self.queue.pending = dict(self.pending)
+
+
+class IndexingQueueDataManager(object):
+    """Takes part in the transaction on behalf of the indexing queue.
+
+    Nothing is committed by it, operations are applied to catalogs by
+    a before commit hook.
+    """
+    implements(transaction.interfaces.ISavepointDataManager)
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    @property
+    def transaction_manager(self):
+        return transaction.manager
+
+    def abort(self, transaction):
+        self.queue.clear()
+
+    def savepoint(self):
+        return IndexingQueueSavepoint(self.queue)
+
+    # TPC protocol: tpc_begin commit tpc_vote (tpc_finish | tpc_abort)
+
+    def tpc_begin(self, transaction):
+        pass
+
+    def commit(self, transaction):
+        pass
+
+    def tpc_vote(self, transaction):
+        pass
+
+    def tpc_finish(self, transaction):
+        self.queue.clear()
+
+    def tpc_abort(self, transaction):
+        self.queue.clear()
+
+    def sortKey(self):
+        return '~schooltool:%s:%s' % (
+            self.__class__.__name__, id(self))
+
+
+class IndexingQueue(threading.local):
+    """Catalog operations of the current transaction.
+
+    Operations are coalesced per intid: an object modified several
+    times gets indexed once, an object removed is only unindexed.
+    Objects are only offered to catalogs they are routed to, see
+    Catalogs.route.
+    The queue is flushed before the transaction commits and whenever
+    a catalog is looked up, so searches see changes made so far.
+    It joins the transaction, so operations queued after a savepoint
+    are dropped when the savepoint is rolled back.
+    """
+
+    def __init__(self):
+        self.transaction = None
+        self.pending = {}
+        self.hooked = False
+
+    def _join(self):
+        current = transaction.get()
+        if self.transaction is not current:
+            self.transaction = current
+            self.pending = {}
+            self.hooked = False
+            current.join(IndexingQueueDataManager(self))
+        if not self.hooked:
+            # Operations may be queued by before commit hooks that run
+            # after the flush, these need another one.
+            self.hooked = True
+            current.addBeforeCommitHook(self._beforeCommit)
+
+    def _beforeCommit(self):
+        self.hooked = False
+        self.flush()
+
+    def index(self, catalogs, obj_id, obj):
+        self._join()
+        self.pending[obj_id] = catalogs, obj, False
+
+    def unindex(self, catalogs, obj_id, obj):
+        self._join()
+        self.pending[obj_id] = catalogs, obj, True
+
+    def flush(self):
+        if self.transaction is not transaction.get():
+            # Left over from a transaction that was aborted.
+            self.transaction = None
+            self.pending = {}
+            return
+        while self.pending:
+            obj_id, (catalogs, obj, removed) = self.pending.popitem()
+            for key in catalogs.route(obj):
+                catalog = catalogs[key].catalog
+                if removed:
+                    catalog.unindex_doc(obj_id)
+                else:
+                    catalog.index_doc(obj_id, obj)
+
+    def clear(self):
+        self.transaction = None
+        self.pending = {}
+        self.hooked = False
+
+
+indexing_queue = IndexingQueue()
+
+
+def catalogInterface(catalog):
+    """Return the interface of objects a catalog holds, or None."""
+    extent_filter = getattr(getattr(catalog, 'extent', None), 'filter', None)
+    if isinstance(extent_filter, FilterImplementing):
+        return extent_filter.interface
+    return None
+
+
+def accepts(catalog, obj):
+    """Tell whether obj may belong to the catalog.
+
+    Catalogs of objects implementing an interface are skipped without
+    running their extent filter.
+    """
+    interface = catalogInterface(catalog)
+    return interface is None or interface.providedBy(obj)
+
+
+def flushIndexingQueue():
+    """Apply catalog operations queued in the current transaction."""
+    if indexing_queue.pending:
+        indexing_queue.flush()
+
+
 @adapter(IIntIdAddedEvent)
 def indexDocSubscriber(event):
     app = ISchoolToolApplication(None, None)
@@ -178,9 +439,7 @@ def indexDocSubscriber(event):
     obj = removeSecurityProxy(event.object)
     util = getUtility(IIntIds, context=app)
     obj_id = util.getId(obj)
-    catalogs = ICatalogs(app)
-    for entry in catalogs.values():
-        entry.catalog.index_doc(obj_id, obj)
+    indexing_queue.index(ICatalogs(app), obj_id, obj)
 
 
 @adapter(IObjectModifiedEvent)
@@ -198,8 +457,7 @@ def reindexDocSubscriber(event):
     catalogs = ICatalogs(app)
     if obj is catalogs:
         return
-    for entry in catalogs.values():
-        entry.catalog.index_doc(obj_id, obj)
+    indexing_queue.index(catalogs, obj_id, obj)
 
 
 @adapter(IIntIdRemovedEvent)
@@ -212,9 +470,78 @@ def unindexDocSubscriber(event):
     obj_id = util.queryId(obj)
     if obj_id is None:
         return
-    catalogs = ICatalogs(app)
-    for entry in catalogs.values():
-        entry.catalog.unindex_doc(obj_id)
+    indexing_queue.unindex(ICatalogs(app), obj_id, obj)
+
+
+def rebuildCatalogs(app, count=REBUILD_CHUNK_SIZE):
+    """Index the next objects into catalogs being rebuilt.
+
+    Returns True when some catalogs still need rebuilding.
+    """
+    int_ids = getUtility(IIntIds, context=app)
+    remaining = False
+    for entry in ICatalogs(app).values():
+        if entry.rebuilding and not entry.rebuild(int_ids, count):
+            remaining = True
+    return remaining
+
+
+class CatalogRebuildThread(threading.Thread):
+    """Rebuild catalogs in chunks, committing after every chunk."""
+
+    daemon = True
+
+    def __init__(self, db, count=REBUILD_CHUNK_SIZE):
+        super(CatalogRebuildThread, self).__init__(
+            name='schooltool-catalog-rebuild')
+        self.db = db
+        self.count = count
+
+    def step(self):
+        """Rebuild the next chunk, return True if there is more to do."""
+        connection = self.db.open()
+        old_site = getSite()
+        try:
+            app = connection.root()[ZopePublication.root_name]
+            setSite(app)
+            remaining = rebuildCatalogs(app, self.count)
+            transaction.commit()
+            return remaining
+        except ConflictError:
+            transaction.abort()
+            return True
+        finally:
+            setSite(old_site)
+            connection.close()
+
+    def run(self):
+        try:
+            while self.step():
+                pass
+        except Exception:
+            transaction.abort()
+            print >> sys.stderr, "Failed to rebuild catalogs:"
+            traceback.print_exc()
+
+
+def startCatalogRebuild(db):
+    """Start rebuilding catalogs in the background if needed.
+
+    Returns the thread started, or None.
+    """
+    connection = db.open()
+    try:
+        app = connection.root().get(ZopePublication.root_name)
+        catalogs = app is not None and app.get(APP_CATALOGS_KEY)
+        if not catalogs or not [entry for entry in catalogs.values()
+                                if entry.rebuilding]:
+            return None
+    finally:
+        transaction.abort()
+        connection.close()
+    thread = CatalogRebuildThread(db)
+    thread.start()
+    return thread
 
 
 def appendGlobbing(text):
@@ -254,6 +254,12 @@ class ICatalogs(IContainer):
 
     contains(IVersionedCatalog)
 
+    def compileRoutes():
+        """Compile the table routing objects to catalogs by interface."""
+
+    def route(obj):
+        """Return keys of catalogs obj should be indexed in."""
+
 
 class IRequestHelpers(Interface):
     """Easy access to common ST utils."""
@@ -62,6 +62,7 @@ from schooltool.app.interfaces import ICatalogStartUp
 from schooltool.app.interfaces import ISchoolToolInitializationUtility
 from schooltool.app.app import SchoolToolApplication
 from schooltool.app.app import getApplicationPreferences
+from schooltool.app.catalog import startCatalogRebuild
 from schooltool.app import pdf
 from schooltool.person.interfaces import IPersonFactory
 from schooltool.app.interfaces import ICookieLanguageSelector
@@ -502,6 +503,12 @@ class SchoolToolMachinery(object):
             site_zcml=options.config.site_definition)
         setLanguage(options.config.lang)
         self.configureReportlab(options.config.reportlab_fontdir)
+        self.configurePermissionCache(options.config.permission_cache_ttl)
+
+    def configurePermissionCache(self, ttl):
+        """Turn on the cross request permission cache if ttl is set."""
+        from schooltool.securitypolicy.policy import decision_cache
+        decision_cache.configure(ttl=ttl)
 
 
 class SchoolToolServer(SchoolToolMachinery):
@@ -706,6 +713,7 @@ class SchoolToolServer(SchoolToolMachinery):
         #    return db
 
         self.startApplication(db)
+        startCatalogRebuild(db)
 
         provideUtility(db, IDatabase)
         db.setActivityMonitor(ActivityMonitor())
@@ -102,12 +102,21 @@ That's all.
 
 """
 
-from zope.component import adapts
-
+from BTrees.IFBTree import IFTreeSet
+from BTrees.IOBTree import IOBTree
+from BTrees.Length import Length
+from persistent import Persistent
+from zope.annotation.interfaces import IAnnotations
+from zope.component import adapts, queryUtility
+from zope.intid.interfaces import IIntIds
+
+from schooltool.app.interfaces import ISchoolToolApplication
 from schooltool.relationship import URIObject, RelationshipSchema
 from schooltool.relationship.temporal import TemporalURIObject
 from schooltool.relationship import getRelatedObjects
 from schooltool.relationship.interfaces import IBeforeRelationshipEvent
+from schooltool.relationship.interfaces import IRelationshipAddedEvent
+from schooltool.relationship.interfaces import IRelationshipRemovedEvent
 from schooltool.relationship.interfaces import InvalidRelationship
 from schooltool.resource.interfaces import IBaseResource
 from schooltool.group.interfaces import IBaseGroup as IGroup
@@ -193,9 +202,23 @@ def isTransitiveMember(obj, group):
         >>> isTransitiveMember(a, d)
         False
 
+    Only memberships that are active today count.  The membership
+    closure, which keeps memberships in any state, answers most
+    questions with a single lookup: if `obj` is not a member of `group`
+    in any state, it is not an active member either.  Otherwise the
+    active memberships are walked.
+
     """
     if obj is group:
         return True
+    closure = queryMembershipClosure()
+    if closure is not None:
+        int_ids = queryUtility(IIntIds)
+        obj_id = int_ids.queryId(obj)
+        group_id = int_ids.queryId(group)
+        if (obj_id is not None and group_id is not None and
+            not closure.isTransitiveMember(obj_id, group_id)):
+            return False
     # A group usually has more members than a member has groups, so we will
     # find all transitive groups of `obj` and see whether `group` is one of
     # them.  It does not matter if we use breadth-first or depth-first search.
@@ -212,6 +235,172 @@ def isTransitiveMember(obj, group):
     return False
 
 
+MEMBERSHIP_CLOSURE_KEY = 'schooltool.app.membership.MembershipClosure'
+
+
+class MembershipClosure(Persistent):
+    """Transitive group membership of objects.
+
+    Objects are identified by their int ids.  All membership links are
+    taken into account, regardless of their temporal state.
+
+        >>> closure = MembershipClosure()
+        >>> closure.addMembership(1, 10)
+        >>> closure.addMembership(10, 20)
+        >>> closure.addMembership(2, 20)
+        >>> sorted(closure.getGroups(1))
+        [10, 20]
+        >>> closure.isTransitiveMember(1, 20), closure.isTransitiveMember(2, 10)
+        (True, False)
+
+        >>> closure.removeMembership(10, 20)
+        >>> sorted(closure.getGroups(1))
+        [10]
+        >>> closure.isTransitiveMember(1, 20)
+        False
+
+    The generation counts membership changes, so that caches derived
+    from membership can tell when they are stale:
+
+        >>> closure.getGeneration()
+        0
+        >>> closure.changed()
+        >>> closure.getGeneration()
+        1
+
+    """
+
+    generation = None
+
+    def __init__(self):
+        self.groups = IOBTree()
+        self.members = IOBTree()
+        self.closure = IOBTree()
+        self.generation = Length()
+
+    def getGeneration(self):
+        if self.generation is None:
+            return 0
+        return self.generation()
+
+    def changed(self):
+        """Count a change of membership."""
+        if self.generation is None:
+            self.generation = Length()
+        self.generation.change(1)
+
+    def _link(self, mapping, key, value):
+        values = mapping.get(key)
+        if values is None:
+            values = mapping[key] = IFTreeSet()
+        values.insert(value)
+
+    def _unlink(self, mapping, key, value):
+        values = mapping.get(key)
+        if values is not None and value in values:
+            values.remove(value)
+            if not values:
+                del mapping[key]
+
+    def _descendants(self, obj_id):
+        result = [obj_id]
+        seen = set(result)
+        for cur_id in result:
+            for member_id in self.members.get(cur_id, ()):
+                if member_id not in seen:
+                    seen.add(member_id)
+                    result.append(member_id)
+        return result
+
+    def _computeGroups(self, obj_id):
+        result = set()
+        queue = list(self.groups.get(obj_id, ()))
+        while queue:
+            group_id = queue.pop()
+            if group_id not in result:
+                result.add(group_id)
+                queue.extend(self.groups.get(group_id, ()))
+        return result
+
+    def addMembership(self, member_id, group_id):
+        self._link(self.groups, member_id, group_id)
+        self._link(self.members, group_id, member_id)
+        added = [group_id] + list(self.closure.get(group_id, ()))
+        for obj_id in self._descendants(member_id):
+            for ancestor_id in added:
+                self._link(self.closure, obj_id, ancestor_id)
+
+    def removeMembership(self, member_id, group_id):
+        self._unlink(self.groups, member_id, group_id)
+        self._unlink(self.members, group_id, member_id)
+        for obj_id in self._descendants(member_id):
+            groups = self._computeGroups(obj_id)
+            if groups:
+                self.closure[obj_id] = IFTreeSet(sorted(groups))
+            elif obj_id in self.closure:
+                del self.closure[obj_id]
+
+    def getGroups(self, obj_id):
+        """Return int ids of all groups the object transitively belongs to."""
+        return self.closure.get(obj_id, IFTreeSet())
+
+    def isTransitiveMember(self, obj_id, group_id):
+        return group_id in self.closure.get(obj_id, ())
+
+    def clear(self):
+        self.groups.clear()
+        self.members.clear()
+        self.closure.clear()
+        self.changed()
+
+
+def queryMembershipClosure(app=None):
+    """Return the membership closure of the application, or None."""
+    if app is None:
+        app = ISchoolToolApplication(None, None)
+        if app is None:
+            return None
+    annotations = IAnnotations(app, None)
+    if annotations is None:
+        return None
+    return annotations.get(MEMBERSHIP_CLOSURE_KEY)
+
+
+def updateMembershipClosure(event):
+    """Keep the membership closure up to date.
+
+    Subscriber of IRelationshipAddedEvent and IRelationshipRemovedEvent.
+    """
+    if event.rel_type != URIMembership:
+        return
+    closure = queryMembershipClosure()
+    if closure is None:
+        return
+    closure.changed()
+    int_ids = queryUtility(IIntIds)
+    member_id = int_ids.queryId(event[URIMember])
+    group_id = int_ids.queryId(event[URIGroup])
+    if member_id is None or group_id is None:
+        return
+    if IRelationshipAddedEvent.providedBy(event):
+        closure.addMembership(member_id, group_id)
+    elif IRelationshipRemovedEvent.providedBy(event):
+        closure.removeMembership(member_id, group_id)
+
+
+def countMembershipStateChange(event):
+    """Count a change of the state of a membership link.
+
+    Subscriber of ILinkStateModifiedEvent.  The closure keeps links
+    in any state, but caches of current memberships become stale.
+    """
+    if getattr(event.link, 'rel_type', None) != URIMembership:
+        return
+    closure = queryMembershipClosure()
+    if closure is not None:
+        closure.changed()
+
+
 class GroupMemberCrowd(Crowd):
     """Crowd that contains all the members of the group.
 
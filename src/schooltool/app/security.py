@@ -19,6 +19,7 @@
 SchoolTool security infrastructure
 """
 
+import datetime
 import urllib
 
 from persistent import Persistent
@@ -47,10 +48,13 @@ from schooltool.person.interfaces import IPerson
 from schooltool.app.interfaces import ISchoolToolAuthenticationPlugin
 from schooltool.app.interfaces import ICalendarParentCrowd
 from schooltool.securitypolicy.interfaces import ICrowdDescription
+from schooltool.term.interfaces import IDateManager
 from schooltool.securitypolicy.crowds import Crowd, Description
 from schooltool.securitypolicy.crowds import ManagerGroupCrowd
 # XXX: move ConfigurableCrowd here
 from schooltool.securitypolicy.crowds import ConfigurableCrowd, ParentCrowd
+from schooltool.common import LRUCache
+from schooltool.person.credentials import compare_digest, is_legacy_record
 
 from schooltool.common import SchoolToolMessage as _
 
@@ -70,6 +74,50 @@ class Principal(Contained):
             return self._person
 
 
+# Group principal ids of persons, keyed by database, application,
+# username, membership generation and date.  Other processes do not
+# tell this one about renamed groups, so ids expire after a while.
+PRINCIPAL_CACHE_TTL = 300
+principal_cache = LRUCache(maxsize=1000, ttl=PRINCIPAL_CACHE_TTL)
+
+
+def principalCacheKey(app, username):
+    """Return the principal cache key, or None if it can not be cached.
+
+    Principals are only cached while the application keeps a
+    membership closure, whose generation tells when memberships
+    changed, and not while memberships are changed in this transaction.
+    Groups of persons are filtered by date, so the date is a part of
+    the key too.
+    """
+    # avoid circular imports
+    from schooltool.app.membership import queryMembershipClosure
+    closure = queryMembershipClosure(app)
+    jar = getattr(app, '_p_jar', None)
+    if closure is None or jar is None:
+        return None
+    if closure.generation is not None and closure.generation._p_changed:
+        return None
+    dateman = queryUtility(IDateManager)
+    if dateman is not None:
+        today = dateman.today
+    else:
+        today = datetime.date.today()
+    return (id(jar.db()), app._p_oid, username, closure.getGeneration(),
+            today)
+
+
+def invalidatePrincipalCache(person, event=None):
+    """Forget the cached principal of a person."""
+    username = getattr(person, 'username', None)
+    principal_cache.invalidate(lambda key: key[2] == username)
+
+
+def clearPrincipalCache(*args):
+    """Forget all cached principals."""
+    principal_cache.clear()
+
+
 class PersonContainerAuthenticationPlugin(object):
     implements(ISchoolToolAuthenticationPlugin)
 
@@ -83,7 +131,12 @@ class PersonContainerAuthenticationPlugin(object):
         Retrieves the username and password from the session.
         """
         session = ISession(request)[self.session_name]
-        if 'username' in session and 'password' in session:
+        if 'token' in session:
+            username = self._checkToken(session['token'])
+            if username is not None:
+                self.restorePOSTData(request)
+                return self.getPrincipal('sb.person.' + username)
+        elif 'username' in session and 'password' in session:
             if self._checkHashedPassword(session['username'], session['password']):
                 self.restorePOSTData(request)
                 return self.getPrincipal('sb.person.' + session['username'])
@@ -95,8 +148,24 @@ class PersonContainerAuthenticationPlugin(object):
             if self._checkPlainTextPassword(login, creds.getPassword()):
                 return self.getPrincipal('sb.person.' + login)
 
+    def _checkToken(self, token):
+        """Return the username of a signed session token, or None."""
+        app = ISchoolToolApplication(None)
+        credentials = getattr(app['persons'], 'credentials', None)
+        if credentials is None:
+            return None
+        return credentials.checkToken(token)
+
     def _checkPlainTextPassword(self, username, password):
         app = ISchoolToolApplication(None)
+        credentials = getattr(app['persons'], 'credentials', None)
+        if credentials is not None:
+            if not credentials.check(username, password):
+                return False
+            if is_legacy_record(credentials.get(username)):
+                # Rehash passwords of older versions with a salt.
+                app['persons'][username].setPassword(password)
+            return True
         if username in app['persons']:
             person = app['persons'][username]
             return person.checkPassword(password)
@@ -106,7 +175,8 @@ class PersonContainerAuthenticationPlugin(object):
         if username in app['persons']:
             person = app['persons'][username]
             return (person._hashed_password is not None
-                    and password == person._hashed_password)
+                    and password is not None
+                    and compare_digest(password, person._hashed_password))
 
     def unauthenticatedPrincipal(self):
         """Return the unauthenticated principal, if one is defined."""
@@ -168,11 +238,18 @@ class PersonContainerAuthenticationPlugin(object):
             username = id[len(self.person_prefix):]
             if username in app['persons']:
                 person = app['persons'][username]
+                key = principalCacheKey(app, username)
+                group_ids = None
+                if key is not None:
+                    group_ids = principal_cache.get(key)
+                if group_ids is None:
+                    group_ids = tuple([self.group_prefix + group.__name__
+                                       for group in person.groups])
+                    if key is not None:
+                        principal_cache[key] = group_ids
                 principal = Principal(id, person.title,
                                       person=ProxyFactory(person))
-                for group in person.groups:
-                    group_principal_id = self.group_prefix + group.__name__
-                    principal.groups.append(group_principal_id)
+                principal.groups.extend(group_ids)
                 authenticated = queryUtility(IAuthenticatedGroup)
                 if authenticated:
                     principal.groups.append(authenticated.id)
@@ -183,21 +260,26 @@ class PersonContainerAuthenticationPlugin(object):
         return None
 
     def setCredentials(self, request, username, password):
-        # avoid circular imports
-        from schooltool.person.person import hash_password
         if not self._checkPlainTextPassword(username, password):
             raise ValueError('bad credentials')
+        persons = ISchoolToolApplication(None)['persons']
+        person = persons[username]
+        if is_legacy_record(person._hashed_password):
+            # Rehash passwords of older versions with a salt.
+            person.setPassword(password)
         session = ISession(request)[self.session_name]
         session['username'] = username
-        session['password'] = hash_password(password)
+        credentials = getattr(persons, 'credentials', None)
+        if credentials is not None:
+            session['token'] = credentials.makeToken(username)
+        else:
+            session['password'] = person._hashed_password
 
     def clearCredentials(self, request):
         session = ISession(request)[self.session_name]
-        try:
-            del session['password']
-            del session['username']
-        except KeyError:
-            pass
+        for key in ['token', 'password', 'username']:
+            if key in session:
+                del session[key]
 
 
 class SchoolToolAuthenticationUtility(Persistent, Contained):
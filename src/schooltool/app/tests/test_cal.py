@@ -357,6 +357,91 @@ def doctest_Calendar_addEvent_resource_booking():
     """
 
 
+def doctest_Calendar_expand():
+    """Tests for Calendar.expand.
+
+    Calendar keeps an index of events by weeks they span, so that
+    expansion only touches events that may fall into the given period.
+
+        >>> from pytz import utc
+        >>> from schooltool.app.cal import Calendar, CalendarEvent
+        >>> from schooltool.calendar.recurrent import WeeklyRecurrenceRule
+        >>> cal = Calendar(None)
+
+        >>> def event(title, day, duration=1, **kw):
+        ...     return CalendarEvent(datetime(2005, 2, day, 10, tzinfo=utc),
+        ...                          timedelta(days=duration), title,
+        ...                          unique_id=title, **kw)
+        >>> cal.addEvent(event('Monday', 7))
+        >>> cal.addEvent(event('Long', 10, duration=10))
+        >>> cal.addEvent(event('Later', 24))
+        >>> cal.addEvent(event('Weekly', 1,
+        ...                    recurrence=WeeklyRecurrenceRule()))
+
+        >>> def print_index(cal):
+        ...     for week, unique_ids in cal._events_by_week.items():
+        ...         print week, list(unique_ids)
+        ...     print 'recurrent', list(cal._recurrent_events)
+
+        >>> print_index(cal)
+        2005-02-07 ['Long', 'Monday']
+        2005-02-14 ['Long']
+        2005-02-21 ['Later']
+        recurrent ['Weekly']
+
+        >>> def print_expanded(first, last):
+        ...     first = datetime(2005, 2, first, tzinfo=utc)
+        ...     last = datetime(2005, 2, last, tzinfo=utc)
+        ...     for e in sorted(cal.expand(first, last)):
+        ...         print e.dtstart.strftime('%m-%d'), e.title
+        ...     print 'looked at', sorted(
+        ...         [e.title for e in cal.iterEventsInRange(first, last)])
+
+        >>> print_expanded(14, 20)
+        02-10 Long
+        02-15 Weekly
+        looked at ['Long', 'Weekly']
+
+        >>> print_expanded(22, 28)
+        02-22 Weekly
+        02-24 Later
+        looked at ['Later', 'Weekly']
+
+    Index follows changes of events.
+
+        >>> monday = cal.find('Monday')
+        >>> monday.dtstart = datetime(2005, 2, 27, 23, tzinfo=utc)
+        >>> print_index(cal)
+        2005-02-07 ['Long']
+        2005-02-14 ['Long']
+        2005-02-21 ['Later', 'Monday']
+        2005-02-28 ['Monday']
+        recurrent ['Weekly']
+
+        >>> cal.find('Later').recurrence = WeeklyRecurrenceRule()
+        >>> cal.removeEvent(cal.find('Long'))
+        >>> print_index(cal)
+        2005-02-21 ['Monday']
+        2005-02-28 ['Monday']
+        recurrent ['Later', 'Weekly']
+
+    Calendars stored before the index was introduced expand all events
+    until the index is built.
+
+        >>> cal._events_by_week = cal._recurrent_events = None
+        >>> print_expanded(14, 20)
+        02-15 Weekly
+        looked at ['Later', 'Monday', 'Weekly']
+
+        >>> cal.rebuildIndex()
+        >>> print_index(cal)
+        2005-02-21 ['Monday']
+        2005-02-28 ['Monday']
+        recurrent ['Later', 'Weekly']
+
+    """
+
+
 def doctest_WriteCalendar():
     r"""Tests for WriteCalendar.
 
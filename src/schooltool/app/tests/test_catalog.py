@@ -23,7 +23,7 @@ import doctest
 from transaction import abort
 
 from zope.app.testing import setup
-from zope.interface import implements, Interface
+from zope.interface import implements, Interface, providedBy
 from zope.interface.verify import verifyObject
 from zope.component import provideAdapter
 from zope.component.hooks import getSite
@@ -160,6 +160,97 @@ def doctest_ExpiredCatalogCleanup():
     """
 
 
+def doctest_Catalogs_route():
+    """Tests for routing objects to catalogs by interface.
+
+        >>> from zc.catalog import extentcatalog
+        >>> from zope.interface import alsoProvides
+        >>> from schooltool.app.catalog import VersionedCatalog
+        >>> from schooltool.table.catalog import FilterImplementing
+
+        >>> class IFoo(Interface):
+        ...     pass
+        >>> class ISpecialFoo(IFoo):
+        ...     pass
+        >>> class IBar(Interface):
+        ...     pass
+
+        >>> def implementing(interface):
+        ...     return VersionedCatalog(extentcatalog.Catalog(
+        ...         extentcatalog.FilterExtent(FilterImplementing(interface))),
+        ...         'v1')
+
+        >>> app = provideApplicationStub()
+        >>> catalogs = ICatalogs(app)
+        >>> catalogs['foo'] = implementing(IFoo)
+        >>> catalogs['bar'] = implementing(IBar)
+        >>> catalogs['any'] = VersionedCatalog(CatalogStub('any'), 'v1')
+
+        >>> class Thing(object):
+        ...     pass
+        >>> foo, bar, thing = Thing(), Thing(), Thing()
+        >>> alsoProvides(foo, ISpecialFoo)
+        >>> alsoProvides(bar, IBar)
+
+    Until the routes are compiled, catalogs are checked one by one.
+
+        >>> print catalogs.routes
+        None
+        >>> sorted(catalogs.route(foo))
+        [u'any', u'foo']
+
+    Catalog startup compiles the routing table, after stale catalogs
+    are removed.
+
+        >>> from schooltool.app.catalog import CompileCatalogRoutes
+        >>> action = CompileCatalogRoutes(app)
+        >>> action.after
+        ('expired-catalog-cleanup',)
+        >>> action()
+
+        >>> sorted(catalogs.routes)
+        [(u'any', None),
+         (u'bar', <InterfaceClass schooltool.app.tests.test_catalog.IBar>),
+         (u'foo', <InterfaceClass schooltool.app.tests.test_catalog.IFoo>)]
+
+        >>> sorted(catalogs.route(foo))
+        [u'any', u'foo']
+        >>> sorted(catalogs.route(bar))
+        [u'any', u'bar']
+        >>> sorted(catalogs.route(thing))
+        [u'any']
+
+    Routes are remembered for what objects provide.
+
+        >>> from schooltool.app.catalog import route_cache
+        >>> route_cache.get((catalogs.routes_version, providedBy(thing)))
+        (u'any',)
+
+    Compiling the same routes again, as every startup does, keeps the
+    routing table and its version, so nothing is written:
+
+        >>> routes, version = catalogs.routes, catalogs.routes_version
+        >>> catalogs.compileRoutes()
+        >>> catalogs.routes is routes, catalogs.routes_version == version
+        (True, True)
+
+    Adding or removing catalogs drops the table.
+
+        >>> del catalogs['any']
+        >>> print catalogs.routes
+        None
+        >>> sorted(catalogs.route(foo))
+        [u'foo']
+
+    Routes of different catalogs get a different version:
+
+        >>> catalogs.compileRoutes()
+        >>> catalogs.routes_version == version
+        False
+
+    """
+
+
 def doctest_CatalogFactory():
     """Tests for CatalogFactory.
 
@@ -477,6 +568,80 @@ def doctest_CatalogImplementing():
     """
 
 
+def doctest_CatalogFactory_background_rebuild():
+    """Tests for rebuilding catalogs in the background.
+
+        >>> class IFoo(Interface):
+        ...     pass
+        >>> class Foo(object):
+        ...     implements(IFoo)
+        ...     def __init__(self, title):
+        ...         self.title = title
+        ...     def __repr__(self):
+        ...         return '<Foo %r>' % self.title
+
+        >>> app = provideApplicationStub()
+        >>> objects = {1: Foo('one'), 2: object(), 3: Foo('three')}
+
+        >>> from BTrees.IOBTree import IOBTree
+        >>> from zope.component import provideUtility
+        >>> from zope.intid.interfaces import IIntIds
+        >>> class IntIdsStub(object):
+        ...     refs = IOBTree([(uid, lambda obj=obj: obj)
+        ...                     for uid, obj in objects.items()])
+        >>> provideUtility(IntIdsStub(), IIntIds)
+
+        >>> from zope.container.contained import Contained
+        >>> from schooltool.app.catalog import CatalogImplementing
+
+        >>> class TitleIndex(Contained):
+        ...     def __init__(self):
+        ...         self.data = []
+        ...     def index_doc(self, id, value):
+        ...         self.data.append((id, value.title))
+
+        >>> class CatalogTitles(CatalogImplementing):
+        ...    version = 1
+        ...    interface = IFoo
+        ...    background_rebuild = True
+        ...    def setIndexes(self, catalog):
+        ...        catalog['title'] = TitleIndex()
+
+    New catalogs are set up as usual.
+
+        >>> CatalogTitles(app)()
+        >>> CatalogTitles.get().__parent__.rebuilding
+        False
+
+    Catalogs replaced because their version changed are marked for
+    rebuilding instead of being populated at startup.
+
+        >>> CatalogTitles.version = 2
+        >>> CatalogTitles(app)()
+        >>> versioned = CatalogTitles.get().__parent__
+        >>> versioned.rebuilding, versioned.cursor
+        (True, None)
+
+    They are populated in chunks, the cursor tells where to resume.
+
+        >>> from schooltool.app.catalog import rebuildCatalogs
+        >>> rebuildCatalogs(app, 2)
+        True
+        >>> versioned.cursor, versioned.indexed
+        (2, 2)
+        >>> CatalogTitles.get()['title'].data
+        [(1, 'one')]
+
+        >>> rebuildCatalogs(app, 2)
+        False
+        >>> versioned.rebuilding, versioned.cursor, versioned.indexed
+        (False, None, 3)
+        >>> CatalogTitles.get()['title'].data
+        [(1, 'one'), (3, 'three')]
+
+    """
+
+
 def doctest_AttributeCatalog():
     """Tests for AttributeCatalog.  This is a factory of catalogs that
     index attributes of objects implementing given interface.
@@ -666,22 +831,140 @@ def doctest_catalog_subscribers():
         >>> catalogs = ICatalogs(app)
         >>> catalogs['demo'] = VersionedCatalog(PrintingCatalogStub('demo'), 'v1')
 
-    We can now see objects being indexed.
+    Catalog operations are queued until the transaction commits, or
+    until a catalog is looked up, so that searches see changes of the
+    current transaction.
 
+        >>> import transaction
+        >>> from schooltool.app.catalog import flushIndexingQueue
         >>> test_three = TestObj('three')
         >>> addAndNotify(test_three, 3)
         firing IntIdAddedEvent
+        >>> flushIndexingQueue()
         CatalogStub('demo') indexed doc 3 (<TestObj 'three'>)
 
+    Operations on the same object are coalesced, the object is indexed
+    once in its final state.
+
         >>> test_three.name='three and a half'
         >>> notifyModified(test_three)
         firing ObjectModifiedEvent
-        CatalogStub('demo') indexed doc 3 (<TestObj 'three and a half'>)
+        >>> test_three.name='three and three quarters'
+        >>> notifyModified(test_three)
+        firing ObjectModifiedEvent
+        >>> flushIndexingQueue()
+        CatalogStub('demo') indexed doc 3 (<TestObj 'three and three quarters'>)
+
+    Removal wins over earlier changes.
 
+        >>> notifyModified(test_three)
+        firing ObjectModifiedEvent
         >>> notifyAndRemove(test_three)
         firing IntIdRemovedEvent
+        >>> flushIndexingQueue()
         CatalogStub('demo') unindexed doc 3
 
+    Catalogs of objects implementing an interface only get objects
+    that provide it.
+
+        >>> from zc.catalog import extentcatalog
+        >>> from zope.interface import Interface, alsoProvides
+        >>> from schooltool.table.catalog import FilterImplementing
+        >>> class IThing(Interface):
+        ...     pass
+        >>> things = extentcatalog.Catalog(
+        ...     extentcatalog.FilterExtent(FilterImplementing(IThing)))
+        >>> catalogs['things'] = VersionedCatalog(things, 'v1')
+
+        >>> test_four = TestObj('four')
+        >>> alsoProvides(test_four, IThing)
+        >>> addAndNotify(test_four, 4)
+        firing IntIdAddedEvent
+        >>> addAndNotify(TestObj('five'), 5)
+        firing IntIdAddedEvent
+        >>> flushIndexingQueue()
+        CatalogStub('demo') indexed doc ...
+        CatalogStub('demo') indexed doc ...
+        >>> list(things.extent)
+        [4]
+
+    Operations of aborted transactions are dropped.
+
+        >>> notifyModified(test_three)
+        firing ObjectModifiedEvent
+        >>> transaction.abort()
+        >>> flushIndexingQueue()
+
+    """
+
+
+def doctest_IndexingQueue():
+    """Tests for IndexingQueue.
+
+        >>> import transaction
+        >>> from schooltool.app.catalog import IndexingQueue
+
+        >>> class CatalogStub(object):
+        ...     def index_doc(self, doc_id, doc):
+        ...         print 'indexed doc %s (%s)' % (doc_id, doc)
+        ...     def unindex_doc(self, doc_id):
+        ...         print 'unindexed doc %s' % doc_id
+        >>> class VersionedCatalogStub(object):
+        ...     catalog = CatalogStub()
+        >>> class CatalogsStub(dict):
+        ...     def route(self, obj):
+        ...         return self.keys()
+        >>> catalogs = CatalogsStub(demo=VersionedCatalogStub())
+
+        >>> transaction.begin()
+        <transaction...>
+        >>> queue = IndexingQueue()
+
+    Operations queued after a savepoint are dropped when it is rolled
+    back, those queued before it are kept.
+
+        >>> queue.index(catalogs, 1, 'one')
+        >>> savepoint = transaction.savepoint()
+        >>> queue.index(catalogs, 1, 'one changed')
+        >>> queue.index(catalogs, 2, 'two')
+        >>> savepoint.rollback()
+        >>> queue.flush()
+        indexed doc 1 (one)
+
+    If the queue was empty when the savepoint was taken, rolling back
+    drops everything.
+
+        >>> savepoint = transaction.savepoint()
+        >>> queue.unindex(catalogs, 1, 'one')
+        >>> savepoint.rollback()
+        >>> queue.flush()
+
+    The queue is flushed before the transaction commits.  Before commit
+    hooks may queue operations after that, these get flushed as well.
+
+        >>> def lateHook():
+        ...     print 'late hook'
+        ...     queue.index(catalogs, 3, 'three')
+        >>> queue.index(catalogs, 2, 'two')
+        >>> transaction.get().addBeforeCommitHook(lateHook)
+        >>> transaction.commit()
+        indexed doc 2 (two)
+        late hook
+        indexed doc 3 (three)
+
+    Operations of aborted transactions are dropped, also when the queue
+    joined the transaction after a savepoint.
+
+        >>> savepoint = transaction.savepoint()
+        >>> queue.index(catalogs, 4, 'four')
+        >>> savepoint.rollback()
+        >>> queue.flush()
+
+        >>> queue.index(catalogs, 4, 'four')
+        >>> transaction.abort()
+        >>> queue.pending
+        {}
+
     """
 
 
@@ -297,6 +297,7 @@ def doctest_setup():
         ...     lang = 'lt'
         ...     reportlab_fontdir = ''
         ...     devmode = False
+        ...     permission_cache_ttl = 0
         ...     site_definition = ftesting_zcml
         >>> options.config = ConfigStub()
 
@@ -374,6 +375,7 @@ def doctest_setup():
 class ConfigStub(object):
 
     devmode = False
+    permission_cache_ttl = 0
     site_definition = None
 
 
@@ -0,0 +1,215 @@
+#
+# SchoolTool - common information systems platform for school administration
+# Copyright (c) 2026 Shuttleworth Foundation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Unit tests for schooltool.app.membership.
+"""
+import unittest
+import doctest
+
+from zope.annotation.interfaces import IAnnotations
+from zope.component import provideHandler, getUtility
+from zope.intid.interfaces import IIntIds
+
+from schooltool.relationship.interfaces import IRelationshipAddedEvent
+from schooltool.relationship.interfaces import IRelationshipRemovedEvent
+from schooltool.app.membership import MEMBERSHIP_CLOSURE_KEY
+from schooltool.app.membership import MembershipClosure
+from schooltool.app.membership import updateMembershipClosure
+from schooltool.app.tests import setUp as appSetUp, tearDown
+
+
+def setUp(test):
+    appSetUp(test)
+    app = test.globs['app']
+    closure = IAnnotations(app)[MEMBERSHIP_CLOSURE_KEY] = MembershipClosure()
+    provideHandler(updateMembershipClosure, [IRelationshipAddedEvent])
+    provideHandler(updateMembershipClosure, [IRelationshipRemovedEvent])
+    int_ids = getUtility(IIntIds)
+    def groupsOf(obj):
+        return sorted(str(int_ids.getObject(group_id).__name__)
+                      for group_id in closure.getGroups(int_ids.getId(obj)))
+    test.globs.update({
+        'IAnnotations': IAnnotations,
+        'MEMBERSHIP_CLOSURE_KEY': MEMBERSHIP_CLOSURE_KEY,
+        'closure': closure,
+        'int_ids': int_ids,
+        'groupsOf': groupsOf,
+        })
+
+
+def doctest_updateMembershipClosure():
+    """Tests for updateMembershipClosure.
+
+    We have a person and a few groups.  Groups may not be members of
+    other groups in the application, but the closure does not care
+    about that:
+
+        >>> from schooltool.group.group import Group
+        >>> from schooltool.person.person import Person
+        >>> from schooltool.app.membership import Membership
+        >>> jonas = persons['jonas'] = Person()
+        >>> for name in 'abcd':
+        ...     groups[name] = Group()
+        >>> a, b, c, d = [groups[name] for name in 'abcd']
+
+        >>> groupsOf(jonas)
+        []
+
+    Relating an object extends the groups of the object and of all its
+    transitive members:
+
+        >>> Membership(member=jonas, group=a)
+        >>> Membership(member=b, group=c)
+        >>> groupsOf(jonas), groupsOf(b)
+        (['a'], ['c'])
+
+        >>> Membership(member=a, group=b)
+        >>> groupsOf(jonas), groupsOf(a), groupsOf(b)
+        (['a', 'b', 'c'], ['b', 'c'], ['c'])
+
+    A second path to a group does not change the closure:
+
+        >>> Membership(member=jonas, group=c)
+        >>> groupsOf(jonas)
+        ['a', 'b', 'c']
+
+    Unrelating recomputes the groups of the member and everything below
+    it.  Groups that are still reachable some other way are kept:
+
+        >>> from schooltool.relationship import unrelate
+        >>> from schooltool.app.membership import URIMembership
+        >>> from schooltool.app.membership import URIMember, URIGroup
+        >>> unrelate(URIMembership, (b, URIMember), (c, URIGroup))
+        >>> groupsOf(jonas), groupsOf(a), groupsOf(b)
+        (['a', 'b', 'c'], ['b'], [])
+
+        >>> unrelate(URIMembership, (jonas, URIMember), (c, URIGroup))
+        >>> groupsOf(jonas)
+        ['a', 'b']
+
+    unrelateAll removes every membership of an object, as a member and
+    as a group:
+
+        >>> Membership(member=b, group=d)
+        >>> groupsOf(jonas)
+        ['a', 'b', 'd']
+
+        >>> from schooltool.relationship import unrelateAll
+        >>> unrelateAll(a)
+        >>> groupsOf(jonas), groupsOf(a), groupsOf(b)
+        ([], [], ['d'])
+
+    Only objects that still belong to some group are kept in the closure:
+
+        >>> sorted(closure.closure.keys()) == [int_ids.getId(b)]
+        True
+
+    Every change is counted:
+
+        >>> closure.getGeneration()
+        9
+
+    Other relationships are ignored:
+
+        >>> from schooltool.relationship import relate
+        >>> from schooltool.relationship.tests import URIStub
+        >>> relate('example:Frogship', (jonas, URIStub('example:Frog')),
+        ...                            (b, URIStub('example:Frog')))
+        >>> groupsOf(jonas), closure.getGeneration()
+        ([], 9)
+
+    """
+
+
+def doctest_isTransitiveMember():
+    """Tests for isTransitiveMember with a membership closure.
+
+        >>> from schooltool.group.group import Group
+        >>> from schooltool.person.person import Person
+        >>> from schooltool.app.membership import Membership
+        >>> from schooltool.app.membership import isTransitiveMember
+        >>> jonas = persons['jonas'] = Person()
+        >>> for name in 'abc':
+        ...     groups[name] = Group()
+        >>> a, b, c = [groups[name] for name in 'abc']
+
+        >>> Membership(member=jonas, group=a)
+        >>> Membership(member=a, group=b)
+        >>> isTransitiveMember(jonas, a), isTransitiveMember(jonas, b)
+        (True, True)
+        >>> isTransitiveMember(jonas, c), isTransitiveMember(b, jonas)
+        (False, False)
+
+    Objects that are not members in the closure are not looked up in
+    the links:
+
+        >>> closure.removeMembership(int_ids.getId(a), int_ids.getId(b))
+        >>> isTransitiveMember(jonas, b)
+        False
+        >>> closure.addMembership(int_ids.getId(a), int_ids.getId(b))
+        >>> isTransitiveMember(jonas, b)
+        True
+
+    Only memberships active today count.  When a's membership in b
+    ends, jonas is no longer a member of b:
+
+        >>> from datetime import date
+        >>> from schooltool.app.membership import queryMembershipClosure
+        >>> b.members.on(date(2000, 1, 1)).remove(a)
+        >>> isTransitiveMember(jonas, b), isTransitiveMember(a, b)
+        (False, False)
+
+    So the cycle check of enforceMembershipConstraints would let b become
+    a member of a.  The answers are the same without the closure:
+
+        >>> del IAnnotations(app)[MEMBERSHIP_CLOSURE_KEY]
+        >>> print queryMembershipClosure()
+        None
+        >>> isTransitiveMember(jonas, b), isTransitiveMember(a, b)
+        (False, False)
+        >>> isTransitiveMember(jonas, a)
+        True
+
+        >>> IAnnotations(app)[MEMBERSHIP_CLOSURE_KEY] = closure
+        >>> b.members.on(date(2000, 1, 1)).add(a)
+        >>> isTransitiveMember(jonas, b), isTransitiveMember(a, b)
+        (True, True)
+
+    Removing a membership breaks the indirect memberships through it:
+
+        >>> from schooltool.relationship import unrelate
+        >>> from schooltool.app.membership import URIMembership
+        >>> from schooltool.app.membership import URIMember, URIGroup
+        >>> unrelate(URIMembership, (a, URIMember), (b, URIGroup))
+        >>> isTransitiveMember(jonas, a), isTransitiveMember(jonas, b)
+        (True, False)
+        >>> isTransitiveMember(a, b)
+        False
+
+    """
+
+
+def test_suite():
+    return unittest.TestSuite([
+        doctest.DocTestSuite(setUp=setUp, tearDown=tearDown,
+                             optionflags=doctest.ELLIPSIS),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
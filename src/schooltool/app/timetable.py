@@ -31,7 +31,7 @@ from schooltool.schoolyear.subscriber import EventAdapterSubscriber
 from schooltool.term.term import getTermForDate, EmergencyDayEvent
 from schooltool.timetable.interfaces import ITimetableContainer
 from schooltool.timetable.interfaces import IScheduleExceptions
-from schooltool.timetable.schedule import MeetingException
+from schooltool.timetable.schedule import MeetingException, ScheduleDates
 
 
 class EmergencyDayTimetableSubscriber(EventAdapterSubscriber):
@@ -48,7 +48,7 @@ class EmergencyDayTimetableSubscriber(EventAdapterSubscriber):
         timetables = ITimetableContainer(schoolyear)
         for timetable in timetables.values():
             if IScheduleExceptions.providedBy(timetable):
-                modified = False
+                modified_dates = []
                 scheduled = DateRange(timetable.first, timetable.last)
                 meeting_exceptions = PersistentList()
                 if old_date in scheduled:
@@ -63,9 +63,9 @@ class EmergencyDayTimetableSubscriber(EventAdapterSubscriber):
                                 period=meeting.period,
                                 meeting_id=meeting.meeting_id))
                     timetable.exceptions[old_date] = PersistentList()
-                    modified = True
+                    modified_dates.append(ScheduleDates(old_date))
                 if new_date in scheduled:
                     timetable.exceptions[new_date] = meeting_exceptions
-                    modified = True
-                if modified:
-                    zope.lifecycleevent.modified(timetable)
+                    modified_dates.append(ScheduleDates(new_date))
+                if modified_dates:
+                    zope.lifecycleevent.modified(timetable, *modified_dates)
@@ -186,6 +186,10 @@ def doctest_SamplePersonalEvents():
 
 def setUp(test):
     setup.placefulSetUp()
+    # Hashing thousands of sample passwords at full cost is slow.
+    from schooltool.person import credentials
+    test.globs['password_hash_iterations'] = credentials.PASSWORD_HASH_ITERATIONS
+    credentials.PASSWORD_HASH_ITERATIONS = 1
     zcml = stsetup.getIntegrationTestZCML()
     zcml.include('schooltool.schoolyear', file='schoolyear.zcml')
     app = AppStub()
@@ -220,6 +224,8 @@ def setUp(test):
 
 
 def tearDown(test):
+    from schooltool.person import credentials
+    credentials.PASSWORD_HASH_ITERATIONS = test.globs['password_hash_iterations']
     setup.placefulTearDown()
     abort()
 
@@ -19,9 +19,12 @@
 SchoolTool calendaring objects.
 """
 import base64
+import datetime
 
+import pytz
 from persistent.dict import PersistentDict
 from persistent import Persistent
+from BTrees.OOBTree import OOBTree, OOTreeSet
 from zope.interface import implements, implementer
 from zope.schema import getFieldNames
 from zope.component import adapts, adapter
@@ -34,6 +37,7 @@ from schooltool.calendar.interfaces import ICalendar
 from schooltool.calendar.interfaces import ICalendarEvent
 from schooltool.calendar.interfaces import IExpandedCalendarEvent
 from schooltool.calendar.mixins import CalendarMixin
+from schooltool.calendar.mixins import invalidateOccurrences
 from schooltool.calendar.simple import SimpleCalendarEvent
 from schooltool.app.interfaces import ISchoolToolCalendarEvent
 from schooltool.app.interfaces import ISchoolToolCalendar
@@ -44,6 +48,18 @@ from schooltool.app.interfaces import IHaveCalendar
 CALENDAR_KEY = 'schooltool.app.calendar.Calendar'
 
 
+def week_start(date):
+    """Return the Monday of the week the date belongs to."""
+    return date - datetime.timedelta(days=date.weekday())
+
+
+def utc_date(dt):
+    """Return the UTC date of a (possibly naive) datetime."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(pytz.UTC)
+    return dt.date()
+
+
 class CalendarEvent(SimpleCalendarEvent, Persistent, Contained):
     """A persistent calendar event contained in a persistent calendar."""
 
@@ -53,6 +69,10 @@ class CalendarEvent(SimpleCalendarEvent, Persistent, Contained):
 
     resources = property(lambda self: self._resources)
 
+    # Attributes that determine where the event is found in
+    # calendar indexes and what recurrence dates are cached for it.
+    _indexed_attrs = ('dtstart', 'duration', 'recurrence')
+
     def __init__(self, *args, **kwargs):
         resources = kwargs.pop('resources', ())
         SimpleCalendarEvent.__init__(self, *args, **kwargs)
@@ -65,6 +85,27 @@ class CalendarEvent(SimpleCalendarEvent, Persistent, Contained):
         if interface is ICalendar:
             return self.__parent__
 
+    def __setattr__(self, name, value):
+        if name not in self._indexed_attrs:
+            super(CalendarEvent, self).__setattr__(name, value)
+            return
+        calendars = self._indexingCalendars()
+        for calendar in calendars:
+            calendar.unindexEvent(self)
+        invalidateOccurrences(self)
+        super(CalendarEvent, self).__setattr__(name, value)
+        for calendar in calendars:
+            calendar.indexEvent(self)
+
+    def _indexingCalendars(self):
+        if self.__parent__ is None:
+            return []
+        calendars = [self.__parent__]
+        calendars.extend([ISchoolToolCalendar(resource)
+                          for resource in self.resources])
+        return [calendar for calendar in calendars
+                if isinstance(calendar, Calendar)]
+
     def bookResource(self, resource):
         calendar = ISchoolToolCalendar(resource)
         if resource in self.resources:
@@ -101,8 +142,15 @@ class Calendar(Persistent, CalendarMixin):
 
     title = property(lambda self: self.__parent__.title)
 
+    # Unique ids of single events by the first days of the weeks
+    # they span, and unique ids of recurrent events.
+    _events_by_week = None
+    _recurrent_events = None
+
     def __init__(self, owner):
         self.events = PersistentDict()
+        self._events_by_week = OOBTree()
+        self._recurrent_events = OOTreeSet()
         self.__parent__ = owner
 
     def __iter__(self):
@@ -111,6 +159,69 @@ class Calendar(Persistent, CalendarMixin):
     def __len__(self):
         return len(self.events)
 
+    def _eventWeeks(self, event):
+        first = utc_date(event.dtstart)
+        last = first
+        if isinstance(event.duration, datetime.timedelta):
+            last = utc_date(event.dtstart + event.duration)
+        week = week_start(first)
+        while week <= last:
+            yield week
+            week += datetime.timedelta(weeks=1)
+
+    def indexEvent(self, event):
+        if self._events_by_week is None:
+            return # Index not built yet, see evolve45
+        if event.recurrence is not None:
+            self._recurrent_events.insert(event.unique_id)
+            return
+        for week in self._eventWeeks(event):
+            if week not in self._events_by_week:
+                self._events_by_week[week] = OOTreeSet()
+            self._events_by_week[week].insert(event.unique_id)
+
+    def unindexEvent(self, event):
+        if self._events_by_week is None:
+            return
+        if event.recurrence is not None:
+            if event.unique_id in self._recurrent_events:
+                self._recurrent_events.remove(event.unique_id)
+            return
+        for week in self._eventWeeks(event):
+            unique_ids = self._events_by_week.get(week)
+            if unique_ids is None or event.unique_id not in unique_ids:
+                continue
+            unique_ids.remove(event.unique_id)
+            if not unique_ids:
+                del self._events_by_week[week]
+
+    def rebuildIndex(self):
+        self._events_by_week = OOBTree()
+        self._recurrent_events = OOTreeSet()
+        for event in self:
+            self.indexEvent(event)
+
+    def iterEventsInRange(self, first, last):
+        """Iterate events that may have occurrences between first and last."""
+        if self._events_by_week is None:
+            for event in self:
+                yield event
+            return
+        unique_ids = set(self._recurrent_events)
+        for week_ids in self._events_by_week.values(
+            min=week_start(utc_date(first)), max=utc_date(last)):
+            unique_ids.update(week_ids)
+        for unique_id in unique_ids:
+            yield self.events[unique_id]
+
+    def expand(self, first, last):
+        assert first.tzname() is not None
+        assert last.tzname() is not None
+
+        for event in self.iterEventsInRange(first, last):
+            for recurrence in event.expand(first, last):
+                yield recurrence
+
     def addEvent(self, event):
         assert ISchoolToolCalendarEvent.providedBy(event)
         if event.unique_id in self.events:
@@ -125,12 +236,14 @@ class Calendar(Persistent, CalendarMixin):
         elif self.__parent__ not in event.resources:
             raise ValueError("Event already belongs to a calendar")
         self.events[event.unique_id] = event
+        self.indexEvent(event)
 
     def removeEvent(self, event):
         if self.__parent__ in event.resources:
             event.unbookResource(self.__parent__)
         else:
             del self.events[event.unique_id]
+            self.unindexEvent(event)
             parent_calendar = event.__parent__
             if self is parent_calendar:
                 for resource in event.resources:
@@ -23,6 +23,22 @@ import datetime
 from pytz import utc
 from zope.interface import implements
 from schooltool.calendar.interfaces import IExpandedCalendarEvent
+from schooltool.common import LRUCache
+
+
+# Recurrence dates of stored events by oid, and then by
+# (recurrence, dtstart, first, last)
+occurrence_cache = LRUCache(maxsize=1000)
+
+# How many date ranges are remembered for a single event
+MAX_CACHED_RANGES = 20
+
+
+def invalidateOccurrences(event):
+    """Forget cached recurrence dates of a stored event."""
+    oid = getattr(event, '_p_oid', None)
+    if oid is not None and event.recurrence is not None:
+        occurrence_cache.pop(oid)
 
 
 class CalendarMixin(object):
@@ -264,6 +280,68 @@ class CalendarEventMixin(object):
             # At least one occurrence exists.
             return True
 
+    def recurrenceDates(self, first, last):
+        """Return dates of recurrences between first and last.
+
+        Results are cached for events stored in the database, as the
+        calendar views expand the same events over and over.
+
+            >>> from schooltool.calendar.recurrent import DailyRecurrenceRule
+            >>> class Event(CalendarEventMixin):
+            ...     _p_oid = 'oid'
+            ...     dtstart = datetime.datetime(2005, 2, 10, 10, 0)
+            ...     recurrence = DailyRecurrenceRule(interval=3)
+            >>> event = Event()
+
+            >>> occurrence_cache.clear()
+            >>> for date in event.recurrenceDates(datetime.date(2005, 2, 11),
+            ...                                   datetime.date(2005, 2, 20)):
+            ...     print date
+            2005-02-13
+            2005-02-16
+            2005-02-19
+
+        The second time around dates come from the cache:
+
+            >>> hits = occurrence_cache.hits
+            >>> for date in event.recurrenceDates(datetime.date(2005, 2, 11),
+            ...                                   datetime.date(2005, 2, 20)):
+            ...     print date
+            2005-02-13
+            2005-02-16
+            2005-02-19
+            >>> occurrence_cache.hits - hits
+            1
+
+        Dates of all ranges are kept together under the oid of the event:
+
+            >>> dates = event.recurrenceDates(datetime.date(2005, 2, 1),
+            ...                               datetime.date(2005, 2, 28))
+            >>> len(occurrence_cache), len(occurrence_cache.get('oid'))
+            (1, 2)
+
+        Cached dates are forgotten when the event is modified:
+
+            >>> invalidateOccurrences(event)
+            >>> len(occurrence_cache)
+            0
+
+        """
+        oid = getattr(self, '_p_oid', None)
+        if oid is None:
+            return tuple(self.recurrence.apply(self, first, last))
+        ranges = occurrence_cache.get(oid)
+        if ranges is None:
+            ranges = occurrence_cache[oid] = {}
+        key = (self.recurrence, self.dtstart, first, last)
+        dates = ranges.get(key)
+        if dates is None:
+            dates = tuple(self.recurrence.apply(self, first, last))
+            if len(ranges) >= MAX_CACHED_RANGES:
+                ranges.clear()
+            ranges[key] = dates
+        return dates
+
     def expand(self, first, last):
         """Return an iterator over all expanded events in a given time period.
 
@@ -278,8 +356,7 @@ class CalendarEventMixin(object):
             # XXX mg: I have a bad feeling about taking just the date part and
             #         discarding the time and timezone.  It should at least
             #         convert the dates to UTC!
-            for recdate in self.recurrence.apply(self, first.date(),
-                                                 last.date()):
+            for recdate in self.recurrenceDates(first.date(), last.date()):
                 dtstart = datetime.datetime.combine(recdate, starttime)
                 dtend = dtstart + self.duration
                 if self.duration == zero: # corner case: zero-length self
@@ -282,19 +282,46 @@ class WeeklyRecurrenceRule(RecurrenceRule):
         return (self.__class__.__name__, self.interval, self.count,
                 self.until, self.exceptions, self.weekdays)
 
+    def _recurrenceWeekdays(self, event):
+        """Return sorted weekdays the event recurs on."""
+        weekdays = set(self.weekdays)
+        weekdays.add(event.dtstart.weekday())
+        return sorted(weekdays)
+
     def _scroll(self, event, startdate):
-        """Fast-forward to recurrences near startdate"""
+        """Find the first recurrence on or after startdate and its nr.
+
+        Dates are computed arithmetically instead of stepping through
+        every day in between.
+        """
         start = event.dtstart.date()
-        if startdate >= start:
-            weeks = weekspan(start, startdate)
-        else:
-            weeks = 0
-        perweek = len(self.weekdays) + 1 # nr of recurrences per week
-        count = weeks / self.interval * perweek
-        if count > perweek:
-            count -= perweek # to get entries with weekday < that of start
-        offset = datetime.timedelta(7) * count / perweek * self.interval
-        return count, start + offset
+        weekdays = self._recurrenceWeekdays(event)
+        first_week = [dow for dow in weekdays if dow >= start.weekday()]
+        monday = start - datetime.timedelta(start.weekday())
+        startdate = max(startdate, start)
+
+        def first_count(period):
+            # The nr of the first recurrence in the period.
+            if period == 0:
+                return 0
+            return len(first_week) + (period - 1) * len(weekdays)
+
+        weeks = weekspan(start, startdate)
+        period = weeks / self.interval
+        if weeks % self.interval == 0:
+            later = [dow for dow in weekdays if dow >= startdate.weekday()]
+            if later:
+                if period == 0:
+                    skipped = len(first_week) - len(later)
+                else:
+                    skipped = len(weekdays) - len(later)
+                cur = (monday + datetime.timedelta(weeks=weeks) +
+                       datetime.timedelta(later[0]))
+                return first_count(period) + skipped, cur
+        period += 1
+        cur = (monday + datetime.timedelta(weeks=period * self.interval) +
+               datetime.timedelta(weekdays[0]))
+        return first_count(period), cur
 
     def apply(self, event, startdate=None, enddate=None):
         """Generate dates of recurrences."""
@@ -305,26 +332,30 @@ class WeeklyRecurrenceRule(RecurrenceRule):
         start = event.dtstart.date()
         if startdate is None:
             startdate = start
+        weekdays = self._recurrenceWeekdays(event)
         count, cur = self._scroll(event, startdate)
-        weekdays = set(self.weekdays)
-        weekdays.add(event.dtstart.weekday())
         while True:
             if ((enddate and cur > enddate) or
                 (self.count is not None and count >= self.count) or
                 (self.until and cur > self.until)):
                 break
-            # Check that this is the correct week and
-            # the desired weekday
-            if (weekspan(start, cur) % self.interval == 0 and
-                cur.weekday() in weekdays):
-                if cur not in self.exceptions and cur >= startdate:
-                    yield cur
-                count += 1
-            cur = self._nextRecurrence(cur)
+            if cur not in self.exceptions:
+                yield cur
+            count += 1
+            cur = self._nextRecurrence(cur, weekdays)
 
-    def _nextRecurrence(self, date):
-        """Add the basic step of recurrence to the date."""
-        return date + date.resolution
+    def _nextRecurrence(self, date, weekdays):
+        """Jump to the next recurrence after the date.
+
+        That is the next weekday of the same week, or the first weekday
+        of the week that is interval weeks later.
+        """
+        for dow in weekdays:
+            if dow > date.weekday():
+                return date + datetime.timedelta(dow - date.weekday())
+        monday = date - datetime.timedelta(date.weekday())
+        return (monday + datetime.timedelta(weeks=self.interval) +
+                datetime.timedelta(weekdays[0]))
 
     def _iCalArgs(self, dtstart):
         """Return iCalendar parameters specific to weekly reccurence."""
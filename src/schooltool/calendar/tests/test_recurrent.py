@@ -21,6 +21,7 @@ Unit tests for schooltool.calendar.recurrent.
 
 import time
 import pytz
+import random
 from datetime import datetime, date, timedelta
 import unittest
 import doctest
@@ -332,10 +333,12 @@ class TestWeeklyRecurrenceRule(unittest.TestCase, RecurrenceRuleTestBase):
                            timedelta(minutes=10),
                            "reality check", unique_id='uid')
 
-        self.assertEqual(rule._scroll(ev, date(1978, 5, 25)),
+        self.assertEqual(rule._scroll(ev, date(1978, 5, 24)),
                          (1, date(1978, 5, 24)))
+        self.assertEqual(rule._scroll(ev, date(1978, 5, 25)),
+                         (2, date(1978, 5, 31)))
         self.assertEqual(rule._scroll(ev, date(1978, 6, 2)),
-                         (1, date(1978, 5, 24)))
+                         (3, date(1978, 6, 7)))
 
         # tricky case!
         # --  Tu We
@@ -347,24 +350,26 @@ class TestWeeklyRecurrenceRule(unittest.TestCase, RecurrenceRuleTestBase):
 
         rule = self.createRule(weekdays=(0, 3,), interval=2)
 
-        # We don't care that we get the closest event.  What we care
-        # about is that the sequence of events is correct:
+        # We get the closest recurrence and its number:
         goodresults = [(0, date(1978, 5, 17)),
                        (1, date(1978, 5, 18)),
                        (2, date(1978, 5, 29)),
                        (3, date(1978, 5, 31)),
                        (4, date(1978, 6, 1)),
-                       (5, date(1978, 6, 5)),
-                       (6, date(1978, 6, 7)),
-                       (7, date(1978, 6, 8))]
+                       (5, date(1978, 6, 12)),
+                       (6, date(1978, 6, 14)),
+                       (7, date(1978, 6, 15))]
 
-        for delta in range(-10, 40):
+        for delta in range(-10, 30):
             d = date(1978, 5, 17) + date.resolution * delta
-            self.assert_(rule._scroll(ev, d) in goodresults, d)
+            closest = [result for result in goodresults if result[1] >= d][0]
+            self.assertEqual(rule._scroll(ev, d), closest, d)
 
-        # Still, it does not always return the zeroth result:
+        # Even far away from the start:
         self.assertEqual(rule._scroll(ev, date(1978, 6, 29)),
-                         (6, date(1978, 6, 14)))
+                         (10, date(1978, 6, 29)))
+        self.assertEqual(rule._scroll(ev, date(1978, 6, 30)),
+                         (11, date(1978, 7, 10)))
 
     def test_apply(self):
         from schooltool.calendar.simple import SimpleCalendarEvent
@@ -426,6 +431,58 @@ class TestWeeklyRecurrenceRule(unittest.TestCase, RecurrenceRuleTestBase):
 
         self.assertEqual(result, expected)
 
+    def test_apply_matches_stepping(self):
+        from schooltool.calendar.simple import SimpleCalendarEvent
+        from schooltool.calendar.recurrent import weekspan
+
+        def step_apply(rule, event, startdate=None, enddate=None):
+            # Reference implementation: walk every day from the start.
+            start = event.dtstart.date()
+            if startdate is None:
+                startdate = start
+            weekdays = set(rule.weekdays)
+            weekdays.add(event.dtstart.weekday())
+            count, cur = 0, start
+            while True:
+                if ((enddate and cur > enddate) or
+                    (rule.count is not None and count >= rule.count) or
+                    (rule.until and cur > rule.until)):
+                    break
+                if (weekspan(start, cur) % rule.interval == 0 and
+                    cur.weekday() in weekdays):
+                    if cur not in rule.exceptions and cur >= startdate:
+                        yield cur
+                    count += 1
+                cur += cur.resolution
+
+        rnd = random.Random(20050101)
+        base = date(2005, 1, 1)
+        for n in range(500):
+            day = base + timedelta(rnd.randint(0, 30))
+            dtstart = datetime(day.year, day.month, day.day, 12, 0)
+            ev = SimpleCalendarEvent(dtstart, timedelta(hours=1), "random",
+                                     unique_id='uid')
+            weekdays = rnd.sample(range(7), rnd.randint(0, 4))
+            exceptions = [dtstart.date() + timedelta(rnd.randint(0, 100))
+                          for i in range(rnd.randint(0, 3))]
+            count = until = None
+            limit = rnd.choice(['count', 'until', None])
+            if limit == 'count':
+                count = rnd.randint(1, 40)
+            elif limit == 'until':
+                until = dtstart.date() + timedelta(rnd.randint(0, 200))
+            rule = self.createRule(interval=rnd.randint(1, 4), count=count,
+                                   until=until, exceptions=exceptions,
+                                   weekdays=weekdays)
+            startdate = enddate = None
+            if rnd.random() < 0.8:
+                startdate = base + timedelta(rnd.randint(-10, 150))
+            if limit is None or rnd.random() < 0.5:
+                enddate = base + timedelta(rnd.randint(0, 300))
+            self.assertEqual(list(rule.apply(ev, startdate, enddate)),
+                             list(step_apply(rule, ev, startdate, enddate)),
+                             (rule, dtstart, startdate, enddate))
+
     def test_iCalRepresentation_weekly(self):
         rule = self.createRule(weekdays=(0, 3, 6))
         dtstart = datetime(2005, 01, 01, 12, 0) # saturday
@@ -20,8 +20,10 @@ Things common to the SchoolTool server and clients.
 """
 
 import re
+import time
 import locale
 import datetime
+import threading
 import urllib
 import HTMLParser
 
@@ -605,6 +607,153 @@ class DateRange(object):
                          min(self.last, other_range.last))
 
 
+class LRUCache(object):
+    """A bounded, thread safe mapping that forgets least recently used items.
+
+        >>> cache = LRUCache(maxsize=2)
+        >>> cache['a'] = 1
+        >>> cache['b'] = 2
+        >>> cache.get('a')
+        1
+
+    Adding a third item forgets 'b' that was used least recently:
+
+        >>> cache['c'] = 3
+        >>> print cache.get('b')
+        None
+        >>> sorted(cache.keys())
+        ['a', 'c']
+
+    The cache counts hits and misses:
+
+        >>> cache.hits, cache.misses
+        (1, 1)
+
+    Items can be dropped one by one, selectively or all at once:
+
+        >>> cache.pop('a'), cache.pop('a')
+        (1, None)
+        >>> cache['a'] = 1
+        >>> cache['b'] = 2
+        >>> cache.keys()
+        ['a', 'b']
+        >>> cache.invalidate(lambda key: key == 'a')
+        >>> cache.keys()
+        ['b']
+        >>> cache.clear()
+        >>> len(cache)
+        0
+
+    Items can also be given a time to live in seconds.  Expired items
+    are forgotten and looked up as misses:
+
+        >>> now = [100.0]
+        >>> cache = LRUCache(maxsize=2, ttl=10)
+        >>> cache._time = lambda: now[0]
+        >>> cache['a'] = 1
+        >>> now[0] += 5
+        >>> cache.get('a')
+        1
+        >>> now[0] += 10
+        >>> print cache.get('a')
+        None
+        >>> cache.hits, cache.misses, len(cache)
+        (1, 1, 0)
+
+    """
+
+    _time = staticmethod(time.time)
+
+    # Items are kept in a dict of [prev, next, key, value, expires] links
+    # of a circular list, ordered from the least to the most recently used.
+    PREV, NEXT, KEY, VALUE, EXPIRES = range(5)
+
+    def __init__(self, maxsize=1000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = {}
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None, None]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _unlink(self, link):
+        prev, next = link[self.PREV], link[self.NEXT]
+        prev[self.NEXT] = next
+        next[self.PREV] = prev
+
+    def _append(self, link):
+        root = self._root
+        last = root[self.PREV]
+        link[self.PREV], link[self.NEXT] = last, root
+        last[self.NEXT] = root[self.PREV] = link
+
+    def keys(self):
+        with self._lock:
+            result = []
+            link = self._root[self.NEXT]
+            while link is not self._root:
+                result.append(link[self.KEY])
+                link = link[self.NEXT]
+            return result
+
+    def get(self, key, default=None):
+        with self._lock:
+            link = self._data.get(key)
+            if link is None:
+                self.misses += 1
+                return default
+            expires = link[self.EXPIRES]
+            if expires is not None and expires <= self._time():
+                self._unlink(link)
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._unlink(link)
+            self._append(link)
+            self.hits += 1
+            return link[self.VALUE]
+
+    def __setitem__(self, key, value):
+        expires = None
+        if self.ttl:
+            expires = self._time() + self.ttl
+        with self._lock:
+            link = self._data.get(key)
+            if link is not None:
+                self._unlink(link)
+            link = self._data[key] = [None, None, key, value, expires]
+            self._append(link)
+            while len(self._data) > self.maxsize:
+                oldest = self._root[self.NEXT]
+                self._unlink(oldest)
+                del self._data[oldest[self.KEY]]
+
+    def pop(self, key, default=None):
+        """Forget the item with the key and return its value."""
+        with self._lock:
+            link = self._data.pop(key, None)
+            if link is None:
+                return default
+            self._unlink(link)
+            return link[self.VALUE]
+
+    def invalidate(self, match):
+        """Forget items with keys for which match(key) is true."""
+        with self._lock:
+            for key in [key for key in self._data if match(key)]:
+                self._unlink(self._data.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._root[:] = [self._root, self._root, None, None, None]
+
+
 _version = None
 
 def get_version():
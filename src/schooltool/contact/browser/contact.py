@@ -637,19 +637,19 @@ class ContactFilterWidget(table.catalog.IndexedFilterWidget):
 
         catalog = self.catalog
 
-        if 'SEARCH_FIRST_NAME' in self.request:
-            # XXX: applying normalized catalog queries would be nicer
-            fn_idx = catalog['first_name']
-            searchstr = self.request['SEARCH_FIRST_NAME'].lower()
-            items = [item for item in items
-                     if searchstr in fn_idx.documents_to_values[item['id']].lower()]
-
-        if 'SEARCH_LAST_NAME' in self.request:
-            # XXX: applying normalized catalog queries would be nicer
-            ln_idx = catalog['last_name']
-            searchstr = self.request['SEARCH_LAST_NAME'].lower()
-            items = [item for item in items
-                     if searchstr in ln_idx.documents_to_values[item['id']].lower()]
+        for parameter, name in [('SEARCH_FIRST_NAME', 'first_name'),
+                                ('SEARCH_LAST_NAME', 'last_name')]:
+            if parameter not in self.request:
+                continue
+            searchstr = self.request[parameter].lower()
+            found = table.catalog.substringSearch(catalog, name, searchstr)
+            if found is not None:
+                items = [item for item in items if item['id'] in found]
+            else:
+                index = catalog[name]
+                items = [item for item in items
+                         if searchstr in
+                         index.documents_to_values[item['id']].lower()]
 
         return items
 
@@ -47,7 +47,7 @@ from schooltool.relationship.temporal import TemporalURIObject
 from schooltool.relationship.relationship import RelationshipProperty
 from schooltool.relationship.relationship import RelationshipSchema
 from schooltool.securitypolicy import crowds
-from schooltool.table.catalog import ConvertingIndex
+from schooltool.table.catalog import ConvertingIndex, TrigramIndex
 from schooltool.common import simple_form_key
 from schooltool.person.interfaces import IPerson
 from schooltool.course.section import PersonInstructorsCrowd
@@ -182,7 +182,7 @@ def getContactFormKey(contact):
 
 
 class ContactCatalog(AttributeCatalog):
-    version = '4 - added text index'
+    version = '5 - added name trigram indexes'
     interface = IContact
     attributes = ('first_name', 'last_name', 'title')
 
@@ -190,6 +190,8 @@ class ContactCatalog(AttributeCatalog):
         super(ContactCatalog, self).setIndexes(catalog)
         catalog['form_keys'] = ConvertingIndex(converter=IUniqueFormKey)
         catalog['text'] = TextIndex('getSearchableText', ISearchableText, True)
+        catalog['first_name_trigrams'] = TrigramIndex('first_name')
+        catalog['last_name_trigrams'] = TrigramIndex('last_name')
 
 
 getContactCatalog = ContactCatalog.get
@@ -216,12 +218,7 @@ class ContactPersonInstructorsCrowd(PersonInstructorsCrowd):
 
     def contains(self, principal):
         user = IPerson(principal, None)
-        for person in self.context.persons:
-            sections = self._getSections(person)
-            for section in sections:
-                if user in section.instructors:
-                    return True
-        return False
+        return self.instructs(user, self.context.persons)
 
 
 class ContactStatesStartup(StateStartUpBase):
@@ -21,7 +21,9 @@ Section implementation
 from persistent import Persistent
 
 from zope.annotation.interfaces import IAttributeAnnotatable
+from zope.annotation.interfaces import IAnnotations
 from zope.intid.interfaces import IIntIds
+from zope.keyreference.interfaces import IKeyReference
 from zope.interface import implements
 from zope.interface import implementer
 from zope.event import notify
@@ -37,7 +39,7 @@ from zope.security.proxy import removeSecurityProxy
 
 from schooltool.app import membership
 from schooltool.app.relationships import URIInstruction, URISection
-from schooltool.app.relationships import Instruction
+from schooltool.app.relationships import URIInstructor
 from schooltool.app.app import InitBase
 from schooltool.app import relationships
 from schooltool.app.security import ConfigurableCrowd
@@ -49,6 +51,9 @@ from schooltool.group.interfaces import IBaseGroup as IGroup
 from schooltool.person.interfaces import IPerson
 from schooltool.relationship import RelationshipProperty
 from schooltool.relationship.relationship import getRelatedObjects
+from schooltool.relationship.relationship import CLink, getLinkCatalog
+from schooltool.relationship.relationship import isRebuilding
+from schooltool.relationship.interfaces import IRelationshipLinks
 from schooltool.relationship.temporal import ACTIVE, INACTIVE
 from schooltool.securitypolicy.crowds import Crowd
 from schooltool.schoolyear.subscriber import EventAdapterSubscriber
@@ -287,30 +292,50 @@ class InstructorsCrowd(Crowd):
         return IPerson(principal, None) in instructors
 
 
+def _linkTargets(obj, role, rel_type, catalog):
+    """Map key references of targets of links of obj to the links."""
+    linkset = IRelationshipLinks(removeSecurityProxy(obj))
+    if isRebuilding(catalog):
+        return dict((IKeyReference(link.target), link)
+                    for link in linkset.getCachedLinksByRole(role, catalog)
+                    if link.rel_type_hash == hash(rel_type))
+    lids = linkset.query(role=role, rel_type=rel_type, catalog=catalog)
+    targets = catalog['target'].documents_to_values
+    return dict((targets[lid][0], CLink(catalog, lid)) for lid in lids)
+
+
 class PersonInstructorsCrowd(Crowd):
     """Crowd of instructors of a person."""
 
     title = _(u'Instructors')
     description = _(u'Instructors of a person in any of his sections.')
 
-    def _getSections(self, ob):
-        result = []
-        group_relation = membership.Membership
-        relationships = group_relation.bind(member=ob).all().relationships
-        for link_info in relationships:
-            section = removeSecurityProxy(link_info.target)
-            if not interfaces.ISection.providedBy(section):
-                continue
-            result.append(section)
-        return result
+    def instructs(self, user, persons):
+        """Tell whether user instructs any of persons in a section.
+
+        Sections are matched by the target key references of links in
+        the link catalog, so neither sections nor their instructors get
+        loaded.
+        """
+        if user is None:
+            return False
+        catalog = getLinkCatalog()
+        taught = _linkTargets(user, URISection, URIInstruction, catalog)
+        if not taught:
+            return False
+        is_active = URIInstruction.filter
+        for person in persons:
+            member_of = _linkTargets(person, membership.URIGroup,
+                                     membership.URIMembership, catalog)
+            for key in set(taught).intersection(member_of):
+                if is_active(taught[key]):
+                    return True
+        return False
 
     def contains(self, principal):
         user = IPerson(principal, None)
         person = IPerson(self.context)
-        for section in self._getSections(person):
-            if user in section.instructors:
-                return True
-        return False
+        return self.instructs(user, [person])
 
 
 class LearnersCrowd(Crowd):
@@ -502,38 +527,133 @@ def get_active_year():
     return schoolyears.getActiveSchoolYear()
 
 
+PERSON_ROLES_KEY = 'schooltool.course.section.PersonRoles'
+
+
+class PersonRoles(Persistent):
+    """Names of school years a person teaches and studies in.
+
+    A person teaches in a year when a member of its "teachers" group
+    or an instructor of a section, and studies in a year when a member
+    of its "students" group or of a section.  All links count,
+    regardless of their temporal state.
+    """
+
+    def __init__(self, taught=(), enrolled=()):
+        self.taught = frozenset(taught)
+        self.enrolled = frozenset(enrolled)
+
+    def teaches(self, year=None):
+        if year is None:
+            return bool(self.taught)
+        return year.__name__ in self.taught
+
+    def studies(self, year=None):
+        if year is None:
+            return bool(self.enrolled)
+        return year.__name__ in self.enrolled
+
+
+def _schoolYearName(obj):
+    """Return the name of the school year of a section or group container.
+
+    None if it can not be found, e.g. while the year is being deleted.
+    """
+    try:
+        if interfaces.ISection.providedBy(obj):
+            obj = ITerm(obj)
+        return ISchoolYear(obj).__name__
+    except (TypeError, KeyError):
+        return None
+
+
+def computePersonRoles(person):
+    """Compute the role summary of a person from its links.
+
+    Links are read from the link set directly, so the result does not
+    depend on the state of the link catalog.
+    """
+    taught, enrolled = set(), set()
+    membership_hashes = (hash(membership.URIMembership),
+                         hash(membership.URIMember))
+    instruction_hashes = (hash(URIInstruction), hash(URIInstructor))
+    for link in IRelationshipLinks(removeSecurityProxy(person)):
+        # Compare hashes first, so that targets of other links are not
+        # loaded from the database.
+        hashes = (link.rel_type_hash, link.my_role_hash)
+        if hashes == membership_hashes:
+            target = removeSecurityProxy(link.target)
+            if interfaces.ISection.providedBy(target):
+                years = enrolled
+                year = _schoolYearName(target)
+            elif target.__name__ == 'teachers':
+                years = taught
+                year = _schoolYearName(target.__parent__)
+            elif target.__name__ == 'students':
+                years = enrolled
+                year = _schoolYearName(target.__parent__)
+            else:
+                continue
+        elif hashes == instruction_hashes:
+            years = taught
+            year = _schoolYearName(removeSecurityProxy(link.target))
+        else:
+            continue
+        if year is not None:
+            years.add(year)
+    return PersonRoles(taught, enrolled)
+
+
+def getPersonRoles(person):
+    """Return the role summary of a person.
+
+    Falls back to computing it for persons that do not keep one.
+    """
+    person = removeSecurityProxy(person)
+    annotations = IAnnotations(person, None)
+    roles = None
+    if annotations is not None:
+        roles = annotations.get(PERSON_ROLES_KEY)
+    if roles is None:
+        roles = computePersonRoles(person)
+    return roles
+
+
+def updatePersonRoles(event):
+    """Keep role summaries of persons up to date.
+
+    Subscriber of IRelationshipAddedEvent and IRelationshipRemovedEvent.
+    """
+    if event.rel_type == membership.URIMembership:
+        person = event[membership.URIMember]
+    elif event.rel_type == URIInstruction:
+        person = event[URIInstructor]
+    else:
+        return
+    person = removeSecurityProxy(person)
+    if not IPerson.providedBy(person):
+        return
+    annotations = IAnnotations(person, None)
+    if annotations is None:
+        return
+    roles = computePersonRoles(person)
+    old = annotations.get(PERSON_ROLES_KEY)
+    if (old is None or old.taught != roles.taught or
+        old.enrolled != roles.enrolled):
+        annotations[PERSON_ROLES_KEY] = roles
+
+
 def is_teacher(person, only_active_year=False):
+    roles = getPersonRoles(person)
+    if not only_active_year:
+        return roles.teaches()
     active = get_active_year()
-    person = removeSecurityProxy(person)
-    is_wanted_group = lambda g: (g.__name__ == 'teachers' and
-                                 not interfaces.ISection.providedBy(g))
-    group_relation = membership.Membership
-    for link_info in group_relation.bind(member=person).all().relationships:
-        target = removeSecurityProxy(link_info.target)
-        if (is_wanted_group(target) and
-            (not only_active_year or
-             ISchoolYear(target.__parent__) == active)):
-            return True
-    for link_info in Instruction.bind(instructor=person).all().relationships:
-        target = removeSecurityProxy(link_info.target)
-        schoolyear = ISchoolYear(ITerm(target))
-        if not only_active_year or schoolyear == active:
-            return True
-    return False
+    return active is not None and roles.teaches(active)
 
 
 def is_student(person, only_active_year=False):
+    roles = getPersonRoles(person)
+    if not only_active_year:
+        return roles.studies()
     active = get_active_year()
-    person = removeSecurityProxy(person)
-    group_relation = membership.Membership
-    for link_info in group_relation.bind(member=person).all().relationships:
-        target = removeSecurityProxy(link_info.target)
-        schoolyear = None
-        if interfaces.ISection.providedBy(target):
-            schoolyear = ISchoolYear(ITerm(target))
-        elif target.__name__ == 'students':
-            schoolyear = ISchoolYear(target.__parent__)
-        if (schoolyear is not None and
-            (not only_active_year or schoolyear == active)):
-            return True
-    return False
+    return active is not None and roles.studies(active)
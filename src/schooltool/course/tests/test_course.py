@@ -444,6 +444,96 @@ def doctest_PersonInstructorCrowd():
         >>> PersonInstructorsCrowd(p2).contains(p1)
         False
 
+    Only active instructors count, the membership may be in any state:
+
+        >>> section.members.remove(p1)
+        >>> PersonInstructorsCrowd(p1).contains(teacher)
+        True
+        >>> section.instructors.remove(teacher)
+        >>> PersonInstructorsCrowd(p1).contains(teacher)
+        False
+
+    """
+
+
+def doctest_is_teacher_is_student():
+    """Tests for is_teacher and is_student.
+
+    Roles are looked up in a summary kept in annotations of the person.
+
+        >>> from zope.component import provideHandler
+        >>> from schooltool.course.section import Section
+        >>> from schooltool.course.section import updatePersonRoles
+        >>> from schooltool.course.section import is_teacher, is_student
+        >>> from schooltool.course.section import PERSON_ROLES_KEY
+        >>> from schooltool.person.person import Person
+        >>> from zope.annotation.interfaces import IAnnotations
+        >>> from schooltool.relationship.interfaces import (
+        ...     IRelationshipAddedEvent, IRelationshipRemovedEvent)
+        >>> provideHandler(updatePersonRoles, [IRelationshipAddedEvent])
+        >>> provideHandler(updatePersonRoles, [IRelationshipRemovedEvent])
+
+        >>> year = setUpSchoolYear(2000)
+        >>> setUpTerms(year, 1)
+        >>> section = ISectionContainer(year['Term1'])['1'] = Section('1')
+        >>> teacher = persons['teacher'] = Person('teacher')
+        >>> student = persons['student'] = Person('student')
+
+        >>> is_teacher(teacher), is_student(student)
+        (False, False)
+
+        >>> section.instructors.add(teacher)
+        >>> section.members.add(student)
+        >>> is_teacher(teacher), is_student(teacher)
+        (True, False)
+        >>> is_teacher(student), is_student(student)
+        (False, True)
+
+        >>> roles = IAnnotations(teacher)[PERSON_ROLES_KEY]
+        >>> list(roles.taught), list(roles.enrolled)
+        ([u'2000'], [])
+
+    The summary is only replaced when it changes.  Teaching another
+    section in the same year keeps it:
+
+        >>> section_2 = ISectionContainer(year['Term1'])['2'] = Section('2')
+        >>> section_2.instructors.add(teacher)
+        >>> IAnnotations(teacher)[PERSON_ROLES_KEY] is roles
+        True
+
+    The question can be limited to the active school year:
+
+        >>> is_teacher(teacher, only_active_year=True)
+        True
+        >>> is_student(student, only_active_year=True)
+        True
+        >>> year_2001 = setUpSchoolYear(2001)
+        >>> year.__parent__.activateNextSchoolYear('2001')
+        >>> is_teacher(teacher, only_active_year=True)
+        False
+        >>> is_student(student, only_active_year=True)
+        False
+
+    Like before, inactive links count, but the summary follows
+    relationships that are broken:
+
+        >>> section.instructors.remove(teacher)
+        >>> is_teacher(teacher)
+        True
+
+        >>> from schooltool.relationship.relationship import unrelateAll
+        >>> unrelateAll(teacher)
+        >>> unrelateAll(student)
+        >>> is_teacher(teacher), is_student(student)
+        (False, False)
+
+    Persons without a summary get one computed on the fly:
+
+        >>> section.members.add(teacher)
+        >>> del IAnnotations(teacher)[PERSON_ROLES_KEY]
+        >>> is_student(teacher)
+        True
+
     """
 
 
@@ -1381,6 +1381,8 @@ class SectionImporter(ImporterBase):
 
         persons = self.context['persons']
         if self.getCellValue(sh, row, 0, '') == 'Students':
+            section_members = []
+            students_members = []
             row += 1
             for row in range(row, sh.nrows):
                 if self.isEmptyRow(sh, row):
@@ -1393,15 +1395,19 @@ class SectionImporter(ImporterBase):
                 if username not in persons:
                     self.error(row, 0, ERROR_INVALID_PERSON_ID)
                     continue
-                member = persons[username]
+                member = removeSecurityProxy(persons[username])
 
                 if member not in section.members:
-                    section.members.add(removeSecurityProxy(member))
+                    section_members.append(member)
                 if member not in students.members:
-                    students.members.add(removeSecurityProxy(member))
+                    students_members.append(member)
+            section.members.add_many(section_members)
+            students.members.add_many(students_members)
             row += 1
 
         if self.getCellValue(sh, row, 0, '') == 'Instructors':
+            section_instructors = []
+            teachers_members = []
             row += 1
             for row in range(row, sh.nrows):
                 if self.isEmptyRow(sh, row):
@@ -1414,12 +1420,14 @@ class SectionImporter(ImporterBase):
                 if username not in persons:
                     self.error(row, 0, ERROR_INVALID_PERSON_ID)
                     continue
-                instructor = persons[username]
+                instructor = removeSecurityProxy(persons[username])
 
                 if instructor not in section.instructors:
-                    section.instructors.add(removeSecurityProxy(instructor))
+                    section_instructors.append(instructor)
                 if instructor not in teachers.members:
-                    teachers.members.add(removeSecurityProxy(instructor))
+                    teachers_members.append(instructor)
+            section.instructors.add_many(section_instructors)
+            teachers.members.add_many(teachers_members)
             row += 1
 
         if self.getCellValue(sh, row, 0, '') == 'School Timetable':
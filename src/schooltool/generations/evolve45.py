@@ -0,0 +1,52 @@
+#
+# SchoolTool - common information systems platform for school administration
+# Copyright (c) 2026 Shuttleworth Foundation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Upgrade SchoolTool to generation 45.
+
+Build week indexes of calendar events.
+"""
+
+from zope.annotation.interfaces import IAnnotatable, IAnnotations
+from zope.app.generations.utility import getRootFolder, findObjectsProviding
+from zope.component.hooks import getSite, setSite
+
+from schooltool.calendar.app import Calendar
+
+CALENDAR_KEYS = ('schooltool.app.calendar.Calendar',
+                 'schooltool.timetable.app.ScheduleCalendar')
+
+
+def evolveCalendars(app):
+    for candidate in findObjectsProviding(app, IAnnotatable):
+        annotations = IAnnotations(candidate, None)
+        if annotations is None:
+            continue
+        for key in CALENDAR_KEYS:
+            calendar = annotations.get(key)
+            if (isinstance(calendar, Calendar) and
+                calendar._events_by_week is None):
+                calendar.rebuildIndex()
+
+
+def evolve(context):
+    root = getRootFolder(context)
+    old_site = getSite()
+    app = root
+    setSite(app)
+    evolveCalendars(app)
+    setSite(old_site)
@@ -0,0 +1,49 @@
+#
+# SchoolTool - common information systems platform for school administration
+# Copyright (c) 2026 Shuttleworth Foundation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Upgrade SchoolTool to generation 46.
+
+Store schooldays of terms as bitmaps.
+"""
+
+from zope.app.generations.utility import getRootFolder, findObjectsProviding
+from zope.component.hooks import getSite, setSite
+
+from schooltool.term.interfaces import ITerm
+
+
+def evolveTerm(term):
+    schooldays = term._schooldays
+    if not isinstance(schooldays, (set, frozenset)):
+        return
+    origin = min([term.first] + list(schooldays))
+    bits = 0
+    for date in schooldays:
+        bits |= 1 << (date - origin).days
+    term._schooldays_origin = origin
+    term._schooldays = bits
+
+
+def evolve(context):
+    root = getRootFolder(context)
+    old_site = getSite()
+    app = root
+    setSite(app)
+    for term in findObjectsProviding(app, ITerm):
+        evolveTerm(term)
+    setSite(old_site)
@@ -0,0 +1,47 @@
+#
+# SchoolTool - common information systems platform for school administration
+# Copyright (c) 2026 Shuttleworth Foundation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Upgrade SchoolTool to generation 47.
+
+Add a composite (role, rel_type, this) index to the link catalog.
+"""
+
+from zope.app.generations.utility import getRootFolder
+from zope.component.hooks import getSite, setSite
+
+from schooltool.generations import linkcatalogs
+from schooltool.relationship.relationship import getLinkCatalog
+from schooltool.relationship.catalog import hash_this_role_rel_type
+from schooltool.table.catalog import ConvertingIndex
+
+
+def evolve(context):
+    linkcatalogs.ensureEvolved(context)
+    root = getRootFolder(context)
+
+    old_site = getSite()
+
+    app = root
+    setSite(app)
+    catalog = getLinkCatalog()
+    if 'role_rel_type_hash' not in catalog:
+        # Adding the index to the catalog indexes existing links.
+        catalog['role_rel_type_hash'] = ConvertingIndex(
+            converter=hash_this_role_rel_type)
+
+    setSite(old_site)
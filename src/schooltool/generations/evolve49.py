@@ -0,0 +1,64 @@
+#
+# SchoolTool - common information systems platform for school administration
+# Copyright (c) 2026 Shuttleworth Foundation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Upgrade SchoolTool to generation 49.
+
+Build the transitive group membership closure.
+"""
+
+from zope.annotation.interfaces import IAnnotations
+from zope.app.generations.utility import getRootFolder
+from zope.component import getUtility
+from zope.component.hooks import getSite, setSite
+from zope.intid.interfaces import IIntIds
+
+from schooltool.generations import linkcatalogs
+from schooltool.app.membership import URIMembership, URIMember
+from schooltool.app.membership import MembershipClosure
+from schooltool.app.membership import MEMBERSHIP_CLOSURE_KEY
+from schooltool.relationship.relationship import getLinkCatalog
+
+
+def buildMembershipClosure(app):
+    closure = MembershipClosure()
+    int_ids = getUtility(IIntIds)
+    index = getLinkCatalog()['role_rel_type_hash']
+    role_hash = hash(URIMember)
+    rel_type_hash = hash(URIMembership)
+    for lid, value in index.documents_to_values.items():
+        if value[:2] != (role_hash, rel_type_hash):
+            continue
+        link = int_ids.getObject(lid)
+        member_id = int_ids.queryId(link.target)
+        group_id = int_ids.queryId(link.__parent__.__parent__)
+        if member_id is not None and group_id is not None:
+            closure.addMembership(member_id, group_id)
+    IAnnotations(app)[MEMBERSHIP_CLOSURE_KEY] = closure
+
+
+def evolve(context):
+    linkcatalogs.ensureEvolved(context)
+    root = getRootFolder(context)
+
+    old_site = getSite()
+
+    app = root
+    setSite(app)
+    buildMembershipClosure(app)
+
+    setSite(old_site)
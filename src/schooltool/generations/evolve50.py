@@ -0,0 +1,44 @@
+#
+# SchoolTool - common information systems platform for school administration
+# Copyright (c) 2026 Shuttleworth Foundation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Upgrade SchoolTool to generation 50.
+
+Index password records of persons for session token checks.
+"""
+
+from zope.app.generations.utility import getRootFolder
+from zope.component.hooks import getSite, setSite
+
+from schooltool.person.credentials import CredentialIndex
+
+
+def evolve(context):
+    root = getRootFolder(context)
+
+    old_site = getSite()
+
+    app = root
+    setSite(app)
+    persons = app['persons']
+    if persons.credentials is None:
+        credentials = CredentialIndex()
+        for username, person in persons.items():
+            credentials.set(username, person._hashed_password)
+        persons.credentials = credentials
+
+    setSite(old_site)
@@ -0,0 +1,43 @@
+#
+# SchoolTool - common information systems platform for school administration
+# Copyright (c) 2026 Shuttleworth Foundation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Upgrade SchoolTool to generation 51.
+
+Store role summaries of persons used by is_teacher and is_student.
+"""
+
+from zope.annotation.interfaces import IAnnotations
+from zope.app.generations.utility import getRootFolder
+from zope.component.hooks import getSite, setSite
+
+from schooltool.course.section import PERSON_ROLES_KEY
+from schooltool.course.section import computePersonRoles
+
+
+def evolve(context):
+    root = getRootFolder(context)
+
+    old_site = getSite()
+
+    app = root
+    setSite(app)
+    for person in app['persons'].values():
+        annotations = IAnnotations(person)
+        annotations[PERSON_ROLES_KEY] = computePersonRoles(person)
+
+    setSite(old_site)
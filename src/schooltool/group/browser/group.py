@@ -82,6 +82,7 @@ from schooltool.contact.interfaces import IContactable
 from schooltool.course.interfaces import ISection
 from schooltool.schoolyear.interfaces import ISchoolYear
 from schooltool.schoolyear.interfaces import ISchoolYearContainer
+from schooltool.securitypolicy.policy import canAccessMany
 from schooltool.group.group import Group
 from schooltool.group.interfaces import IGroup
 from schooltool.group.interfaces import IGroupMember
@@ -159,13 +160,20 @@ class GroupView(BrowserView):
         formatter = getMultiAdapter((persons, self.request),
                                     table.interfaces.ITableFormatter)
         formatter.setUp(table_formatter=zc.table.table.StandaloneFullFormatter,
-                        items=self.getPersons(),
+                        items=self.persons,
                         batch_size=0)
         return formatter.render()
 
+    @Lazy
+    def persons(self):
+        """Members whose title the user can see, checked once per view."""
+        members = list(self.context.members)
+        return [member for member, ok in zip(members,
+                                             canAccessMany(members, 'title'))
+                if ok]
+
     def getPersons(self):
-        return [member for member in self.context.members
-                if canAccess(member, 'title')]
+        return self.persons
 
     @property
     def canModify(self):
@@ -298,6 +298,12 @@ def doctest_GroupView():
         >>> sorted([person.title for person in view.getPersons()])
         ['First', 'Intermediate', 'Last']
 
+    The accessible members are computed once and shared with the person
+    table:
+
+        >>> view.getPersons() is view.persons
+        True
+
     """
 
 
@@ -22,6 +22,7 @@ __docformat__ = 'restructuredtext'
 from persistent import Persistent
 
 from zope.annotation.interfaces import IAttributeAnnotatable
+from zope.annotation.interfaces import IAnnotations
 from zope.container.contained import Contained
 from zope.container.btree import BTreeContainer
 from zope.lifecycleevent.interfaces import IObjectAddedEvent
@@ -42,6 +43,8 @@ from schooltool.app.interfaces import ICalendarParentCrowd
 from schooltool.app.interfaces import ISchoolToolApplication
 from schooltool.app.membership import GroupMemberCrowd
 from schooltool.app.membership import URIMembership, URIMember, URIGroup
+from schooltool.app.membership import MembershipClosure
+from schooltool.app.membership import MEMBERSHIP_CLOSURE_KEY
 from schooltool.app.security import ConfigurableCrowd
 from schooltool.app.security import LeaderCrowd
 from schooltool.course.interfaces import ISection
@@ -178,6 +181,13 @@ class GroupInit(InitBase):
         self.app['schooltool.group'] = GroupContainerContainer()
 
 
+class MembershipClosureInit(InitBase):
+
+    def __call__(self):
+        annotations = IAnnotations(self.app)
+        annotations[MEMBERSHIP_CLOSURE_KEY] = MembershipClosure()
+
+
 class GroupContainerViewersCrowd(ConfigurableCrowd):
     setting_key = 'everyone_can_view_group_list'
 
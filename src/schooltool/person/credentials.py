@@ -0,0 +1,306 @@
+#
+# SchoolTool - common information systems platform for school administration
+# Copyright (c) 2026 Shuttleworth Foundation
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Password hashing and the credential index of persons.
+"""
+
+import os
+import hmac
+import struct
+import hashlib
+
+from persistent import Persistent
+from BTrees.OOBTree import OOBTree
+
+from schooltool.common import LRUCache
+
+
+# Cost of new password hashes.  Stored with every hash, so it can be
+# raised without invalidating existing passwords.
+PASSWORD_HASH_ITERATIONS = 20000
+
+PASSWORD_HASH_SCHEME = 'pbkdf2_sha256'
+
+# Successful password checks, keyed by username, record version and a
+# keyed hash of the password, so that clients that send their password
+# with every request (like calendar feed readers) pay for the key
+# derivation once per password change.
+checked_passwords = LRUCache(maxsize=1000)
+
+
+def _pbkdf2_sha256(password, salt, iterations, length=32):
+    """PBKDF2-HMAC-SHA256 for Python versions before 2.7.8.
+
+        >>> _pbkdf2_sha256('passwd', 'salt', 1).encode('hex')
+        '55ac046e56e3089fec1691c22544b605f94185216dde0465e68b9d57c20dacbc'
+        >>> _pbkdf2_sha256('password', 'salt', 2, 40).encode('hex')
+        'ae4d0c95af6b46d32d0adff928f06dd02a303f8ef3c251dfd6e2d85a95474c43830651afcb5c862f'
+
+    """
+    mac = hmac.new(password, digestmod=hashlib.sha256)
+    def prf(data):
+        h = mac.copy()
+        h.update(data)
+        return h.digest()
+    result = []
+    block = 1
+    while len(result) * mac.digest_size < length:
+        u = prf(salt + struct.pack('>I', block))
+        value = int(u.encode('hex'), 16)
+        for i in xrange(iterations - 1):
+            u = prf(u)
+            value ^= int(u.encode('hex'), 16)
+        result.append(('%064x' % value).decode('hex'))
+        block += 1
+    return ''.join(result)[:length]
+
+
+def pbkdf2_sha256(password, salt, iterations):
+    if hasattr(hashlib, 'pbkdf2_hmac'):
+        return hashlib.pbkdf2_hmac('sha256', password, salt, iterations)
+    return _pbkdf2_sha256(password, salt, iterations)
+
+
+def _compare_digest(a, b):
+    """Compare two strings in time that does not depend on their contents.
+
+        >>> _compare_digest('abc', 'abc'), _compare_digest('abc', 'abd')
+        (True, False)
+        >>> _compare_digest('abc', 'ab')
+        False
+
+    """
+    if len(a) != len(b):
+        return False
+    result = 0
+    for x, y in zip(a, b):
+        result |= ord(x) ^ ord(y)
+    return result == 0
+
+
+compare_digest = getattr(hmac, 'compare_digest', _compare_digest)
+
+
+def hash_password(password):
+    r"""Compute a SHA-1 hash of a given password.
+
+    This is the unsalted hash of older SchoolTool versions, it is only
+    used to check passwords that were set before.
+
+        >>> hash_password('secret')
+        '\xe5\xe9\xfa\x1b\xa3\x1e\xcd\x1a\xe8Ou\xca\xaaGO:f?\x05\xf4'
+
+    Passwords should be ASCII or Unicode strings.
+
+        >>> hash_password('\u263B')
+        '\xe4\x13\xef\x8dv3\xba*P\xbb1\xa2k\x9c|,n\xe3mL'
+
+    To avoid problems with a multitude of 8-bit encodings, they are forbidden
+
+        >>> hash_password('\xFF') # doctest: +ELLIPSIS
+        Traceback (most recent call last):
+          ...
+        UnicodeDecodeError: 'ascii' codec can't decode byte 0xff in ...
+
+    None means "no password set, account is locked":
+
+        >>> hash_password(None) is None
+        True
+
+    Security note: passwords are not salted, so it is possible to detect
+    users that have the same password.
+    """
+    if password is None:
+        return None
+    return hashlib.sha1(password.encode('UTF-8')).digest()
+
+
+def make_password_record(password, iterations=None, salt=None):
+    """Hash a password with a salted PBKDF2-HMAC-SHA256.
+
+        >>> record = make_password_record(u'secret', iterations=10,
+        ...                               salt='salt')
+        >>> record
+        'pbkdf2_sha256$10$73616c74$...'
+
+        >>> check_password(record, 'secret')
+        True
+        >>> check_password(record, 'guess')
+        False
+
+    Every record gets its own salt:
+
+        >>> make_password_record('secret') == make_password_record('secret')
+        False
+
+    None locks the account:
+
+        >>> print make_password_record(None)
+        None
+        >>> check_password(None, None), check_password(None, '')
+        (False, False)
+
+    """
+    if password is None:
+        return None
+    if iterations is None:
+        iterations = PASSWORD_HASH_ITERATIONS
+    if salt is None:
+        salt = os.urandom(16)
+    digest = pbkdf2_sha256(password.encode('UTF-8'), salt, iterations)
+    return '$'.join([PASSWORD_HASH_SCHEME, str(iterations),
+                     salt.encode('hex'), digest.encode('hex')])
+
+
+def is_legacy_record(record):
+    """Tell whether record is an unsalted hash of older versions."""
+    return (record is not None and
+            not record.startswith(PASSWORD_HASH_SCHEME + '$'))
+
+
+def check_password(record, password):
+    """Check password against a record in constant time.
+
+    Unsalted records of older versions are accepted too:
+
+        >>> check_password(hash_password('secret'), 'secret')
+        True
+        >>> check_password(hash_password('secret'), None)
+        False
+
+    """
+    if record is None or password is None:
+        return False
+    if is_legacy_record(record):
+        return compare_digest(hash_password(password), record)
+    scheme, iterations, salt, digest = record.split('$')
+    expected = pbkdf2_sha256(password.encode('UTF-8'), salt.decode('hex'),
+                             int(iterations))
+    return compare_digest(expected, digest.decode('hex'))
+
+
+class CredentialIndex(Persistent):
+    """Password records of persons, keyed by username.
+
+    Every record carries a random version that changes with the
+    password.  Session tokens are signed with a secret of the index
+    and bound to the version, so they are verified without loading
+    the person, and stop working when the password changes.
+
+        >>> index = CredentialIndex()
+        >>> index.set('frog', make_password_record('pond', iterations=10))
+        >>> index.check('frog', 'pond'), index.check('frog', 'mud')
+        (True, False)
+        >>> index.check('toad', 'pond')
+        False
+
+        >>> token = index.makeToken('frog')
+        >>> index.checkToken(token)
+        'frog'
+        >>> print index.checkToken(token.replace('frog', 'toad', 1))
+        None
+        >>> print index.checkToken(token[:-1] + 'x')
+        None
+
+    Successful checks are remembered until the password changes:
+
+        >>> checked_passwords.clear()
+        >>> index.check('frog', 'pond'), index.check('frog', 'mud')
+        (True, False)
+        >>> len(checked_passwords)
+        1
+        >>> record, version = index.records['frog']
+        >>> index.records['frog'] = ('garbage', version)
+        >>> index.check('frog', 'pond')
+        True
+        >>> index.records['frog'] = (record, version)
+
+    Changing the password invalidates the token:
+
+        >>> index.set('frog', make_password_record('mud', iterations=10))
+        >>> print index.checkToken(token)
+        None
+        >>> index.check('frog', 'pond'), index.check('frog', 'mud')
+        (False, True)
+
+    So does locking or removing the account:
+
+        >>> token = index.makeToken('frog')
+        >>> index.set('frog', None)
+        >>> print index.checkToken(token)
+        None
+        >>> index.remove('frog')
+        >>> print index.makeToken('frog')
+        None
+
+    """
+
+    def __init__(self):
+        self.records = OOBTree()
+        self.secret = os.urandom(32)
+
+    def set(self, username, record):
+        self.records[username] = (record, os.urandom(8).encode('hex'))
+
+    def remove(self, username):
+        if username in self.records:
+            del self.records[username]
+
+    def get(self, username):
+        """Return the password record of a person or None."""
+        record, version = self.records.get(username, (None, None))
+        return record
+
+    def check(self, username, password):
+        record, version = self.records.get(username, (None, None))
+        if record is None or password is None:
+            return False
+        key = (username, version,
+               hmac.new(self.secret, password.encode('UTF-8'),
+                        hashlib.sha256).digest())
+        if checked_passwords.get(key):
+            return True
+        if not check_password(record, password):
+            return False
+        checked_passwords[key] = True
+        return True
+
+    def _sign(self, username, version):
+        message = '%s\0%s' % (username.encode('UTF-8'), version)
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()
+
+    def makeToken(self, username):
+        """Return a session token for the person, or None."""
+        record, version = self.records.get(username, (None, None))
+        if record is None:
+            return None
+        return '%s:%s:%s' % (username, version, self._sign(username, version))
+
+    def checkToken(self, token):
+        """Return the username a session token was made for, or None."""
+        try:
+            username, version, signature = token.rsplit(':', 2)
+            version, signature = str(version), str(signature)
+        except (AttributeError, ValueError, UnicodeError):
+            return None
+        if not compare_digest(self._sign(username, version), signature):
+            return None
+        record, current = self.records.get(username, (None, None))
+        if record is None or current != version:
+            return None
+        return username
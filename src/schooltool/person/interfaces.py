@@ -143,6 +143,12 @@ class IPersonContainer(IContainer):
            A user that no matter which groups he is in or is not in has the
            administrative privileges.""")
 
+    credentials = Attribute(
+        """Index of password records of persons, keyed by username.
+
+           Used to check passwords and session tokens without loading
+           person objects.  None in containers that were not upgraded.""")
+
 
 class IPersonContained(IPerson, IContained):
     """Person contained in an IPersonContainer."""
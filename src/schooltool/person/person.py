@@ -19,7 +19,6 @@
 Person implementation and support objects
 """
 
-import hashlib
 from persistent import Persistent
 
 from zope.interface import implements, implementer
@@ -42,6 +41,10 @@ from schooltool.securitypolicy.crowds import ConfigurableCrowd
 from schooltool.person.interfaces import IPersonPreferences
 from schooltool.person.interfaces import IPasswordWriter
 from schooltool.securitypolicy.crowds import OwnerCrowd, AggregateCrowd
+from schooltool.person.credentials import CredentialIndex
+from schooltool.person.credentials import make_password_record, check_password
+# BBB: import
+from schooltool.person.credentials import hash_password
 
 
 class PersonContainer(btree.BTreeContainer):
@@ -50,6 +53,11 @@ class PersonContainer(btree.BTreeContainer):
     implements(interfaces.IPersonContainer, IAttributeAnnotatable)
 
     super_user = None
+    credentials = None
+
+    def __init__(self):
+        super(PersonContainer, self).__init__()
+        self.credentials = CredentialIndex()
 
     def __setitem__(self, key, person):
         """See `IWriteContainer`
@@ -58,6 +66,13 @@ class PersonContainer(btree.BTreeContainer):
         """
         key = person.username
         btree.BTreeContainer.__setitem__(self, key, person)
+        if self.credentials is not None:
+            self.credentials.set(key, person._hashed_password)
+
+    def __delitem__(self, key):
+        btree.BTreeContainer.__delitem__(self, key)
+        if self.credentials is not None:
+            self.credentials.remove(key)
 
 
 class Person(Persistent, Contained):
@@ -77,11 +92,13 @@ class Person(Persistent, Contained):
         self.username = username
 
     def setPassword(self, password):
-        self._hashed_password = hash_password(password)
+        self._hashed_password = make_password_record(password)
+        credentials = getattr(self.__parent__, 'credentials', None)
+        if credentials is not None:
+            credentials.set(self.username, self._hashed_password)
 
     def checkPassword(self, password):
-        return (self._hashed_password is not None
-                and hash_password(password) == self._hashed_password)
+        return check_password(self._hashed_password, password)
 
     def hasPassword(self):
         return self._hashed_password is not None
@@ -92,37 +109,6 @@ class Person(Persistent, Contained):
         return self.username == other.username
 
 
-def hash_password(password):
-    r"""Compute a SHA-1 hash of a given password.
-
-        >>> hash_password('secret')
-        '\xe5\xe9\xfa\x1b\xa3\x1e\xcd\x1a\xe8Ou\xca\xaaGO:f?\x05\xf4'
-
-    Passwords should be ASCII or Unicode strings.
-
-        >>> hash_password('\u263B')
-        '\xe4\x13\xef\x8dv3\xba*P\xbb1\xa2k\x9c|,n\xe3mL'
-
-    To avoid problems with a multitude of 8-bit encodings, they are forbidden
-
-        >>> hash_password('\xFF') # doctest: +ELLIPSIS
-        Traceback (most recent call last):
-          ...
-        UnicodeDecodeError: 'ascii' codec can't decode byte 0xff in ...
-
-    None means "no password set, account is locked":
-
-        >>> hash_password(None) is None
-        True
-
-    Security note: passwords are not salted, so it is possible to detect
-    users that have the same password.
-    """
-    if password is None:
-        return None
-    return hashlib.sha1(password.encode('UTF-8')).digest()
-
-
 def personAppCalendarOverlaySubscriber(person, event):
     """Add application calendar to overlays of all new persons.
     """
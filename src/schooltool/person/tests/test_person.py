@@ -212,6 +212,8 @@ def test_suite():
     return unittest.TestSuite([
         doctest.DocTestSuite(optionflags=doctest.ELLIPSIS),
         doctest.DocTestSuite('schooltool.person.person'),
+        doctest.DocTestSuite('schooltool.person.credentials',
+                             optionflags=doctest.ELLIPSIS),
         unittest.makeSuite(TestPersonPasswordWriter)
         ])
 
@@ -26,6 +26,8 @@ from schooltool.relationship.uri import URIObject, IURIObject       # reexport
 from schooltool.relationship.relationship import relate             # reexport
 from schooltool.relationship.relationship import unrelate           # reexport
 from schooltool.relationship.relationship import unrelateAll        # reexport
+from schooltool.relationship.relationship import relate_many        # reexport
+from schooltool.relationship.relationship import unrelate_many      # reexport
 from schooltool.relationship.relationship import getRelatedObjects  # reexport
 from schooltool.relationship.relationship import RelationshipSchema # reexport
 from schooltool.relationship.relationship import RelationshipProperty # ditto
@@ -2,6 +2,8 @@ from persistent import Persistent
 from zope.container.contained import Contained
 
 import zope.catalog.interfaces
+from BTrees import IFBTree
+from BTrees.IOBTree import IOBTree
 from BTrees.OOBTree import OOBTree
 from zope.interface import implements
 from zope.container.btree import BTreeContainer
@@ -12,6 +14,9 @@ from zope.lifecycleevent import ObjectAddedEvent
 from zope.keyreference.interfaces import IKeyReference
 from zope.security.proxy import removeSecurityProxy
 from schooltool.relationship.interfaces import IRelationshipLink
+from schooltool.relationship.relationship import shared_state_cache
+from schooltool.relationship.temporal import ACTIVE, ACTIVE_CODE
+from schooltool.relationship.temporal import TemporalURIObject, find_state
 from schooltool.app.interfaces import ISchoolToolApplication
 from schooltool.app.catalog import AttributeCatalog
 from schooltool.app.app import StartUpBase
@@ -43,6 +48,11 @@ def hash_this_rel_type(link):
     return hash(link.rel_type), hash(link_this_keyref(link))
 
 
+def hash_this_role_rel_type(link):
+    return (hash(link.role), hash(link.rel_type),
+            hash(link_this_keyref(link)))
+
+
 def cache_rel_type(link):
     app = ISchoolToolApplication(None)
     uris = app['schooltool.relationship.uri']
@@ -83,6 +93,7 @@ class SharedIndex(Persistent, Contained):
         return (self.uids[docid], key) in self.data
 
     def index_doc(self, docid, link):
+        shared_state_cache.clear()
         self.uids[docid] = get_link_shared_uid(link)
         for key, value in link.shared.items():
             self.data[self.uids[docid], key] = value
@@ -90,15 +101,21 @@ class SharedIndex(Persistent, Contained):
     def unindex_doc(self, docid):
         if docid not in self.uids:
             return
+        shared_state_cache.clear()
         unindex_uid = self.uids[docid]
-        tounindex = set()
-        for uid, key in self.data:
-            if uid == unindex_uid:
-                tounindex.add((uid, key))
+        del self.uids[docid]
+        # Keys are (uid, key) tuples, so entries of one uid are adjacent
+        # and start right after (uid,).
+        tounindex = []
+        for uid, key in self.data.keys(min=(unindex_uid,)):
+            if uid != unindex_uid:
+                break
+            tounindex.append((uid, key))
         for idx in tounindex:
             del self.data[idx]
 
     def clear(self):
+        shared_state_cache.clear()
         self.data.clear()
         self.uids.clear()
 
@@ -106,6 +123,154 @@ class SharedIndex(Persistent, Contained):
         raise NotImplemented('querying this index is not supported')
 
 
+class TemporalIndex(Persistent, Contained):
+    """Index of temporal states of links.
+
+    States are shared by both links of a relationship, so they are stored
+    per shared uid, like in SharedIndex.  Links are also indexed by every
+    (meaning, code) state they ever had, which narrows date queries down
+    to the links that could possibly match.  Links without any states
+    are indexed under None.
+    """
+    implements(zope.catalog.interfaces.ICatalogIndex)
+
+    def __init__(self):
+        Persistent.__init__(self)
+        Contained.__init__(self)
+        self.uids = IOBTree()
+        self.docids = OOBTree()
+        self.states = OOBTree()
+        self.by_state = OOBTree()
+
+    def _stateKeys(self, states):
+        if not states:
+            return [None]
+        return set([state for date, state in states])
+
+    def _removeStates(self, uid, docids):
+        for key in self._stateKeys(self.states.get(uid, ())):
+            indexed = self.by_state.get(key)
+            if indexed is None:
+                continue
+            for docid in docids:
+                if docid in indexed:
+                    indexed.remove(docid)
+            if not indexed:
+                del self.by_state[key]
+
+    def _addStates(self, uid, docids):
+        for key in self._stateKeys(self.states[uid]):
+            indexed = self.by_state.get(key)
+            if indexed is None:
+                indexed = self.by_state[key] = IFBTree.TreeSet()
+            for docid in docids:
+                indexed.insert(docid)
+
+    def index_doc(self, docid, link):
+        if not isinstance(link.rel_type, TemporalURIObject):
+            self.unindex_doc(docid)
+            return
+        uid = get_link_shared_uid(link)
+        if self.uids.get(docid, uid) != uid:
+            self.unindex_doc(docid)
+        self.uids[docid] = uid
+        docids = self.docids.get(uid)
+        if docids is None:
+            docids = self.docids[uid] = IFBTree.TreeSet()
+        docids.insert(docid)
+        # Both links of the relationship share the states.
+        self._removeStates(uid, docids)
+        self.states[uid] = tuple(link.shared.get('tmp', ()))
+        self._addStates(uid, docids)
+
+    def unindex_doc(self, docid):
+        uid = self.uids.get(docid)
+        if uid is None:
+            return
+        del self.uids[docid]
+        self._removeStates(uid, [docid])
+        docids = self.docids[uid]
+        docids.remove(docid)
+        if not docids:
+            del self.docids[uid]
+            del self.states[uid]
+
+    def clear(self):
+        self.uids.clear()
+        self.docids.clear()
+        self.states.clear()
+        self.by_state.clear()
+
+    def apply(query):
+        raise NotImplemented('querying this index is not supported')
+
+    def _candidates(self, lids, keys):
+        result = IFBTree.TreeSet()
+        for key in keys:
+            if key in self.by_state:
+                result = IFBTree.union(result, self.by_state[key])
+        return IFBTree.intersection(lids, result)
+
+    def filter(self, lids, date=None, meanings=(), codes=()):
+        """Return lids of links in the given state on the given date.
+
+        If date is None, the latest state is checked.  The result is the
+        same as that of TemporalStateAccessor.has.
+        """
+        def matches(meaning, code):
+            if codes and code not in codes:
+                return False
+            if not meanings:
+                return True
+            for val in meanings:
+                if val in meaning:
+                    return True
+            return False
+
+        keys = [key for key in self.by_state.keys()
+                if key is not None and matches(*key)]
+        if (ACTIVE in meanings and
+            (ACTIVE_CODE in codes or not codes)):
+            keys.append(None)
+        result = IFBTree.TreeSet()
+        for docid in self._candidates(lids, keys):
+            states = self.states[self.uids[docid]]
+            if not states:
+                result.insert(docid)
+                continue
+            idx = 0
+            if date is not None:
+                idx = find_state(states, date)
+                if idx == len(states):
+                    continue
+            if matches(*states[idx][1]):
+                result.insert(docid)
+        return result
+
+    def filterLatest(self, lids, meanings):
+        """Return lids of links with any of meanings in their latest state.
+
+        Links without states are treated as active.
+        """
+        def matches(meaning):
+            for char in meaning:
+                for val in meanings:
+                    if val in char:
+                        return True
+            return False
+
+        keys = [key for key in self.by_state.keys()
+                if key is not None and matches(key[0])]
+        if matches(ACTIVE):
+            keys.append(None)
+        result = IFBTree.TreeSet()
+        for docid in self._candidates(lids, keys):
+            states = self.states[self.uids[docid]]
+            if not states or matches(states[0][1][0]):
+                result.insert(docid)
+        return result
+
+
 class URICache(BTreeContainer):
 
     def cache(self, uri):
@@ -129,6 +294,8 @@ class LinkCatalog(AttributeCatalog):
     version = '1.1 - uri cache'
     interface = IRelationshipLink
     attributes = ()
+    # Link sets scan their links until the catalog is rebuilt.
+    background_rebuild = True
 
     def setIndexes(self, catalog):
         super(LinkCatalog, self).setIndexes(catalog)
@@ -136,17 +303,27 @@ class LinkCatalog(AttributeCatalog):
         catalog['role_hash'] = ConvertingIndex(converter=hash_this_role)
         catalog['rel_type_hash'] = ConvertingIndex(converter=hash_this_rel_type)
         catalog['target'] = ConvertingIndex(converter=hash_this_target)
+        catalog['role_rel_type_hash'] = ConvertingIndex(
+            converter=hash_this_role_rel_type)
         catalog['shared'] = SharedIndex()
+        catalog['temporal'] = TemporalIndex()
 
 
 getLinkCatalog = LinkCatalog.get
 
 
-def indexLinks(event):
+def indexLinkList(links):
     iids = getUtility(IIntIds)
-    for link in event.getLinks():
+    catalog = getLinkCatalog()
+    for link in links:
         link = removeSecurityProxy(link)
         addIntIdSubscriber(link, ObjectAddedEvent(link))
         lid = iids.getId(link)
-        getLinkCatalog().index_doc(lid, link)
-        link.__parent__._lids.add(lid)
+        catalog.index_doc(lid, link)
+        link.__parent__.linkIndexed(link, lid)
+
+
+def indexLinks(event):
+    if event.batched:
+        return
+    indexLinkList(event.getLinks())
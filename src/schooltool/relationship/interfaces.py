@@ -116,6 +116,9 @@ class IRelationshipLinks(Interface):
         Raises ValueError if a matching link is not found.
         """
 
+    def linkIndexed(link, lid):
+        """Note that a link got indexed in the link catalog as lid."""
+
     def __getitem__(id):
         """Return the link with a given id."""
 
@@ -150,6 +153,18 @@ class IRelationshipEvent(Interface):
     participant2 = Attribute("""One of the participants.""")
     role2 = Attribute("""Role of `participant2`.""")
     extra_info = Attribute("""Extra info, as passed to relate().""")
+    batched = Attribute(
+        """True if the event was sent by relate_many() or unrelate_many().
+
+        Links of batched RelationshipAddedEvents are already indexed when
+        the events are sent.
+        """)
+    batch = Attribute(
+        """Pairs of a batched event's batch, or None.
+
+        A sequence of ((a, role_of_a), (b, role_of_b)) tuples, as passed
+        to relate_many() or unrelate_many().
+        """)
 
     def __getitem__(role):
         """Return the participant with a given role.
@@ -23,15 +23,18 @@ half of a relationship.  The storage of links on an object is determined by
 an IRelationshipLinks adapter.  There is a default adapter registered for
 all IAnnotatable objects that uses Zope 3 annotations.
 """
+import threading
+
+import transaction
 from BTrees import IFBTree
-from BTrees.OOBTree import OOBTree
+from BTrees.OOBTree import OOBTree, OOTreeSet
 from persistent import Persistent
 from zope.container.contained import Contained
 from zope.component import getUtility
 from zope.event import notify
 from zope.interface import implements
 from zope.intid.interfaces import IIntIds
-from zope.keyreference.interfaces import IKeyReference
+from zope.keyreference.interfaces import IKeyReference, NotYet
 from zope.lifecycleevent import ObjectModifiedEvent
 from zope.lifecycleevent import ObjectRemovedEvent
 from zope.lifecycleevent import ObjectAddedEvent
@@ -54,6 +57,34 @@ from schooltool.relationship.interfaces import NoSuchRelationship
 from schooltool.relationship.interfaces import IRelationshipSchema
 
 
+_missing = object()
+
+
+class SharedStateCache(threading.local):
+    """Shared state values of links read in the current transaction."""
+
+    def __init__(self):
+        self.transaction = None
+        self.catalog = None
+        self.values = {}
+
+    def getValues(self, catalog):
+        current = transaction.get()
+        if self.transaction is not current or self.catalog is not catalog:
+            self.transaction = current
+            self.catalog = catalog
+            self.values = {}
+        return self.values
+
+    def clear(self):
+        self.transaction = None
+        self.catalog = None
+        self.values = {}
+
+
+shared_state_cache = SharedStateCache()
+
+
 class SharedState(object):
 
     def __init__(self, catalog, lid):
@@ -61,23 +92,55 @@ class SharedState(object):
         self.lid = lid
 
     def __contains__(self, key):
+        values = shared_state_cache.getValues(self.catalog)
+        value = values.get((self.lid, key), _missing)
+        if value is not _missing and value is not None:
+            return True
         return (self.lid, key) in self.catalog['shared']
 
     def __getitem__(self, key):
-        return self.catalog['shared'].get(self.lid, key)
+        values = shared_state_cache.getValues(self.catalog)
+        value = values.get((self.lid, key), _missing)
+        if value is _missing:
+            value = values[self.lid, key] = self.catalog['shared'].get(
+                self.lid, key)
+        return value
 
     def __setitem__(self, key, value):
         link = getUtility(IIntIds).getObject(self.lid)
         link.shared[key] = value
+        shared_state_cache.clear()
         notify(ObjectModifiedEvent(link))
 
 
+class LinkSharedState(object):
+    """Shared state read from the link, while the link catalog is rebuilt."""
+
+    def __init__(self, link):
+        self.link = link
+
+    def __contains__(self, key):
+        return self.link.shared.get(key) is not None
+
+    def __getitem__(self, key):
+        return self.link.shared.get(key)
+
+    def __setitem__(self, key, value):
+        self.link.shared[key] = value
+        shared_state_cache.clear()
+        notify(ObjectModifiedEvent(self.link))
+
+
+def isRebuilding(catalog):
+    """Tell whether a catalog is being populated in the background."""
+    versioned = getattr(catalog, '__parent__', None)
+    return getattr(versioned, 'rebuilding', False)
+
+
 def relate(rel_type, (a, role_of_a), (b, role_of_b), extra_info=None):
     """Establish a relationship between objects `a` and `b`."""
-    for link in IRelationshipLinks(a):
-        if (link.target is b and link.role_hash == hash(role_of_b)
-            and link.rel_type_hash == hash(rel_type)):
-            raise DuplicateRelationship
+    if IRelationshipLinks(a)._find(None, b, role_of_b, rel_type) is not None:
+        raise DuplicateRelationship
     shared = OOBTree()
     shared['X'] = extra_info
     zope.event.notify(BeforeRelationshipEvent(rel_type,
@@ -102,10 +165,9 @@ def duplicate(link, obj):
     """Create duplicate link from obj to link.target."""
     obj_links = IRelationshipLinks(obj)
 
-    for olink in obj_links:
-        if (olink.target is link.target and olink.role_hash == link.role_hash
-            and olink.rel_type_hash == link.rel_type_hash):
-            raise DuplicateRelationship
+    if obj_links._find(None, link.target, link.role,
+                       link.rel_type) is not None:
+        raise DuplicateRelationship
 
     shared = OOBTree()
     for key, val in link.shared.items():
@@ -152,6 +214,119 @@ def unrelate(rel_type, (a, role_of_a), (b, role_of_b)):
                                                shared))
 
 
+def relate_many(rel_type, pairs, extra_info=None):
+    """Establish relationships between several pairs of objects.
+
+    `pairs` is a sequence of ((a, role_of_a), (b, role_of_b)) tuples.  The
+    final state is the same as after calling `relate` for every pair, but
+    the work is done per batch.  Duplicates, also within the batch, are
+    refused and BeforeRelationshipEvent is sent for every pair before
+    anything is changed, so a veto leaves all objects unrelated.  Then
+    the links are created and indexed in one pass, and only after that
+    RelationshipAddedEvent is sent for every pair.
+
+    Before events see the state before the batch.  They carry the whole
+    batch in `batch`, for constraints that depend on other relationships.
+    """
+    # Avoid a circular import.
+    from schooltool.relationship.catalog import indexLinkList
+
+    pairs = list(pairs)
+    seen = set()
+    for (a, role_of_a), (b, role_of_b) in pairs:
+        key = (id(a), id(b), hash(role_of_b))
+        if key in seen:
+            raise DuplicateRelationship
+        seen.add(key)
+        seen.add((id(b), id(a), hash(role_of_a)))
+        if IRelationshipLinks(a)._find(None, b, role_of_b,
+                                       rel_type) is not None:
+            raise DuplicateRelationship
+
+    batch = []
+    for pa, pb in pairs:
+        shared = OOBTree()
+        shared['X'] = extra_info
+        event = BeforeRelationshipEvent(rel_type, pa, pb, shared)
+        event.batched = True
+        event.batch = pairs
+        zope.event.notify(event)
+        batch.append((pa, pb, shared))
+
+    uri_cache = getURICache()
+    uri_cache.cache(rel_type)
+    for role in set([role for (a, role_of_a), (b, role_of_b) in pairs
+                     for role in (role_of_a, role_of_b)]):
+        uri_cache.cache(role)
+
+    links = []
+    for (a, role_of_a), (b, role_of_b), shared in batch:
+        link_a = Link(role_of_a, b, role_of_b, rel_type, shared)
+        IRelationshipLinks(a).add(link_a)
+        link_b = Link(role_of_b, a, role_of_a, rel_type, shared)
+        IRelationshipLinks(b).add(link_b)
+        links.extend([link_a, link_b])
+    indexLinkList(links)
+
+    for pa, pb, shared in batch:
+        event = RelationshipAddedEvent(rel_type, pa, pb, shared)
+        event.batched = True
+        event.batch = pairs
+        zope.event.notify(event)
+
+
+def unrelate_many(rel_type, pairs):
+    """Break relationships between several pairs of objects.
+
+    `pairs` is a sequence of ((a, role_of_a), (b, role_of_b)) tuples.  The
+    final state is the same as after calling `unrelate` for every pair,
+    but the work is done per batch.  Missing relationships and pairs that
+    appear twice are refused, and BeforeRemovingRelationshipEvent is sent
+    for every pair before anything is changed, so a veto leaves all
+    relationships in place.  Then all links are removed, and
+    RelationshipRemovedEvent is sent for every pair.
+    """
+    pairs = list(pairs)
+    seen = set()
+    found = []
+    for (a, role_of_a), (b, role_of_b) in pairs:
+        key = (id(a), id(b), hash(role_of_b))
+        if key in seen:
+            raise DuplicateRelationship
+        seen.add(key)
+        seen.add((id(b), id(a), hash(role_of_a)))
+        links_of_a = IRelationshipLinks(a)
+        links_of_b = IRelationshipLinks(b)
+        try:
+            link_a_to_b = links_of_a.find(role_of_a, b, role_of_b, rel_type)
+        except ValueError:
+            raise NoSuchRelationship
+        # If links_of_b.find raises a ValueError, our data structures are
+        # out of sync.
+        link_b_to_a = links_of_b.find(role_of_b, a, role_of_a, rel_type)
+        found.append((((a, role_of_a), (b, role_of_b)),
+                      (links_of_a, link_a_to_b),
+                      (links_of_b, link_b_to_a)))
+
+    for (pa, pb), (links_of_a, link_a_to_b), ignore in found:
+        event = BeforeRemovingRelationshipEvent(rel_type, pa, pb,
+                                                link_a_to_b.shared)
+        event.batched = True
+        event.batch = pairs
+        zope.event.notify(event)
+
+    for (pa, pb), (links_of_a, link_a_to_b), (links_of_b, link_b_to_a) in found:
+        links_of_a.remove(link_a_to_b)
+        links_of_b.remove(link_b_to_a)
+
+    for (pa, pb), (links_of_a, link_a_to_b), ignore in found:
+        event = RelationshipRemovedEvent(rel_type, pa, pb,
+                                         link_a_to_b.shared)
+        event.batched = True
+        event.batch = pairs
+        zope.event.notify(event)
+
+
 def unrelateAll(obj):
     """Break all relationships of `obj`.
 
@@ -188,6 +363,11 @@ class RelationshipEvent(object):
 
     """
 
+    # Set on events sent by relate_many and unrelate_many, see
+    # IRelationshipEvent.
+    batched = False
+    batch = None
+
     def __init__(self, rel_type, (a, role_of_a), (b, role_of_b), shared):
         self.rel_type = rel_type
         self.participant1 = a
@@ -496,6 +676,13 @@ class RelationshipProperty(object):
                 self.my_role, self.rel_type, self.other_role)
 
 
+def hasKeyReference(obj):
+    try:
+        return IKeyReference(obj, None) is not None
+    except NotYet:
+        return False
+
+
 def hash_persistent(obj):
     oid = obj._p_oid
     connection = obj._p_jar
@@ -778,9 +965,10 @@ class Link(Persistent, Contained):
 
     @property
     def shared_state(self):
-        return SharedState(
-            getLinkCatalog(),
-            getUtility(IIntIds).getId(self))
+        catalog = getLinkCatalog()
+        if isRebuilding(catalog):
+            return LinkSharedState(self)
+        return SharedState(catalog, getUtility(IIntIds).getId(self))
 
     @property
     def state(self):
@@ -862,6 +1050,8 @@ class CLink(object):
 
 def getLinkCatalog():
     # XXX: hard-coded for speed
+    from schooltool.app.catalog import flushIndexingQueue
+    flushIndexingQueue()
     app = getSite()
     catalogs = app['schooltool.app.catalog:Catalogs']
     versioned = catalogs['catalog:schooltool.relationship.catalog.LinkCatalog']
@@ -1000,10 +1190,15 @@ class LinkSet(Persistent, Contained):
     implements(IRelationshipLinks)
 
     _lids = None
+    # Names of links that are not in the link catalog yet.
+    _unindexed = None
+    _next_id = None
 
     def __init__(self):
         self._lids = IFBTree.TreeSet()
         self._links = OOBTree()
+        self._unindexed = OOTreeSet()
+        self._next_id = 1
 
     @property
     def catalog(self):
@@ -1013,12 +1208,19 @@ class LinkSet(Persistent, Contained):
         """Get a set of links by role."""
         if catalog is None:
             catalog = self.catalog
+        if isRebuilding(catalog):
+            return [link for link in self._links.values()
+                    if link.role_hash == hash(role)]
         lids = self.query(role=role, catalog=catalog)
         return [CLink(catalog, lid) for lid in lids]
 
     def getCachedLinksByTarget(self, target, catalog=None):
         if catalog is None:
             catalog = self.catalog
+        if isRebuilding(catalog):
+            target = removeSecurityProxy(target)
+            return [link for link in self._links.values()
+                    if link.target is target]
         lids = self.query(target=target, catalog=catalog)
         return [CLink(catalog, lid) for lid in lids]
 
@@ -1026,17 +1228,33 @@ class LinkSet(Persistent, Contained):
         if link.__parent__ == self:
             raise ValueError("You are adding same link twice.")
 
-        i = 1
+        if self._next_id is None:
+            names = [int(name) for name in self._links.keys()
+                     if name.isdigit()]
+            self._next_id = max(names) + 1 if names else 1
+        i = self._next_id
         while "%s" % i in self._links:
             i += 1
+        self._next_id = i + 1
         link.__name__ = "%s" % i
         self._links[link.__name__] = link
         link.__parent__ = self
+        if self._unindexed is None:
+            self._unindexed = OOTreeSet()
+        self._unindexed.insert(link.__name__)
         notify(ObjectAddedEvent(link, self._links, link.__name__))
 
+    def linkIndexed(self, link, lid):
+        """Note that the link got indexed in the link catalog."""
+        self._lids.add(lid)
+        if self._unindexed is not None and link.__name__ in self._unindexed:
+            self._unindexed.remove(link.__name__)
+
     def remove(self, link):
         if link is self._links.get(link.__name__):
             link_name = link.__name__
+            if self._unindexed is not None and link_name in self._unindexed:
+                self._unindexed.remove(link_name)
             self._lids.remove(getUtility(IIntIds).getId(link))
             del self._links[link.__name__]
             notify(ObjectRemovedEvent(link, self._links, link_name))
@@ -1047,21 +1265,52 @@ class LinkSet(Persistent, Contained):
         deleted = list(self._links.items())
         self._links.clear()
         self._lids.clear()
+        if self._unindexed is not None:
+            self._unindexed.clear()
         for name, link in deleted:
             notify(ObjectRemovedEvent(link, self._links, name))
 
     def __iter__(self):
         return iter(self._links.values())
 
-    def find(self, my_role, target, role, rel_type):
-        for link in self._links.values():
-            if (link.role_hash == hash(role) and
+    def _matches(self, link, my_role, target, role, rel_type):
+        return (link.role_hash == hash(role) and
                 link.target is target and
                 link.rel_type_hash == hash(rel_type) and
-                link.my_role_hash == hash(my_role)):
-                return link
+                (my_role is None or link.my_role_hash == hash(my_role)))
+
+    def _find(self, my_role, target, role, rel_type):
+        """Return the matching link or None.
+
+        Links that are already indexed are looked up in the link catalog,
+        only the ones that are not indexed yet get scanned.
+        """
+        rebuilding = bool(self._lids) and isRebuilding(self.catalog)
+        if self._lids and not rebuilding and hasKeyReference(target):
+            lids = self.query(my_role=my_role, target=target, role=role,
+                              rel_type=rel_type)
+            int_ids = getUtility(IIntIds)
+            for lid in lids:
+                if lid in self._lids:
+                    return int_ids.getObject(lid)
+        if self._unindexed is None or rebuilding:
+            # Link set from before links were tracked, or the link
+            # catalog is not ready, scan them all.
+            names = self._links.keys()
         else:
+            names = self._unindexed
+        for name in names:
+            link = self._links.get(name)
+            if (link is not None and
+                self._matches(link, my_role, target, role, rel_type)):
+                return link
+        return None
+
+    def find(self, my_role, target, role, rel_type):
+        link = self._find(my_role, target, role, rel_type)
+        if link is None:
             raise ValueError(my_role, target, role, rel_type)
+        return link
 
     def __getitem__(self, id):
         return self._links[id]
@@ -1075,6 +1324,13 @@ class LinkSet(Persistent, Contained):
         empty = IFBTree.TreeSet()
         this_hash = hash_persistent(self.__parent__)
         result = None
+        if (role is not None and rel_type is not None and
+            'role_rel_type_hash' in catalog):
+            result = catalog['role_rel_type_hash'].values_to_documents.get(
+                (hash(role), hash(rel_type), this_hash), empty)
+            if not result:
+                return result
+            role = rel_type = None
         if my_role is not None:
             ids = catalog['my_role_hash'].values_to_documents.get(
                 (hash(my_role), this_hash), empty)
@@ -1114,6 +1370,15 @@ class LinkSet(Persistent, Contained):
     def iterLinksByRole(self, role, rel_type=None, catalog=None):
         if catalog is None:
             catalog = self.catalog
+        if isRebuilding(catalog):
+            for link in self.getCachedLinksByRole(role, catalog=catalog):
+                if rel_type is None:
+                    link_filter = link.rel_type.filter
+                else:
+                    link_filter = rel_type.filter
+                if link_filter(link):
+                    yield link
+            return
         lids = self.query(role=role, rel_type=rel_type, catalog=catalog)
         if rel_type is None:
             filters = {}
@@ -29,7 +29,9 @@ from schooltool.term.interfaces import IDateManager
 from schooltool.relationship.interfaces import IRelationshipLinks
 from schooltool.relationship.relationship import BoundRelationshipProperty
 from schooltool.relationship.relationship import relate, unrelate
+from schooltool.relationship.relationship import relate_many
 from schooltool.relationship.relationship import RelationshipInfo
+from schooltool.relationship.relationship import CLink, isRebuilding
 from schooltool.relationship.uri import URIObject
 
 ACTIVE = 'a'
@@ -38,6 +40,23 @@ ACTIVE_CODE = 'a'
 INACTIVE_CODE = 'i'
 
 
+def find_state(data, date):
+    """Return the index of the latest state on or before date.
+
+    Data is a tuple of (date, state) pairs sorted by date in reverse
+    order, as stored in link shared state.  Returns len(data) if all
+    states are later than date.
+    """
+    lo, hi = 0, len(data)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if data[mid][0] <= date:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
 class TemporalStateAccessor(object):
 
     def __init__(self, state):
@@ -72,18 +91,18 @@ class TemporalStateAccessor(object):
         data = self.state['tmp']
         if not data:
             return ACTIVE, ACTIVE_CODE
-        for sd, result in data:
-            if sd <= date:
-                return sd
+        idx = find_state(data, date)
+        if idx < len(data):
+            return data[idx][0]
         return None
 
     def get(self, date):
         data = self.state['tmp']
         if not data:
             return ACTIVE, ACTIVE_CODE
-        for sd, result in data:
-            if sd <= date:
-                return result
+        idx = find_state(data, date)
+        if idx < len(data):
+            return data[idx][1]
         return None
 
     def has(self, date=None, states=(), meanings=()):
@@ -220,10 +239,24 @@ class BoundTemporalRelationshipProperty(BoundRelationshipProperty):
         return False
 
     def _iter_filtered_links(self):
-        links = IRelationshipLinks(self.this).getCachedLinksByRole(self.other_role)
-        for link in links:
-            if self._filter(link):
-                yield link
+        linkset = IRelationshipLinks(self.this)
+        catalog = linkset.catalog
+        if 'temporal' not in catalog or isRebuilding(catalog):
+            for link in linkset.getCachedLinksByRole(self.other_role):
+                if self._filter(link):
+                    yield link
+            return
+        lids = linkset.query(role=self.other_role, rel_type=self.rel_type,
+                             catalog=catalog)
+        index = catalog['temporal']
+        if self._filter == self._filter_latest_meanings:
+            lids = index.filterLatest(lids, self.filter_meanings)
+        elif self._filter == self._filter_everything:
+            lids = index.filter(lids, date=self.filter_date,
+                                meanings=self.filter_meanings,
+                                codes=self.filter_codes)
+        for lid in lids:
+            yield CLink(catalog, lid)
 
     def __nonzero__(self):
         for link in self._iter_filtered_links():
@@ -238,8 +271,7 @@ class BoundTemporalRelationshipProperty(BoundRelationshipProperty):
 
     def __iter__(self):
         for link in self._iter_filtered_links():
-            if self._filter(link):
-                yield link.target
+            yield link.target
 
     @property
     def relationships(self):
@@ -288,6 +320,33 @@ class BoundTemporalRelationshipProperty(BoundRelationshipProperty):
         notify(LinkStateModifiedEvent(
                 link, self.this, other, self.filter_date, meaning, code))
 
+    def relate_many(self, others, meaning=ACTIVE, code=ACTIVE_CODE):
+        """Like relate for each of `others`.
+
+        The objects that are not related yet get related in one batch
+        by relate_many.
+        """
+        links = IRelationshipLinks(self.this)
+        others = list(others)
+        new, seen = [], set()
+        for other in others:
+            if id(other) in seen:
+                continue
+            seen.add(id(other))
+            if links._find(self.my_role, other, self.other_role,
+                           self.rel_type) is None:
+                new.append(other)
+        if new:
+            relate_many(self.rel_type,
+                        [((self.this, self.my_role), (other, self.other_role))
+                         for other in new])
+        for other in others:
+            link = links.find(self.my_role, other, self.other_role,
+                              self.rel_type)
+            link.state.set(self.filter_date, meaning=meaning, code=code)
+            notify(LinkStateModifiedEvent(
+                    link, self.this, other, self.filter_date, meaning, code))
+
     def unrelate(self, other):
         """Delete state on filtered date or unrelate completely if
         no states left or filtered date is .all()
@@ -317,6 +376,9 @@ class BoundTemporalRelationshipProperty(BoundRelationshipProperty):
     def remove(self, other, code=INACTIVE_CODE):
         self.relate(other, meaning=INACTIVE, code=code)
 
+    def add_many(self, others, code=ACTIVE_CODE):
+        self.relate_many(others, meaning=ACTIVE, code=code)
+
     def state(self, other):
         links = IRelationshipLinks(self.this)
         try:
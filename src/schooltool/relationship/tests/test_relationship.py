@@ -22,7 +22,10 @@ Unit tests for schooltool.relationship
 import unittest
 import doctest
 
+import zope.event
+
 from schooltool.relationship.tests import URIStub
+from schooltool.relationship.interfaces import IRelationshipLinks
 
 
 def doctest_relate():
@@ -383,6 +386,507 @@ def doctest_BoundRelationshipProperty():
     """
 
 
+def doctest_LinkSet_query():
+    """Tests for LinkSet.query
+
+        >>> from schooltool.relationship.uri import URIObject as URIStub
+        >>> role_member = URIStub('example:Member')
+        >>> role_group = URIStub('example:Group')
+        >>> uri_membership = URIStub('example:Membership')
+        >>> uri_friendship = URIStub('example:Friendship')
+
+        >>> from schooltool.relationship import RelationshipSchema
+        >>> Membership = RelationshipSchema(uri_membership,
+        ...                                 member=role_member,
+        ...                                 group=role_group)
+        >>> Friendship = RelationshipSchema(uri_friendship,
+        ...                                 member=role_member,
+        ...                                 group=role_group)
+
+        >>> from schooltool.relationship.tests import SomeContainedPersistent
+        >>> group = persons['group'] = SomeContainedPersistent('group')
+        >>> john = persons['john'] = SomeContainedPersistent('john')
+        >>> pete = persons['pete'] = SomeContainedPersistent('pete')
+        >>> Membership(member=john, group=group)
+        >>> Membership(member=pete, group=group)
+        >>> Friendship(member=pete, group=group)
+
+    Links of a role and a relationship type are looked up in the
+    composite index.
+
+        >>> from schooltool.relationship.interfaces import IRelationshipLinks
+        >>> linkset = IRelationshipLinks(group)
+        >>> catalog = linkset.catalog
+        >>> from zope.keyreference.interfaces import IKeyReference
+        >>> index = catalog['role_rel_type_hash']
+        >>> lids = linkset.query(role=role_member, rel_type=uri_membership)
+        >>> list(lids) == list(index.values_to_documents.get(
+        ...     (hash(role_member), hash(uri_membership),
+        ...      hash(IKeyReference(group)))))
+        True
+        >>> [link.target.__name__ for link in linkset.iterLinksByRole(
+        ...      role_member, rel_type=uri_membership)]
+        [u'john', u'pete']
+        >>> [link.target.__name__ for link in linkset.iterLinksByRole(
+        ...      role_member, rel_type=uri_friendship)]
+        [u'pete']
+
+    Other criteria are intersected with the composite lookup.
+
+        >>> len(linkset.query(role=role_member, rel_type=uri_membership,
+        ...                   target=john))
+        1
+        >>> len(linkset.query(role=role_member, rel_type=uri_friendship,
+        ...                   target=john))
+        0
+
+    """
+
+
+def doctest_LinkSet_add_find():
+    """Tests for LinkSet.add and LinkSet.find
+
+        >>> from schooltool.relationship.uri import URIObject as URIStub
+        >>> role_member = URIStub('example:Member')
+        >>> role_group = URIStub('example:Group')
+        >>> uri_membership = URIStub('example:Membership')
+
+        >>> from schooltool.relationship import RelationshipSchema
+        >>> Membership = RelationshipSchema(uri_membership,
+        ...                                 member=role_member,
+        ...                                 group=role_group)
+
+        >>> from schooltool.relationship.tests import SomeContainedPersistent
+        >>> group = persons['group'] = SomeContainedPersistent('group')
+        >>> for name in ['john', 'pete', 'anna']:
+        ...     persons[name] = SomeContainedPersistent(name)
+        ...     Membership(member=persons[name], group=group)
+
+    Links are named using a counter.
+
+        >>> from schooltool.relationship.interfaces import IRelationshipLinks
+        >>> linkset = IRelationshipLinks(group)
+        >>> sorted(linkset._links.keys())
+        ['1', '2', '3']
+        >>> linkset._next_id
+        4
+
+    Once the links are indexed, they are found through the link catalog.
+
+        >>> list(linkset._unindexed)
+        []
+        >>> link = linkset.find(role_group, persons['pete'],
+        ...                     role_member, uri_membership)
+        >>> link.__name__
+        '2'
+        >>> linkset.find(role_member, persons['pete'],
+        ...              role_group, uri_membership)
+        Traceback (most recent call last):
+        ...
+        ValueError: ...
+
+        >>> from schooltool.relationship.relationship import unrelate
+        >>> unrelate(uri_membership, (group, role_group),
+        ...          (persons['john'], role_member))
+        >>> Membership(member=persons['john'], group=group)
+        >>> sorted(linkset._links.keys())
+        ['2', '3', '4']
+
+    Link sets created before the counter was kept pick it up from the
+    names of existing links.
+
+        >>> linkset._next_id = None
+        >>> persons['mary'] = SomeContainedPersistent('mary')
+        >>> Membership(member=persons['mary'], group=group)
+        >>> sorted(linkset._links.keys())
+        ['2', '3', '4', '5']
+
+    """
+
+
+def doctest_SharedIndex_unindex_doc():
+    """Tests for SharedIndex.unindex_doc
+
+        >>> from schooltool.relationship.catalog import SharedIndex
+        >>> index = SharedIndex()
+        >>> for docid, uid in [(1, (5, 1)), (2, (5, 2)), (3, (6, 1))]:
+        ...     index.uids[docid] = uid
+        ...     index.data[uid, 'X'] = docid
+        ...     index.data[uid, 'tmp'] = ()
+
+    Only the entries of the unindexed document are removed.
+
+        >>> index.unindex_doc(2)
+        >>> sorted(index.data.keys())
+        [((5, 1), 'X'), ((5, 1), 'tmp'), ((6, 1), 'X'), ((6, 1), 'tmp')]
+        >>> sorted(index.uids.keys())
+        [1, 3]
+        >>> index.get(1, 'X'), index.get(2, 'X'), index.get(3, 'X')
+        (1, None, 3)
+
+        >>> index.unindex_doc(2)
+
+    """
+
+
+def doctest_relate_many():
+    """Tests for relate_many and unrelate_many
+
+        >>> from schooltool.relationship.uri import URIObject as URIStub
+        >>> role_member = URIStub('example:Member')
+        >>> role_group = URIStub('example:Group')
+        >>> uri_membership = URIStub('example:Membership')
+
+        >>> from schooltool.relationship.tests import SomeContainedPersistent
+        >>> from schooltool.relationship import getRelatedObjects
+        >>> from schooltool.relationship import relate_many, unrelate_many
+        >>> group = persons['group'] = SomeContainedPersistent('group')
+        >>> names = ['anna', 'john', 'pete']
+        >>> for name in names:
+        ...     persons[name] = SomeContainedPersistent(name)
+
+        >>> from schooltool.relationship.interfaces import IRelationshipEvent
+        >>> events = []
+        >>> def logEvent(event):
+        ...     if IRelationshipEvent.providedBy(event):
+        ...         events.append(event)
+        >>> zope.event.subscribers.append(logEvent)
+        >>> relate_many(uri_membership,
+        ...             [((group, role_group), (persons[name], role_member))
+        ...              for name in names],
+        ...             extra_info='info')
+
+    Constraints are checked for the whole batch before anything is
+    related, and the added events are sent after all links are indexed.
+
+        >>> [(event.__class__.__name__, event[role_member].__name__)
+        ...  for event in events]
+        [('BeforeRelationshipEvent', u'anna'),
+         ('BeforeRelationshipEvent', u'john'),
+         ('BeforeRelationshipEvent', u'pete'),
+         ('RelationshipAddedEvent', u'anna'),
+         ('RelationshipAddedEvent', u'john'),
+         ('RelationshipAddedEvent', u'pete')]
+        >>> [event.batched for event in events]
+        [True, True, True, True, True, True]
+        >>> len(events[0].batch)
+        3
+
+    All links are indexed.
+
+        >>> sorted(obj.__name__
+        ...        for obj in getRelatedObjects(group, role_member))
+        [u'anna', u'john', u'pete']
+        >>> [obj.__name__
+        ...  for obj in getRelatedObjects(persons['john'], role_group)]
+        [u'group']
+        >>> link = IRelationshipLinks(persons['pete']).find(
+        ...     role_member, group, role_group, uri_membership)
+        >>> link.extra_info
+        'info'
+
+    Duplicates are refused before anything is changed.
+
+        >>> del events[:]
+        >>> persons['mary'] = SomeContainedPersistent('mary')
+        >>> relate_many(uri_membership,
+        ...             [((group, role_group), (persons['mary'], role_member)),
+        ...              ((persons['john'], role_member), (group, role_group))])
+        Traceback (most recent call last):
+        ...
+        DuplicateRelationship
+        >>> events
+        []
+
+    Before events see the state before the batch, and the batch itself,
+    so constraints that depend on other relationships can refuse a batch
+    that relate would refuse when called in a loop.
+
+        >>> from schooltool.relationship.interfaces import InvalidRelationship
+        >>> from schooltool.relationship.interfaces import (
+        ...     IBeforeRelationshipEvent)
+        >>> def refuseCycles(event):
+        ...     if not IBeforeRelationshipEvent.providedBy(event):
+        ...         return
+        ...     members = getRelatedObjects(event[role_member], role_member)
+        ...     for (x, role_x), (y, role_y) in event.batch or ():
+        ...         roles = {role_x: x, role_y: y}
+        ...         if roles[role_group] is event[role_member]:
+        ...             members.append(roles[role_member])
+        ...     if event[role_group] in members:
+        ...         raise InvalidRelationship('No cycles are allowed.')
+        >>> zope.event.subscribers.append(refuseCycles)
+
+        >>> a = persons['a'] = SomeContainedPersistent('a')
+        >>> b = persons['b'] = SomeContainedPersistent('b')
+        >>> relate_many(uri_membership,
+        ...             [((a, role_member), (b, role_group)),
+        ...              ((b, role_member), (a, role_group))])
+        Traceback (most recent call last):
+        ...
+        InvalidRelationship: No cycles are allowed.
+
+    A refused batch changes nothing.
+
+        >>> getRelatedObjects(a, role_member), getRelatedObjects(b, role_member)
+        ([], [])
+
+        >>> zope.event.subscribers.remove(refuseCycles)
+
+    unrelate_many breaks the relationships.  All before events are sent
+    before anything is removed.
+
+        >>> del events[:]
+        >>> unrelate_many(uri_membership,
+        ...               [((group, role_group), (persons['anna'], role_member)),
+        ...                ((persons['pete'], role_member), (group, role_group))])
+        >>> [(event.__class__.__name__, event[role_member].__name__)
+        ...  for event in events]
+        [('BeforeRemovingRelationshipEvent', u'anna'),
+         ('BeforeRemovingRelationshipEvent', u'pete'),
+         ('RelationshipRemovedEvent', u'anna'),
+         ('RelationshipRemovedEvent', u'pete')]
+        >>> [obj.__name__ for obj in getRelatedObjects(group, role_member)]
+        [u'john']
+        >>> getRelatedObjects(persons['pete'], role_group)
+        []
+
+    A pair that appears twice, also in reverse, is refused before
+    anything is changed.
+
+        >>> unrelate_many(uri_membership,
+        ...               [((group, role_group), (persons['john'], role_member)),
+        ...                ((persons['john'], role_member), (group, role_group))])
+        Traceback (most recent call last):
+        ...
+        DuplicateRelationship
+        >>> [obj.__name__ for obj in getRelatedObjects(group, role_member)]
+        [u'john']
+
+    If one of the relationships does not exist, none are broken.
+
+        >>> unrelate_many(uri_membership,
+        ...               [((group, role_group), (persons['john'], role_member)),
+        ...                ((group, role_group), (persons['mary'], role_member))])
+        Traceback (most recent call last):
+        ...
+        NoSuchRelationship
+        >>> [obj.__name__ for obj in getRelatedObjects(group, role_member)]
+        [u'john']
+
+        >>> zope.event.subscribers.remove(logEvent)
+
+    """
+
+
+def doctest_TemporalStateAccessor_lookups():
+    """Tests for date lookups of TemporalStateAccessor
+
+        >>> from datetime import date
+        >>> from schooltool.relationship.temporal import TemporalStateAccessor
+        >>> state = TemporalStateAccessor({})
+        >>> state.get(date(2014, 1, 1))
+        ('a', 'a')
+
+        >>> state.set(date(2014, 9, 1))
+        >>> state.set(date(2014, 12, 20), meaning='i', code='w')
+        >>> state.set(date(2015, 1, 5), code='r')
+
+        >>> for day in [date(2014, 8, 31), date(2014, 9, 1),
+        ...             date(2014, 12, 31), date(2015, 1, 5),
+        ...             date(2016, 1, 1)]:
+        ...     print day, state.closest(day), state.get(day)
+        2014-08-31 None None
+        2014-09-01 2014-09-01 ('a', 'a')
+        2014-12-31 2014-12-20 ('i', 'w')
+        2015-01-05 2015-01-05 ('a', 'r')
+        2016-01-01 2015-01-05 ('a', 'r')
+
+        >>> state.has(date(2014, 12, 31), meanings=('a',))
+        False
+        >>> state.has(date(2015, 2, 1), states=('r',), meanings=('a',))
+        True
+        >>> state.has(date(2014, 1, 1), meanings=('a',))
+        False
+
+    """
+
+
+def doctest_BoundTemporalRelationshipProperty_filtering():
+    """Tests for filtering temporal relationships with the temporal index
+
+        >>> from datetime import date
+        >>> from schooltool.relationship.uri import URIObject as URIStub
+        >>> from schooltool.relationship.temporal import TemporalURIObject
+        >>> role_member = URIStub('example:Member')
+        >>> role_group = URIStub('example:Group')
+        >>> uri_membership = TemporalURIObject('example:Membership')
+
+        >>> from schooltool.relationship.tests import SomeContainedPersistent
+        >>> from schooltool.relationship.relationship import RelationshipProperty
+
+        >>> class Group(SomeContainedPersistent):
+        ...     members = RelationshipProperty(
+        ...         uri_membership, role_group, role_member)
+
+        >>> group = persons['group'] = Group('group')
+        >>> for name in ['anna', 'john', 'pete', 'mary']:
+        ...     persons[name] = SomeContainedPersistent(name)
+
+        >>> members = group.members.all()
+        >>> members.on(date(2014, 9, 1)).relate(persons['anna'])
+        >>> members.on(date(2014, 9, 1)).relate(persons['john'])
+        >>> members.on(date(2015, 1, 1)).relate(persons['john'], meaning='i',
+        ...                                     code='w')
+        >>> members.on(date(2015, 1, 1)).relate(persons['pete'], code='r')
+
+    Mary is related without any states, which counts as active.
+
+        >>> from schooltool.relationship import relate
+        >>> relate(uri_membership, (group, role_group),
+        ...        (persons['mary'], role_member))
+
+        >>> def names(objs):
+        ...     return sorted(obj.__name__ for obj in objs)
+
+        >>> names(members.on(date(2014, 10, 1)).any('a'))
+        [u'anna', u'john', u'mary']
+        >>> names(members.on(date(2015, 2, 1)).any('a'))
+        [u'anna', u'mary', u'pete']
+        >>> names(members.on(date(2015, 2, 1)).any('i'))
+        [u'john']
+        >>> names(members.on(date(2015, 2, 1)).any('a').coded('r'))
+        [u'pete']
+        >>> names(members.on(date(2014, 1, 1)).any('a'))
+        [u'mary']
+        >>> names(members.on(None).any('a'))
+        [u'anna', u'mary', u'pete']
+        >>> names(members)
+        [u'anna', u'john', u'mary', u'pete']
+
+    The results match the link by link filter.
+
+        >>> from schooltool.relationship.interfaces import IRelationshipLinks
+        >>> linkset = IRelationshipLinks(group)
+        >>> for prop in [members.on(date(2015, 2, 1)).any('a'),
+        ...              members.on(date(2015, 2, 1)).any('i').coded('w'),
+        ...              members.on(None).any('a')]:
+        ...     expected = [link.target for link in
+        ...                 linkset.getCachedLinksByRole(role_member)
+        ...                 if prop._filter(link)]
+        ...     print names(prop) == names(expected)
+        True
+        True
+        True
+
+    Removing the states of a link updates the index.
+
+        >>> members.on(date(2015, 1, 1)).unrelate(persons['john'])
+        >>> names(members.on(date(2015, 2, 1)).any('a'))
+        [u'anna', u'john', u'mary', u'pete']
+
+    relate_many relates new objects in one batch and sets the states
+    of all of them, like relate does for each.
+
+        >>> persons['rita'] = SomeContainedPersistent('rita')
+        >>> members.on(date(2015, 3, 1)).relate_many(
+        ...     [persons['rita'], persons['anna']], meaning='i', code='w')
+        >>> names(members.on(date(2015, 3, 1)).any('i').coded('w'))
+        [u'anna', u'rita']
+        >>> names(members.on(date(2015, 2, 1)).any('a'))
+        [u'anna', u'john', u'mary', u'pete']
+
+        >>> members.on(date(2015, 4, 1)).add_many(
+        ...     [persons['rita'], persons['rita']])
+        >>> names(members.on(date(2015, 4, 1)).any('a'))
+        [u'john', u'mary', u'pete', u'rita']
+
+    """
+
+
+def doctest_LinkSet_catalog_rebuilding():
+    """Tests for link sets while the link catalog is rebuilt.
+
+        >>> from datetime import date
+        >>> from schooltool.relationship.uri import URIObject as URIStub
+        >>> from schooltool.relationship.temporal import TemporalURIObject
+        >>> role_member = URIStub('example:Member')
+        >>> role_group = URIStub('example:Group')
+        >>> uri_membership = TemporalURIObject('example:Membership')
+
+        >>> from schooltool.relationship.tests import SomeContainedPersistent
+        >>> from schooltool.relationship.relationship import RelationshipProperty
+
+        >>> class Group(SomeContainedPersistent):
+        ...     members = RelationshipProperty(
+        ...         uri_membership, role_group, role_member)
+
+        >>> group = persons['group'] = Group('group')
+        >>> for name in ['anna', 'john', 'pete']:
+        ...     persons[name] = SomeContainedPersistent(name)
+        ...     group.members.on(date(2014, 9, 1)).relate(persons[name])
+        >>> group.members.on(date(2015, 1, 1)).relate(persons['john'],
+        ...                                           meaning='i')
+
+        >>> def names(objs):
+        ...     return sorted(obj.__name__ for obj in objs)
+
+    Say the link catalog got replaced by a new version, and is being
+    populated in the background.
+
+        >>> from schooltool.relationship.relationship import getLinkCatalog
+        >>> catalog = getLinkCatalog()
+        >>> catalog.clear()
+        >>> catalog.__parent__.rebuilding = True
+
+    Link sets fall back to scanning their links.
+
+        >>> names(group.members.on(date(2015, 2, 1)).any('a'))
+        [u'anna', u'pete']
+        >>> names(group.members.all())
+        [u'anna', u'john', u'pete']
+        >>> persons['anna'] in group.members.on(date(2015, 2, 1))
+        True
+
+        >>> from schooltool.relationship.interfaces import IRelationshipLinks
+        >>> names(IRelationshipLinks(persons['anna']).iterTargetsByRole(
+        ...     role_group))
+        [u'group']
+
+        >>> linkset = IRelationshipLinks(group)
+        >>> link = linkset.find(role_group, persons['pete'],
+        ...                     role_member, uri_membership)
+        >>> link.target.__name__
+        u'pete'
+
+    Relationships can be changed meanwhile.
+
+        >>> group.members.on(date(2015, 1, 1)).relate(persons['anna'],
+        ...                                           meaning='i')
+        >>> names(group.members.on(date(2015, 2, 1)).any('a'))
+        [u'pete']
+
+    Once rebuilt, the catalog gives the same answers.
+
+        >>> from schooltool.app.catalog import rebuildCatalogs
+        >>> from zope.component.hooks import getSite
+        >>> rebuildCatalogs(getSite(), 2)
+        True
+        >>> catalog.__parent__.indexed
+        2
+        >>> while rebuildCatalogs(getSite(), 2):
+        ...     pass
+        >>> catalog.__parent__.rebuilding
+        False
+
+        >>> names(group.members.on(date(2015, 2, 1)).any('a'))
+        [u'pete']
+        >>> names(group.members.all())
+        [u'anna', u'john', u'pete']
+
+    """
+
+
 from schooltool.app.tests import setUp, tearDown
 
 
@@ -19,10 +19,12 @@
 SchoolTool security policy crowds.
 """
 
-from zope.interface import implements
+import weakref
+
+from zope.interface import implements, providedBy
 from zope.security.proxy import removeSecurityProxy
 from zope.component import queryAdapter, queryMultiAdapter, queryUtility
-from zope.component import getGlobalSiteManager
+from zope.component import getGlobalSiteManager, getSiteManager
 from zope.container.contained import Contained
 from zope.container.btree import BTreeContainer
 
@@ -46,11 +48,48 @@ class CrowdNotRegistered(Exception):
 
 
 class CrowdsUtility(object):
+    """Crowd declarations and their compiled dispatch tables.
+
+    Crowd names of (permission, interface) declarations are resolved
+    to factories once and kept in a table, as are ICrowd adapter
+    factories for (permission, providedBy(obj)) specifications, per
+    adapter registry.  Call invalidate after changing factories or
+    crowds in place; invalidateCrowdAdapters does it when ICrowd
+    adapters are registered or unregistered.
+    """
     implements(ICrowdsUtility)
 
     def __init__(self):
-        self.factories = {}
-        self.crowds = {}
+        self._factories = {}
+        self._crowds = {}
+        self.invalidate()
+
+    def _setFactories(self, factories):
+        self._factories = factories
+        self.invalidate()
+
+    factories = property(lambda self: self._factories, _setFactories)
+
+    def _setCrowds(self, crowds):
+        self._crowds = crowds
+        self.invalidate()
+
+    crowds = property(lambda self: self._crowds, _setCrowds)
+
+    def invalidate(self):
+        self._compiled = {}
+        self.invalidateAdapters()
+
+    def invalidateAdapters(self):
+        self._adapters = weakref.WeakKeyDictionary()
+
+    def compile(self):
+        """Resolve factories of all registered crowd declarations."""
+        for permission, interface in self.crowds:
+            try:
+                self.getFactories(permission, interface)
+            except CrowdNotRegistered:
+                pass
 
     def getCrowdNames(self, permission, interface):
         return self.crowds.get((permission, interface), [])
@@ -61,8 +100,43 @@ class CrowdsUtility(object):
         return self.factories[crowd_name]
 
     def getFactories(self, permission, interface):
+        key = permission, interface
+        try:
+            return self._compiled[key]
+        except KeyError:
+            pass
         names = self.getCrowdNames(permission, interface)
-        return [self.getFactory(name) for name in names]
+        factories = [self.getFactory(name) for name in names]
+        self._compiled[key] = factories
+        return factories
+
+    def getCrowdFactory(self, permission, spec):
+        """Return the ICrowd adapter factory for spec, or None.
+
+        The factory is looked up in the current site manager.
+        """
+        registry = getSiteManager().adapters
+        table = self._adapters.get(registry)
+        if table is None:
+            table = self._adapters[registry] = {}
+        key = permission, spec
+        try:
+            return table[key]
+        except KeyError:
+            pass
+        factory = registry.lookup((spec, ), ICrowd, permission)
+        table[key] = factory
+        return factory
+
+    def queryCrowd(self, permission, obj):
+        """Return the crowd for permission on obj, or None.
+
+        Like queryAdapter(obj, ICrowd, name=permission).
+        """
+        factory = self.getCrowdFactory(permission, providedBy(obj))
+        if factory is None:
+            return None
+        return factory(obj)
 
 
 def getCrowdsUtility():
@@ -74,6 +148,16 @@ def getCrowdsUtility():
     return utility
 
 
+def invalidateCrowdAdapters(event):
+    """Forget looked up crowd adapters when ICrowd registrations change."""
+    provided = getattr(event.object, 'provided', None)
+    if provided is None or not provided.isOrExtends(ICrowd):
+        return
+    utility = queryUtility(ICrowdsUtility)
+    if utility is not None:
+        utility.invalidateAdapters()
+
+
 class DescriptionUtility(object):
     implements(IDescriptionUtility)
 
@@ -134,6 +218,10 @@ class Crowd(object):
     title = u''
     description = u''
 
+    # Set to True in crowds whose membership does not depend on the
+    # context, so that batch permission checks evaluate them only once.
+    context_independent = False
+
     def __init__(self, context):
         # As crowds are used in our security policy we have to trust
         # them
@@ -198,6 +286,8 @@ class EverybodyCrowd(Crowd):
     title = _(u'Everybody')
     description = _(u'Everybody, including users that are not logged in.')
 
+    context_independent = True
+
     def contains(self, principal):
         return True
 
@@ -222,6 +312,8 @@ class _GroupCrowd(Crowd):
 
     group = None # override this
 
+    context_independent = True
+
     def contains(self, principal):
         return self.group in principal.groups
 
@@ -249,6 +341,8 @@ class LoggedInCrowd(Crowd):
     title = _(u'Logged In')
     description = _(u'All logged in users.')
 
+    context_independent = True
+
     def contains(self, principal):
         from schooltool.person.interfaces import IPerson
         person = IPerson(principal, None)
@@ -260,6 +354,8 @@ class SuperUserCrowd(Crowd):
     title = _(u'Super user')
     description = _(u'The super user - owner of this SchoolTool application.')
 
+    context_independent = True
+
     def contains(self, principal):
         from schooltool.app.browser import same # XXX
         from schooltool.app.interfaces import ISchoolToolApplication
@@ -276,6 +372,8 @@ class ManagerGroupCrowd(_GroupCrowd):
 
 class ManagersCrowd(Crowd):
 
+    context_independent = True
+
     def contains(self, principal):
         managers_group = ManagerGroupCrowd(self.context)
         super_users = SuperUserCrowd(self.context)
@@ -40,6 +40,12 @@ class ICrowdsUtility(Interface):
         title=u"Permission Crowds",
         description=u"Maps (permission, interface)s to crowd names")
 
+    def compile():
+        """Resolve crowd factories of all declarations in advance."""
+
+    def invalidate():
+        """Forget compiled crowd factories."""
+
     # TODO: update interface, it's out of date
 
 
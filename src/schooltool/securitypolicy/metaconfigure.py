@@ -71,7 +71,9 @@ def registerCrowdAdapter(permission, interface):
 
 def handle_crowd(name, factory):
     """Handler for the ZCML <crowd> directive."""
-    getCrowdsUtility().factories[name] = factory
+    utility = getCrowdsUtility()
+    utility.factories[name] = factory
+    utility.invalidate()
 
 
 def handle_allow(crowdname, permission, interface):
@@ -95,6 +97,12 @@ def handle_allow(crowdname, permission, interface):
             registerCrowdAdapter(permission, interface)
 
     utility.crowds[discriminator].append(crowdname)
+    utility.invalidate()
+
+
+def compileCrowds(event=None):
+    """Compile the crowd dispatch tables once configuration is loaded."""
+    getCrowdsUtility().compile()
 
 
 def crowd(_context, name, factory):
@@ -19,12 +19,130 @@
 SchoolTool security policy.
 
 """
+import datetime
+
+from BTrees.Length import Length
 import zope.keyreference.interfaces
+from zope.annotation.interfaces import IAnnotations
+from zope.component import queryUtility
+from zope.security.checker import Checker, CheckerPublic, ProxyFactory
+from zope.security.interfaces import ForbiddenAttribute, Unauthorized
+from zope.security.management import getInteraction
+from zope.security.proxy import getChecker, removeSecurityProxy
 from zope.security.simplepolicies import ParanoidSecurityPolicy
-from zope.component import queryAdapter
 from zope.traversing.api import getParent
-from schooltool.securitypolicy.crowds import ICrowd
+from schooltool.app.interfaces import ISchoolToolApplication
+from schooltool.common import LRUCache
+from schooltool.securitypolicy.crowds import AggregateCrowd
 from schooltool.securitypolicy.metaconfigure import getCrowdsUtility
+from schooltool.term.interfaces import IDateManager
+
+
+def findCrowd(permission, obj, found=None):
+    """Find the crowd for permission on obj or its closest parent.
+
+    Returns the crowd and the list of objects from obj up to the one
+    the crowd was found for.  Pass the same dict as found to reuse
+    parent lookups for siblings.
+    """
+    if found is None:
+        found = {}
+    utility = getCrowdsUtility()
+    objects = []
+    while True:
+        if id(obj) in found:
+            crowd, rest = found[id(obj)]
+            objects.extend(rest)
+            break
+        objects.append(obj)
+        crowd = utility.queryCrowd(permission, obj)
+        if crowd is not None or obj is None:
+            break
+        obj = getParent(obj)
+    if crowd is None: # no crowds found
+        raise AssertionError('no crowd found for', obj, permission)
+    for n, o in enumerate(objects):
+        found[id(o)] = crowd, objects[n:]
+    return crowd, objects
+
+
+def crowdContains(crowd, principal, memo):
+    """Check crowd membership, remembering decisions in memo.
+
+    Crowds that declare themselves context_independent are evaluated
+    once per memo, other crowds once per context.  Aggregate crowds
+    are expanded so that their members share the memo.
+    """
+    if getattr(crowd, 'context_independent', False):
+        key = type(crowd)
+    else:
+        key = type(crowd), id(getattr(crowd, 'context', None))
+    if key in memo:
+        return memo[key][1]
+    if (isinstance(crowd, AggregateCrowd) and
+        type(crowd).contains.im_func is AggregateCrowd.contains.im_func):
+        result = False
+        for factory in crowd.crowdFactories():
+            if (getattr(factory, 'context_independent', False) and
+                factory in memo):
+                result = memo[factory][1]
+            else:
+                result = crowdContains(factory(crowd.context), principal, memo)
+            if result:
+                break
+    else:
+        result = bool(crowd.contains(principal))
+    memo[key] = crowd, result
+    return result
+
+
+def checkPermissionMany(permission, objects):
+    """Check permission on many objects in the current interaction."""
+    interaction = getInteraction()
+    check_many = getattr(interaction, 'checkPermissionMany', None)
+    if check_many is not None:
+        return check_many(permission, objects)
+    return [interaction.checkPermission(permission, obj) for obj in objects]
+
+
+def canAccessMany(objects, name, ignore_forbidden=False):
+    """Return a list telling whether attribute name of objects is accessible.
+
+    Like zope.security.canAccess, ForbiddenAttribute is raised for
+    forbidden attributes, unless ignore_forbidden is set, in which case
+    they are reported as inaccessible.
+    """
+    objects = list(objects)
+    results = [False] * len(objects)
+    by_permission = {}
+    for n, obj in enumerate(objects):
+        obj = ProxyFactory(obj)
+        if obj is removeSecurityProxy(obj):
+            results[n] = True
+            continue
+        checker = getChecker(obj)
+        permission = None
+        # Other checkers, like the combined checkers of decorated
+        # objects, do not tell all their permissions.
+        if type(checker) is Checker:
+            permission = checker.permission_id(name)
+        if permission is None or permission is CheckerPublic:
+            try:
+                checker.check_getattr(obj, name)
+                results[n] = True
+            except Unauthorized:
+                pass
+            except ForbiddenAttribute:
+                if not ignore_forbidden:
+                    raise
+            continue
+        by_permission.setdefault(permission, []).append(n)
+    for permission, indexes in by_permission.items():
+        targets = [removeSecurityProxy(objects[n]) for n in indexes]
+        for n, result in zip(indexes,
+                             checkPermissionMany(permission, targets)):
+            results[n] = result
+    return results
 
 
 class SchoolToolSecurityPolicy(ParanoidSecurityPolicy):
@@ -42,14 +160,9 @@ class SchoolToolSecurityPolicy(ParanoidSecurityPolicy):
         return self.checkByAdaptation(permission, obj)
 
     def checkByAdaptation(self, permission, obj):
-        crowd = queryAdapter(obj, ICrowd, name=permission, default=None)
         # If there is no crowd that has the given permission on this
         # object, try to look up a crowd that includes the parent.
-        while crowd is None and obj is not None:
-            obj = getParent(obj)
-            crowd = queryAdapter(obj, ICrowd, name=permission, default=None)
-        if crowd is None: # no crowds found
-            raise AssertionError('no crowd found for', obj, permission)
+        crowd, objects = findCrowd(permission, obj)
 
         for participation in self.participations:
             if crowd.contains(participation.principal):
@@ -66,6 +179,156 @@ class SchoolToolSecurityPolicy(ParanoidSecurityPolicy):
                     return True
         return False
 
+    def checkPermissionMany(self, permission, objects):
+        """Return a list of permission decisions, one for each object.
+
+        Crowds are evaluated once for every context they are found on,
+        context independent crowds once for the whole batch.
+        """
+        factories = getCrowdsUtility().getFactories(permission, None)
+        memos = [{} for participation in self.participations]
+        found = {}
+        results = []
+        for obj in objects:
+            if factories:
+                crowds = [factory(obj) for factory in factories]
+            else:
+                crowds = [findCrowd(permission, obj, found)[0]]
+            results.append(any(
+                crowdContains(crowd, participation.principal, memo)
+                for participation, memo in zip(self.participations, memos)
+                for crowd in crowds))
+        return results
+
+
+PERMISSION_GENERATION_KEY = 'schooltool.securitypolicy.PermissionGeneration'
+
+
+def queryPermissionGeneration(create=False):
+    """Return the persistent counter of changes of crowds, or None.
+
+    The counter is kept in annotations of the application, so that
+    all processes sharing the database see changes of each other.
+    """
+    app = ISchoolToolApplication(None, None)
+    annotations = IAnnotations(app, None)
+    if annotations is None:
+        return None
+    counter = annotations.get(PERMISSION_GENERATION_KEY)
+    if counter is None and create:
+        counter = annotations[PERMISSION_GENERATION_KEY] = Length()
+    return counter
+
+
+def getDecisionCacheState():
+    """Return the generation and date of decisions made now, or None.
+
+    None means that decisions must not be cached, because crowds were
+    changed in the current transaction.  Decisions are kept per date,
+    as crowds of temporal relationships depend on it.
+    """
+    counter = queryPermissionGeneration()
+    if counter is None:
+        generation = 0
+    elif counter._p_jar is None or counter._p_changed:
+        return None
+    else:
+        generation = counter()
+    dateman = queryUtility(IDateManager)
+    if dateman is not None:
+        today = dateman.today
+    else:
+        today = datetime.date.today()
+    return generation, today
+
+
+class PermissionDecisionCache(object):
+    """Process wide cache of permission decisions.
+
+    Decisions are kept per principal id, permission and key reference
+    of the object for ttl seconds.  The cache is off while ttl is 0.
+
+        >>> cache = PermissionDecisionCache(maxsize=10)
+        >>> cache.set('john', 'view', 'ref', True)
+        >>> print cache.get('john', 'view', 'ref')
+        None
+
+        >>> cache.configure(ttl=60)
+        >>> cache.set('john', 'view', 'ref', True)
+        >>> cache.get('john', 'view', 'ref')
+        True
+        >>> cache.hits, cache.misses
+        (1, 0)
+
+    Decisions are also keyed by the state returned by
+    getDecisionCacheState: the generation of the persistent counter of
+    crowd changes and the date.  A transaction that reads an older
+    generation than another transaction has seen does not store its
+    decisions, as they may be stale.
+
+        >>> cache.latest
+        0
+
+    """
+
+    def __init__(self, maxsize=10000, ttl=0):
+        self.latest = 0
+        self.configure(maxsize=maxsize, ttl=ttl)
+
+    def configure(self, maxsize=None, ttl=0):
+        if maxsize is None:
+            maxsize = self.decisions.maxsize
+        self.decisions = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    @property
+    def enabled(self):
+        return bool(self.decisions.ttl)
+
+    @property
+    def hits(self):
+        return self.decisions.hits
+
+    @property
+    def misses(self):
+        return self.decisions.misses
+
+    def get(self, principal_id, permission, ref):
+        if not self.enabled:
+            return None
+        state = getDecisionCacheState()
+        if state is None:
+            return None
+        self.latest = max(self.latest, state[0])
+        return self.decisions.get(state + (principal_id, permission, ref))
+
+    def set(self, principal_id, permission, ref, value):
+        if not self.enabled:
+            return
+        state = getDecisionCacheState()
+        if state is None or state[0] < self.latest:
+            return
+        self.latest = state[0]
+        self.decisions[state + (principal_id, permission, ref)] = value
+
+    def clear(self):
+        self.decisions.clear()
+
+
+decision_cache = PermissionDecisionCache()
+
+
+def invalidatePermissionCache(*args):
+    """Start a new generation of permission decisions.
+
+    Subscribed to events that can change crowd membership.  The
+    persistent counter is bumped even if this process does not cache
+    decisions, other processes may.
+    """
+    counter = queryPermissionGeneration(create=True)
+    if counter is not None:
+        counter.change(1)
+    decision_cache.clear()
+
 
 class CachingSecurityPolicy(ParanoidSecurityPolicy):
     """Crowd-based caching security policy."""
@@ -97,9 +360,16 @@ class CachingSecurityPolicy(ParanoidSecurityPolicy):
         result = None
         for participation in self.participations:
             cache = self.getCache(participation)
+            perm = None
             if cache is not None:
                 perm = cache['perm'].get(key, None)
-                result = max(result, perm)
+            if perm is None and (cache is None or cache['enabled']):
+                principal_id = getattr(participation.principal, 'id', None)
+                if principal_id is not None:
+                    perm = decision_cache.get(principal_id, *key)
+                    if perm is not None and cache is not None:
+                        cache['perm'][key] = perm
+            result = max(result, perm)
         return result
 
     def cache(self, participation, permission, obj, value):
@@ -110,6 +380,9 @@ class CachingSecurityPolicy(ParanoidSecurityPolicy):
         if key is None:
             return # uncacheable
         cache['perm'][key] = value
+        principal_id = getattr(participation.principal, 'id', None)
+        if principal_id is not None:
+            decision_cache.set(principal_id, permission, key[1], value)
 
     def checkPermission(self, permission, obj):
         """Return True if principal has permission on object."""
@@ -126,16 +399,9 @@ class CachingSecurityPolicy(ParanoidSecurityPolicy):
         return perm
 
     def checkByAdaptation(self, permission, obj):
-        crowd = queryAdapter(obj, ICrowd, name=permission, default=None)
         # If there is no crowd that has the given permission on this
         # object, try to look up a crowd that includes the parent.
-        objects = [obj]
-        while crowd is None and obj is not None:
-            obj = getParent(obj)
-            objects.append(obj)
-            crowd = queryAdapter(obj, ICrowd, name=permission, default=None)
-        if crowd is None: # no crowds found
-            raise AssertionError('no crowd found for', obj, permission)
+        crowd, objects = findCrowd(permission, obj)
 
         for participation in self.participations:
             if crowd.contains(participation.principal):
@@ -148,6 +414,38 @@ class CachingSecurityPolicy(ParanoidSecurityPolicy):
         else:
             return False
 
+    def checkPermissionMany(self, permission, objects):
+        """Return a list of permission decisions, one for each object.
+
+        Decisions are cached like in checkPermission.  Crowds are
+        evaluated once for every context they are found on, context
+        independent crowds once for the whole batch.
+        """
+        objects = list(objects)
+        results = [self.checkCache(permission, obj) for obj in objects]
+        factories = getCrowdsUtility().getFactories(permission, None)
+        memos = [{} for participation in self.participations]
+        found = {}
+        for n, obj in enumerate(objects):
+            if results[n] is not None:
+                continue
+            if factories:
+                crowds = [factory(obj) for factory in factories]
+                path = [obj]
+            else:
+                crowd, path = findCrowd(permission, obj, found)
+                crowds = [crowd]
+            results[n] = False
+            for participation, memo in zip(self.participations, memos):
+                perm = any(crowdContains(crowd, participation.principal, memo)
+                           for crowd in crowds)
+                for o in path:
+                    self.cache(participation, permission, o, perm)
+                if perm:
+                    results[n] = True
+                    break
+        return results
+
     def checkPermissionCrowds(self, permission, obj):
         """Check object-independent crowds."""
         factories = getCrowdsUtility().getFactories(permission, None)
@@ -42,6 +42,104 @@ def doctest_CrowdsUtility():
     """
 
 
+def doctest_CrowdsUtility_dispatch():
+    """Tests for compiled crowd dispatch of CrowdsUtility.
+
+        >>> setup.placelessSetUp()
+
+        >>> cru = CrowdsUtility()
+        >>> cru.factories['a'] = 'Factory A'
+        >>> cru.crowds[('perm', None)] = ['a']
+        >>> cru.crowds[('perm', 'iface')] = ['a', 'b']
+
+    Declarations with unknown crowds are skipped when compiling and
+    fail when looked up:
+
+        >>> cru.compile()
+        >>> cru._compiled
+        {('perm', None): ['Factory A']}
+        >>> cru.getFactories('perm', 'iface')
+        Traceback (most recent call last):
+          ...
+        CrowdNotRegistered: b
+
+    The compiled table is used until invalidated:
+
+        >>> cru.factories['a'] = 'New A'
+        >>> cru.getFactories('perm', None)
+        ['Factory A']
+        >>> cru.invalidate()
+        >>> cru.getFactories('perm', None)
+        ['New A']
+
+    Crowd adapter factories are looked up once per specification and
+    forgotten when crowd adapters are registered:
+
+        >>> from zope.interface import Interface
+        >>> from schooltool.securitypolicy.interfaces import ICrowd
+        >>> class IThing(Interface):
+        ...     pass
+        >>> class Thing(object):
+        ...     implements(IThing)
+        >>> class ThingCrowd(object):
+        ...     def __init__(self, context):
+        ...         self.context = context
+
+        >>> from zope.interface.interfaces import IRegistrationEvent
+        >>> from zope.component import provideHandler, provideUtility
+        >>> from zope.component import getGlobalSiteManager
+        >>> from schooltool.securitypolicy.crowds import (
+        ...     invalidateCrowdAdapters)
+        >>> provideHandler(invalidateCrowdAdapters,
+        ...                [IRegistrationEvent])
+        >>> provideUtility(cru, ICrowdsUtility)
+
+        >>> print cru.queryCrowd('perm', Thing())
+        None
+        >>> gsm = getGlobalSiteManager()
+        >>> gsm.registerAdapter(ThingCrowd, (IThing, ), ICrowd, name='perm')
+        >>> cru.queryCrowd('perm', Thing())
+        <...ThingCrowd object at ...>
+        >>> [table.values() for table in cru._adapters.values()]
+        [[<class '...ThingCrowd'>]]
+
+    Other adapter registrations leave the tables alone:
+
+        >>> gsm.registerAdapter(ThingCrowd, (IThing, ), IThing)
+        >>> [table.values() for table in cru._adapters.values()]
+        [[<class '...ThingCrowd'>]]
+
+    Crowds are looked up in the current site manager, so crowds
+    registered locally apply inside the site only:
+
+        >>> from zope.component.globalregistry import BaseGlobalComponents
+        >>> from zope.component.hooks import setSite, setHooks, resetHooks
+        >>> setHooks()
+        >>> class LocalThingCrowd(ThingCrowd):
+        ...     pass
+        >>> local = BaseGlobalComponents('local', bases=(gsm, ))
+        >>> class SiteStub(object):
+        ...     def getSiteManager(self):
+        ...         return local
+
+        >>> setSite(SiteStub())
+        >>> cru.queryCrowd('perm', Thing())
+        <...ThingCrowd object at ...>
+        >>> local.registerAdapter(LocalThingCrowd, (IThing, ), ICrowd,
+        ...                       name='perm')
+        >>> cru.queryCrowd('perm', Thing())
+        <...LocalThingCrowd object at ...>
+
+        >>> setSite(None)
+        >>> cru.queryCrowd('perm', Thing())
+        <...ThingCrowd object at ...>
+        >>> resetHooks()
+
+        >>> setup.placelessTearDown()
+
+    """
+
+
 def doctest_getCrowdsUtility():
     """Doctest for getCrowdsUtility.
 
@@ -197,6 +197,323 @@ def test_SchoolToolSecurityPolicy_checkCrowds():
     """
 
 
+def test_checkPermissionMany():
+    """Tests for checkPermissionMany of the security policies.
+
+        >>> from schooltool.securitypolicy import policy
+        >>> from schooltool.securitypolicy.crowds import AggregateCrowd
+        >>> from schooltool.securitypolicy.crowds import CrowdsUtility
+        >>> from schooltool.securitypolicy.interfaces import ICrowdsUtility
+        >>> cru = CrowdsUtility()
+        >>> provideUtility(cru, ICrowdsUtility)
+
+    Crowds log their evaluations.  The manager crowd does not depend
+    on the context:
+
+        >>> class ManagerCrowd(Crowd):
+        ...     context_independent = True
+        ...     def contains(self, principal):
+        ...         print 'manager?', principal
+        ...         return principal == 'manager'
+        >>> class OwnerCrowd(Crowd):
+        ...     def contains(self, principal):
+        ...         print 'owner of %s?' % self.context.name, principal
+        ...         return principal == self.context.name
+        >>> class ObjCrowd(AggregateCrowd):
+        ...     def crowdFactories(self):
+        ...         return [ManagerCrowd, OwnerCrowd]
+        >>> provideAdapter(ObjCrowd, (IObj,), ICrowd, 'perm')
+
+        >>> class Participation(object):
+        ...     interaction = None
+        ...     def __init__(self, principal):
+        ...         self.principal = principal
+
+    Objects with their own crowds are checked one by one, but the
+    manager crowd is evaluated once:
+
+        >>> objects = []
+        >>> for name in ['john', 'pete', 'ann']:
+        ...     obj = Obj()
+        ...     obj.name = name
+        ...     objects.append(obj)
+
+        >>> for factory in [policy.SchoolToolSecurityPolicy,
+        ...                 policy.CachingSecurityPolicy]:
+        ...     sp = factory(Participation('pete'))
+        ...     print sp.checkPermissionMany('perm', objects)
+        manager? pete
+        owner of john? pete
+        owner of pete? pete
+        owner of ann? pete
+        [False, True, False]
+        manager? pete
+        owner of john? pete
+        owner of pete? pete
+        owner of ann? pete
+        [False, True, False]
+
+        >>> sp = policy.CachingSecurityPolicy(Participation('manager'))
+        >>> sp.checkPermissionMany('perm', objects)
+        manager? manager
+        [True, True, True]
+
+    Objects that get their crowd from a common parent share a single
+    evaluation:
+
+        >>> parent = Obj()
+        >>> parent.name = 'parent'
+        >>> children = []
+        >>> for n in range(3):
+        ...     child = AnotherObj()
+        ...     child.__parent__ = parent
+        ...     children.append(child)
+
+        >>> sp = policy.CachingSecurityPolicy(Participation('parent'))
+        >>> sp.checkPermissionMany('perm', children)
+        manager? parent
+        owner of parent? parent
+        [True, True, True]
+
+    Decisions match checkPermission:
+
+        >>> sp = policy.SchoolToolSecurityPolicy(Participation('ann'))
+        >>> [sp.checkPermission('perm', obj) for obj in objects]
+        manager? ann
+        owner of john? ann
+        manager? ann
+        owner of pete? ann
+        manager? ann
+        owner of ann? ann
+        [False, False, True]
+
+    """
+
+
+def test_canAccessMany():
+    """Tests for canAccessMany.
+
+        >>> from zope.location.location import LocationProxy
+        >>> from zope.security import canAccess
+        >>> from zope.security.checker import Checker, defineChecker
+        >>> from zope.security.management import setSecurityPolicy
+        >>> from zope.security.management import newInteraction, endInteraction
+        >>> from schooltool.securitypolicy import policy
+        >>> from schooltool.securitypolicy.crowds import CrowdsUtility
+        >>> from schooltool.securitypolicy.interfaces import ICrowdsUtility
+        >>> provideUtility(CrowdsUtility(), ICrowdsUtility)
+
+        >>> class OwnerCrowd(Crowd):
+        ...     def contains(self, principal):
+        ...         return principal == self.context.name
+        >>> provideAdapter(OwnerCrowd, (IObj,), ICrowd, 'perm')
+
+        >>> class Secured(Obj):
+        ...     def __init__(self, name):
+        ...         self.name = name
+        >>> defineChecker(Secured, Checker({'title': 'perm'}))
+
+        >>> endInteraction()
+        >>> old_policy = setSecurityPolicy(policy.SchoolToolSecurityPolicy)
+        >>> newInteraction(ParticipationStub())
+
+        >>> objects = [Secured('john'), Secured('guest')]
+        >>> policy.canAccessMany(objects, 'title')
+        [False, True]
+
+    Decorated objects have combined checkers, they are checked like
+    canAccess does:
+
+        >>> proxied = LocationProxy(Secured('guest'), None, 'guest')
+        >>> canAccess(proxied, 'title')
+        True
+        >>> policy.canAccessMany([proxied, objects[0]], 'title')
+        [True, False]
+
+    Forbidden attributes raise ForbiddenAttribute, unless asked to
+    ignore them:
+
+        >>> policy.canAccessMany(objects, 'name')
+        Traceback (most recent call last):
+          ...
+        ForbiddenAttribute: ('name', <...Secured object at ...>)
+        >>> policy.canAccessMany(objects, 'name', ignore_forbidden=True)
+        [False, False]
+
+        >>> endInteraction()
+        >>> ignore = setSecurityPolicy(old_policy)
+
+    """
+
+
+def test_CachingSecurityPolicy_decision_cache():
+    """Tests for the process wide permission decision cache.
+
+        >>> import zope.keyreference.interfaces
+        >>> from schooltool.securitypolicy import policy
+        >>> from schooltool.securitypolicy.crowds import CrowdsUtility
+        >>> from schooltool.securitypolicy.interfaces import ICrowdsUtility
+        >>> cru = CrowdsUtility()
+        >>> provideUtility(cru, ICrowdsUtility)
+
+        >>> provideAdapter(lambda obj: 'ref-%s' % obj.name, [IObj],
+        ...                zope.keyreference.interfaces.IKeyReference)
+
+        >>> class PrincipalStub(object):
+        ...     def __init__(self, id):
+        ...         self.id = id
+        >>> class NamedParticipation(object):
+        ...     interaction = None
+        ...     def __init__(self, id):
+        ...         self.principal = PrincipalStub(id)
+
+        >>> class CountingCrowd(Crowd):
+        ...     checks = 0
+        ...     def contains(self, principal):
+        ...         CountingCrowd.checks += 1
+        ...         return principal.id == 'john'
+        >>> cru.factories['counting'] = CountingCrowd
+        >>> cru.crowds[('perm', None)] = ['counting']
+
+        >>> obj = Obj()
+        >>> obj.name = 'obj'
+
+    The cache is off by default, so every request checks the crowds:
+
+        >>> cache = policy.decision_cache
+        >>> cache.enabled
+        False
+        >>> policy.CachingSecurityPolicy(
+        ...     NamedParticipation('john')).checkPermission('perm', obj)
+        True
+        >>> policy.CachingSecurityPolicy(
+        ...     NamedParticipation('john')).checkPermission('perm', obj)
+        True
+        >>> CountingCrowd.checks
+        2
+
+    Once a ttl is configured, decisions outlive the request:
+
+        >>> cache.configure(ttl=60)
+        >>> for principal_id in ['john', 'pete', 'john', 'pete']:
+        ...     sp = policy.CachingSecurityPolicy(
+        ...         NamedParticipation(principal_id))
+        ...     print principal_id, sp.checkPermission('perm', obj)
+        john True
+        pete False
+        john True
+        pete False
+        >>> CountingCrowd.checks
+        4
+        >>> cache.hits, cache.misses
+        (2, 2)
+
+    Decisions are kept per generation of a persistent counter in the
+    application, so that changes committed by other processes are seen.
+
+        >>> import datetime
+        >>> import transaction
+        >>> from ZODB.DB import DB
+        >>> from zope.interface import alsoProvides
+        >>> from zope.annotation.interfaces import IAnnotations
+        >>> from schooltool.app.interfaces import ISchoolToolApplication
+        >>> db = DB(None)
+        >>> root = db.open().root()
+        >>> alsoProvides(root, IAnnotations)
+        >>> current = [root]
+        >>> provideAdapter(lambda ignored: current[0], [None],
+        ...                ISchoolToolApplication)
+
+        >>> def check(principal_id='john'):
+        ...     sp = policy.CachingSecurityPolicy(
+        ...         NamedParticipation(principal_id))
+        ...     result = sp.checkPermission('perm', obj)
+        ...     print result, CountingCrowd.checks
+
+    Changing an access control setting starts a new generation.  While
+    the change is not committed, decisions are not cached:
+
+        >>> policy.invalidatePermissionCache()
+        >>> check()
+        True 5
+        >>> check()
+        True 6
+        >>> transaction.commit()
+        >>> counter = root[policy.PERMISSION_GENERATION_KEY]
+        >>> counter()
+        1
+        >>> check()
+        True 7
+        >>> check()
+        True 7
+
+    Another process changes crowds:
+
+        >>> other_manager = transaction.TransactionManager()
+        >>> other_root = db.open(other_manager).root()
+        >>> alsoProvides(other_root, IAnnotations)
+        >>> other_root[policy.PERMISSION_GENERATION_KEY].change(1)
+        >>> other_manager.commit()
+
+    A request that starts after it does not see the old decisions:
+
+        >>> transaction.begin()
+        <transaction...>
+        >>> counter()
+        2
+        >>> check()
+        True 8
+
+    A request of a transaction that started before the change reads the
+    old generation.  Decisions of that generation are still correct for
+    it, but it does not store new ones, they may be stale:
+
+        >>> other_manager.begin()
+        <transaction...>
+        >>> root[policy.PERMISSION_GENERATION_KEY].change(1)
+        >>> transaction.commit()
+        >>> check()
+        True 9
+        >>> cache.latest
+        3
+
+        >>> current[0] = other_root
+        >>> other_root[policy.PERMISSION_GENERATION_KEY]()
+        2
+        >>> check()
+        True 9
+        >>> check('pete')
+        False 10
+        >>> check('pete')
+        False 11
+        >>> current[0] = root
+
+    Decisions are also kept per date, crowds of temporal relationships
+    depend on it:
+
+        >>> from zope.interface import implements
+        >>> from schooltool.term.interfaces import IDateManager
+        >>> class DateManagerStub(object):
+        ...     implements(IDateManager)
+        ...     today = datetime.date(2026, 1, 1)
+        >>> dateman = DateManagerStub()
+        >>> provideUtility(dateman, IDateManager)
+        >>> check()
+        True 12
+        >>> check()
+        True 12
+        >>> dateman.today = datetime.date(2026, 1, 2)
+        >>> check()
+        True 13
+
+        >>> other_manager.abort()
+        >>> transaction.abort()
+        >>> db.close()
+        >>> cache.configure(ttl=0)
+
+    """
+
+
 def setUp(test=None):
     setup.placelessSetUp()
 
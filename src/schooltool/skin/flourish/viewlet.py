@@ -33,6 +33,7 @@ from schooltool.common.inlinept import InlineViewPageTemplate
 from schooltool.skin.flourish.interfaces import IViewlet, IViewletManager
 from schooltool.skin.flourish.interfaces import IManagerViewlet
 from schooltool.skin.flourish.sorting import dependency_sort
+from schooltool.securitypolicy.policy import canAccessMany
 
 
 class Viewlet(BrowserPage):
@@ -159,13 +160,10 @@ class ViewletManagerBase(ContentProvider):
         return viewlets
 
     def filterViewlets(self, viewlets):
-        def can_access(item):
-            name, viewlet = item
-            try:
-                return zope.security.canAccess(viewlet, 'render')
-            except zope.security.interfaces.ForbiddenAttribute:
-                return False
-        viewlets = filter(can_access, viewlets)
+        viewlets = list(viewlets)
+        accessible = canAccessMany([v for n, v in viewlets], 'render',
+                                   ignore_forbidden=True)
+        viewlets = [item for item, ok in zip(viewlets, accessible) if ok]
 
         names = set([n for n, v in viewlets])
         has_required = lambda (n, v): set(v.requires).issubset(names)
@@ -309,6 +309,7 @@ class IndexedTable(IndexedTableFormatter, Table):
             sort_on=self._sort_on,
             prefix=self.prefix,
             group_by_column=self.group_by_column)
+        self.sortItemsByBatch(formatter)
         formatter.html_id = self.html_id
         formatter.view = self
         formatter.cssClasses.update(dict(self.css_classes))
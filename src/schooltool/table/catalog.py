@@ -18,6 +18,9 @@
 """Catalog indexing extensions for tabling."""
 
 from persistent import Persistent
+from BTrees import IFBTree
+from BTrees.IOBTree import IOBTree
+from BTrees.OOBTree import OOBTree
 
 from zope.interface import implements, implementsOnly
 from zope.cachedescriptors.property import Lazy
@@ -25,9 +28,12 @@ from zope.component import getUtility
 from zope.container.contained import Contained
 from zope.catalog.interfaces import ICatalogIndex
 from zope.catalog.interfaces import ICatalog
+from zope.catalog.attribute import AttributeIndex
 from zope.intid.interfaces import IIntIds
 
 from zc.catalog.index import SetIndex, ValueIndex
+from zc.table.interfaces import IColumnSortedItems
+from zc.table.table import ColumnSortedItems
 from zc.catalog.interfaces import IValueIndex, ISetIndex
 from zc.catalog.interfaces import IExtentCatalog
 
@@ -92,6 +98,100 @@ class ConvertingSetIndex(ConvertingSetIndexMixin, SetIndex, Contained):
     implements(IConvertingSetIndex)
 
 
+def trigrams(text):
+    """Return the set of three character substrings of text."""
+    return set([text[i:i+3] for i in range(len(text) - 2)])
+
+
+class ITrigramIndex(ICatalogIndex):
+    """Index of lowercased text for substring search."""
+
+
+class TrigramIndexBase(Persistent):
+    """Index of values by their trigrams.
+
+    Searching for a substring intersects the documents of its trigrams,
+    and checks the candidates against the indexed text.
+    """
+
+    def __init__(self, *args, **kw):
+        super(TrigramIndexBase, self).__init__(*args, **kw)
+        self.clear()
+
+    def clear(self):
+        self.documents_to_values = IOBTree()
+        self.trigrams_to_documents = OOBTree()
+
+    def index_doc(self, docid, value):
+        text = unicode(value).lower()
+        if self.documents_to_values.get(docid) == text:
+            return
+        self.unindex_doc(docid)
+        self.documents_to_values[docid] = text
+        for trigram in trigrams(text):
+            docids = self.trigrams_to_documents.get(trigram)
+            if docids is None:
+                docids = self.trigrams_to_documents[trigram] = \
+                    IFBTree.TreeSet()
+            docids.insert(docid)
+
+    def unindex_doc(self, docid):
+        text = self.documents_to_values.pop(docid, None)
+        if text is None:
+            return
+        for trigram in trigrams(text):
+            docids = self.trigrams_to_documents.get(trigram)
+            if docids is None:
+                continue
+            docids.remove(docid)
+            if not docids:
+                del self.trigrams_to_documents[trigram]
+
+    def apply(self, query):
+        """Return documents containing the query string, ignoring case."""
+        query = query.lower()
+        keys = trigrams(query)
+        if not keys:
+            # Too short to have trigrams, scan all values.
+            return IFBTree.TreeSet(
+                [docid for docid, text in self.documents_to_values.items()
+                 if query in text])
+        postings = []
+        for trigram in keys:
+            docids = self.trigrams_to_documents.get(trigram)
+            if docids is None:
+                return IFBTree.TreeSet()
+            postings.append(docids)
+        postings.sort(key=len)
+        candidates = postings[0]
+        for docids in postings[1:]:
+            candidates = IFBTree.intersection(candidates, docids)
+            if not candidates:
+                return IFBTree.TreeSet()
+        if len(query) == 3:
+            return IFBTree.TreeSet(candidates)
+        return IFBTree.TreeSet(
+            [docid for docid in candidates
+             if query in self.documents_to_values[docid]])
+
+
+class TrigramIndex(AttributeIndex, TrigramIndexBase, Contained):
+    """Trigram index of an attribute of objects."""
+    implements(ITrigramIndex)
+
+
+def substringSearch(catalog, name, searchstr):
+    """Return documents whose value in index name contains searchstr.
+
+    Uses the trigram index of the values, '<name>_trigrams', returns
+    None if the catalog has none.
+    """
+    trigram_name = '%s_trigrams' % name
+    if trigram_name not in catalog:
+        return None
+    return catalog[trigram_name].apply(searchstr)
+
+
 class IndexedFilterWidget(FilterWidget):
 
     search_index = 'title'
@@ -101,9 +201,13 @@ class IndexedFilterWidget(FilterWidget):
         return ICatalog(self.source)
 
     def filter(self, items):
-        index = self.catalog[self.search_index]
         if 'SEARCH' in self.request and 'CLEAR_SEARCH' not in self.request:
             searchstr = self.request['SEARCH'].lower()
+            found = substringSearch(self.catalog, self.search_index,
+                                    searchstr)
+            if found is not None:
+                return [item for item in items if item['id'] in found]
+            index = self.catalog[self.search_index]
             results = []
             for item in items:
                 title = index.documents_to_values[item['id']]
@@ -116,6 +220,30 @@ class IndexedFilterWidget(FilterWidget):
         return results
 
 
+class IndexedSortedItems(ColumnSortedItems):
+    """Sorted index dicts of an indexed table.
+
+    The end of the requested slice is passed on to the sorters, so
+    indexed columns sort only the items up to the end of the batch.
+    """
+
+    def __getitem__(self, key):
+        if not self.sort_on:
+            return super(IndexedSortedItems, self).__getitem__(key)
+        if isinstance(key, slice):
+            stop = key.stop
+            if key.step is not None and key.step < 0:
+                stop = None
+        else:
+            stop = key + 1
+        if stop is not None and stop <= 0:
+            stop = None
+        sorters = self.sorters
+        items = sorters[0](
+            self.items, self.formatter, 0, stop, sorters[1:])
+        return items[key]
+
+
 class IndexedTableFormatter(SchoolToolTableFormatter):
     implementsOnly(IIndexedTableFormatter)
 
@@ -191,6 +319,13 @@ class IndexedTableFormatter(SchoolToolTableFormatter):
             batch_start=self.batch.start, batch_size=self.batch.size,
             sort_on=self._sort_on,
             prefix=self.prefix)
+        self.sortItemsByBatch(formatter)
         formatter.cssClasses.update(dict(self.css_classes))
         return formatter
 
+    def sortItemsByBatch(self, formatter):
+        """Make the formatter sort only the items it shows."""
+        items = formatter.items
+        if IColumnSortedItems.providedBy(items):
+            formatter.setItems(IndexedSortedItems(items._items, items.sort_on))
+
@@ -19,6 +19,7 @@
 More columns for tables.
 """
 import datetime
+import heapq
 
 from zope.app.dependable.interfaces import IDependable
 from zope.interface import implementer, implements, classImplements
@@ -294,17 +295,35 @@ class MultiStateColumn(zc.table.column.Column):
 class IndexedGetterColumn(zc.table.column.GetterColumn):
     implements(IIndexedColumn, zc.table.interfaces.ISortableColumn)
 
+    # Sort keys are the values of the index, so items can be read
+    # in the order of the index.
+    sorts_by_index_value = True
+
     def __init__(self, **kwargs):
         self.index = kwargs.pop('index')
         super(IndexedGetterColumn, self).__init__(**kwargs)
 
     def _sort(self, items, formatter, start, stop, sorters, multiplier):
         if self.subsort and sorters:
-            items = sorters[0](items, formatter, start, stop, sorters[1:])
+            # Subsorting relies on all items being sorted.
+            items = sorters[0](items, formatter, start, None, sorters[1:])
+            subsorted = True
         else:
             items = list(items) # don't mutate original
+            subsorted = False
         getSortKey = self.getSortKey
 
+        if stop is not None and stop < len(items):
+            # Only the first stop items are needed.
+            if not subsorted:
+                first = self._firstInIndexOrder(items, stop, multiplier)
+                if first is not None:
+                    return first
+            key = lambda item: getSortKey(item, formatter)
+            if multiplier < 0:
+                return heapq.nlargest(stop, items, key=key)
+            return heapq.nsmallest(stop, items, key=key)
+
         # Patch the SortableColum._sort to use both cmp and key for sorting.
         # This reduces usage of getSortKey drastically on large datasets.
         items.sort(
@@ -313,6 +332,37 @@ class IndexedGetterColumn(zc.table.column.GetterColumn):
 
         return items
 
+    def _firstInIndexOrder(self, items, stop, multiplier):
+        """Return the first stop items, read in the order of index values.
+
+        Possible only when every indexed document is one of the items,
+        otherwise returns None.
+        """
+        if not self.sorts_by_index_value or not items:
+            return None
+        index = items[0]['catalog'][self.index]
+        values_to_documents = getattr(index, 'values_to_documents', None)
+        if values_to_documents is None:
+            return None
+        by_id = dict([(item['id'], item) for item in items])
+        if (len(by_id) != len(items) or
+            len(by_id) != len(index.documents_to_values)):
+            return None
+        if multiplier < 0:
+            documents = reversed(values_to_documents.values())
+        else:
+            documents = values_to_documents.values()
+        result = []
+        for ids in documents:
+            for id in ids:
+                item = by_id.get(id)
+                if item is None:
+                    return None
+                result.append(item)
+                if len(result) == stop:
+                    return result
+        return result
+
     def renderCell(self, item, formatter):
         item = queryUtility(IIntIds).getObject(item['id'])
         return super(IndexedGetterColumn, self).renderCell(item, formatter)
@@ -325,6 +375,8 @@ class IndexedGetterColumn(zc.table.column.GetterColumn):
 
 class IndexedLocaleAwareGetterColumn(IndexedGetterColumn):
 
+    sorts_by_index_value = False
+
     _cached_collator = None
 
     def getSortKey(self, item, formatter):
@@ -38,6 +38,7 @@ from zc.table.column import GetterColumn
 from schooltool.app.interfaces import IApplicationPreferences
 from schooltool.app.interfaces import ISchoolToolApplication
 from schooltool.common import stupid_form_key
+from schooltool.securitypolicy.policy import canAccessMany
 from schooltool.skin import flourish
 from schooltool.table.batch import Batch
 from schooltool.table.interfaces import IFilterWidget
@@ -343,6 +344,15 @@ class SchoolToolTableFormatter(object):
     def items(self):
         return self.source.values()
 
+    def accessible(self, items, name='title'):
+        """Return items whose attribute name the user can access.
+
+        Permissions of all items are checked in a single batch.
+        """
+        items = list(items)
+        return [item for item, ok in zip(items, canAccessMany(items, name))
+                if ok]
+
     def ommit(self, items, ommited_items):
         if not ommited_items:
             return items
@@ -113,6 +113,75 @@ def doctest_IndexedFilterWidget():
         >>> request.form['SEARCH']
         ''
 
+    When the catalog has a trigram index of titles, it is searched
+    instead of looking at every item.
+
+        >>> class TrigramIndexStub(object):
+        ...     def apply(self, query):
+        ...         print 'searching for', repr(query)
+        ...         return set([7])
+        >>> catalog['title_trigrams'] = TrigramIndexStub()
+
+        >>> request.form = {'SEARCH': 'Et'}
+        >>> widget.filter(items)
+        searching for 'et'
+        [{'id': 7}]
+
+    """
+
+
+def doctest_TrigramIndex():
+    """Tests for TrigramIndex.
+
+        >>> from schooltool.table.catalog import TrigramIndex, trigrams
+        >>> sorted(trigrams(u'abcd'))
+        [u'abc', u'bcd']
+
+        >>> class Titled(object):
+        ...     def __init__(self, title):
+        ...         self.title = title
+
+        >>> index = TrigramIndex('title')
+        >>> for docid, title in enumerate([u'Alpha', u'Lambda', u'Beta',
+        ...                                u'Alphabet']):
+        ...     index.index_doc(docid, Titled(title))
+
+    Values are indexed lowercased.
+
+        >>> index.documents_to_values[3]
+        u'alphabet'
+        >>> list(index.trigrams_to_documents[u'alp'])
+        [0, 3]
+
+    Searching intersects documents of the query trigrams and checks
+    the candidates, so trigrams in a different order do not match.
+
+        >>> list(index.apply(u'ALPH'))
+        [0, 3]
+        >>> list(index.apply(u'bet'))
+        [2, 3]
+        >>> list(index.apply(u'phalp'))
+        []
+        >>> list(index.apply(u'xyz'))
+        []
+
+    Queries shorter than a trigram scan the values.
+
+        >>> list(index.apply(u'ab'))
+        [3]
+
+    Reindexing replaces the trigrams of a document, unused trigrams
+    are dropped.
+
+        >>> index.index_doc(2, Titled(u'Gamma'))
+        >>> list(index.apply(u'bet'))
+        [3]
+        >>> index.index_doc(3, Titled(None))
+        >>> list(index.apply(u'bet'))
+        []
+        >>> u'bet' in index.trigrams_to_documents
+        False
+
     """
 
 
@@ -157,6 +226,104 @@ def doctest_IndexedGetterColumn():
     """
 
 
+def doctest_IndexedGetterColumn_sort_first():
+    """Tests for sorting the first items with IndexedGetterColumn.
+
+        >>> from zc.catalog.index import ValueIndex
+        >>> from schooltool.table.column import IndexedGetterColumn
+        >>> column = IndexedGetterColumn(index='title',
+        ...                              getter=lambda i, f: i.title)
+
+        >>> index = ValueIndex()
+        >>> catalog = {'title': index}
+        >>> for id, title in enumerate(['Cecil', 'Alice', 'Dora', 'Bob',
+        ...                             'Alice']):
+        ...     index.index_doc(id, title)
+        >>> items = [{'id': id, 'catalog': catalog} for id in range(5)]
+
+        >>> def titles(items):
+        ...     return [index.documents_to_values[item['id']]
+        ...             for item in items]
+
+    Sorters pass the end of the requested items as stop, and -1 as
+    the multiplier when sorting in reverse.  Without a stop all items
+    are sorted.
+
+        >>> titles(column._sort(items, None, 0, None, [], 1))
+        ['Alice', 'Alice', 'Bob', 'Cecil', 'Dora']
+
+    When all the indexed documents are sorted, only the first ones are
+    read in the order of the index values.
+
+        >>> def getSortKey(item, formatter):
+        ...     print 'sort key of', item['id']
+        ...     return IndexedGetterColumn.getSortKey(column, item, formatter)
+        >>> column.getSortKey = getSortKey
+
+        >>> result = column._sort(items, None, 0, 3, [], 1)
+        >>> [item['id'] for item in result]
+        [1, 4, 3]
+        >>> titles(column._sort(items, None, 0, 2, [], -1))
+        ['Dora', 'Cecil']
+
+    Filtered items are picked with a heap instead.
+
+        >>> del column.getSortKey
+        >>> filtered = items[1:]
+        >>> titles(column._sort(filtered, None, 0, 2, [], 1))
+        ['Alice', 'Alice']
+        >>> titles(column._sort(filtered, None, 0, 2, [], -1))
+        ['Dora', 'Bob']
+
+    Locale aware columns do not sort by the index values, so they use
+    the heap too.
+
+        >>> from schooltool.table.column import IndexedLocaleAwareGetterColumn
+        >>> IndexedLocaleAwareGetterColumn.sorts_by_index_value
+        False
+
+    """
+
+
+def doctest_IndexedSortedItems():
+    """Tests for IndexedSortedItems.
+
+        >>> from schooltool.table.catalog import IndexedSortedItems
+
+        >>> class ColumnStub(object):
+        ...     def sort(self, items, formatter, start, stop, sorters):
+        ...         print 'sorting up to', stop
+        ...         return sorted(items)[:stop]
+        >>> class FormatterStub(object):
+        ...     columns_by_name = {'title': ColumnStub()}
+
+        >>> items = IndexedSortedItems([5, 3, 1, 4, 2], [('title', False)])
+        >>> items.setFormatter(FormatterStub())
+
+    The end of a slice is passed to the sorter.
+
+        >>> items[1:3]
+        sorting up to 3
+        [2, 3]
+        >>> items[0]
+        sorting up to 1
+        1
+
+    Open ended slices and negative indexes need all the items sorted.
+
+        >>> items[3:]
+        sorting up to None
+        [4, 5]
+        >>> items[-1]
+        sorting up to None
+        5
+        >>> list(items)
+        sorting up to None
+        [1, 2, 3, 4, 5]
+
+    """
+
+
 def doctest_IndexedLocaleAwareGetterColumn():
     """Tests for IndexedLocaleAwareGetterColumn.
 
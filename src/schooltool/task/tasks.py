@@ -51,6 +51,7 @@ from schooltool.common.traceback import format_html_exception
 from schooltool.common import HTMLToText
 from schooltool.person.interfaces import IPerson
 from schooltool.securitypolicy.crowds import Crowd
+from schooltool.table.catalog import TrigramIndex
 from schooltool.task.celery import open_schooltool_db
 from schooltool.task.interfaces import IRemoteTask, ITaskContainer
 from schooltool.task.interfaces import IMessage, IMessageContainer
@@ -700,13 +701,14 @@ class OnTaskFailed(TaskFailedNotification):
 
 
 class MessageCatalog(AttributeCatalog):
-    version = '1.1 - catalog recipient ids'
+    version = '1.2 - title trigram index'
     interface = IMessage
     attributes = ('sender_id', 'title', 'group', 'created_on', 'updated_on')
 
     def setIndexes(self, catalog):
         super(MessageCatalog, self).setIndexes(catalog)
         catalog['recipient_ids'] = SetIndex('recipient_ids')
+        catalog['title_trigrams'] = TrigramIndex('title')
 
 
 getMessageCatalog = MessageCatalog.get
@@ -42,12 +42,22 @@ class ITerm(IDateRange, IContained):
     title = zope.schema.TextLine(
         title=_("Title"))
 
+    schooldays_version = Attribute(
+        """A number that changes whenever schooldays of the term change.""")
+
     def isSchoolday(date):
         """Return whether the date is a schoolday.
 
         Raises a ValueError if the date is outside of the term covered.
         """
 
+    def iterSchooldays(dates=None):
+        """Iterate over schooldays of the term in chronological order.
+
+        If dates (an IDateRange) is given, only schooldays within it
+        are returned.
+        """
+
 
 class ITermWrite(Interface):
     """A term is a set of school days inside a given date range.
@@ -96,6 +106,12 @@ class ITermWrite(Interface):
         method, or the calendar module: 0 is Monday, 1 is Tuesday, etc.
         """
 
+    def addDates(dates):
+        """Mark all days of the term within an IDateRange as schooldays."""
+
+    def removeDates(dates):
+        """Mark all days of the term within an IDateRange as holidays."""
+
 
 class ITermContainer(IContainer, ILocation):
     """A container for terms.
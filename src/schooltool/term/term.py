@@ -20,7 +20,7 @@ Term implementation
 """
 import persistent
 import pytz
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import zope.interface
 from zope.event import notify
@@ -75,11 +75,18 @@ class EmergencyDayEvent(object):
 class Term(DateRange, contained.Contained, persistent.Persistent):
     zope.interface.implements(interfaces.ITerm, interfaces.ITermWrite)
 
+    # Bumped on every change of schooldays, lets others cache
+    # information derived from them.
+    schooldays_version = 0
+
     def __init__(self, title, first, last):
         self.title = title
         self._first = first
         self._last = last
-        self._schooldays = set()
+        # Schooldays are stored as a bitmap: bit N is set when the date
+        # N days after _schooldays_origin is a schoolday.
+        self._schooldays_origin = first
+        self._schooldays = 0
         if last < first:
             raise ValueError("Last date %r less than first date %r" %
                              (last, first))
@@ -99,6 +106,7 @@ class Term(DateRange, contained.Contained, persistent.Persistent):
 
         notify(TermBeforeChangeEvent(self, old_dates, new_dates))
         self._first = new_first_date
+        self._rebaseSchooldays(new_first_date)
         notify(TermAfterChangeEvent(self, old_dates, new_dates))
 
     @property
@@ -123,39 +131,100 @@ class Term(DateRange, contained.Contained, persistent.Persistent):
             raise ValueError("Date %r not in term [%r, %r]" %
                              (date, self.first, self.last))
 
+    def _rebaseSchooldays(self, date):
+        """Make sure the schoolday bitmap can hold bits for date."""
+        shift = (self._schooldays_origin - date).days
+        if shift > 0:
+            self._schooldays <<= shift
+            self._schooldays_origin = date
+
+    def _dateBit(self, date):
+        return 1 << (date - self._schooldays_origin).days
+
+    def _rangeMask(self, first, last, weekdays=range(7)):
+        """Return a bitmap of days in [first, last] falling on weekdays."""
+        if last < first:
+            return 0
+        week = 0
+        for n in range(7):
+            if (first.weekday() + n) % 7 in weekdays:
+                week |= 1 << n
+        days = (last - first).days + 1
+        weeks = days // 7 + 1
+        # Repeat the 7 bit pattern once per week.
+        mask = week * (((1 << (7 * weeks)) - 1) // 0x7f)
+        mask &= (1 << days) - 1
+        return mask << (first - self._schooldays_origin).days
+
+    def _updateSchooldays(self, bits):
+        if bits != self._schooldays:
+            self._schooldays = bits
+            self.schooldays_version += 1
+
     def isSchoolday(self, date):
         self._validate(date)
-        if date in self._schooldays:
-            return True
-        return False
+        return bool(self._schooldays & self._dateBit(date))
+
+    def iterSchooldays(self, dates=None):
+        """Iterate over schooldays of the term.
+
+        If `dates` (an IDateRange) is given, only schooldays that fall
+        within it are returned.
+        """
+        first, last = self.first, self.last
+        if dates is not None:
+            first, last = max(first, dates.first), min(last, dates.last)
+        if last < first:
+            return
+        offset = (first - self._schooldays_origin).days
+        bits = self._schooldays >> offset
+        bits &= (1 << ((last - first).days + 1)) - 1
+        n = 0
+        while bits:
+            if not bits & 0xff:
+                # Skip runs of holidays eight days at a time.
+                bits >>= 8
+                n += 8
+                continue
+            if bits & 1:
+                yield first + timedelta(n)
+            bits >>= 1
+            n += 1
 
     def add(self, date):
         self._validate(date)
-        self._schooldays.add(date)
-        self._schooldays = self._schooldays  # persistence
+        self._updateSchooldays(self._schooldays | self._dateBit(date))
 
     def remove(self, date):
         self._validate(date)
-        self._schooldays.remove(date)
-        self._schooldays = self._schooldays  # persistence
+        bit = self._dateBit(date)
+        if not self._schooldays & bit:
+            raise KeyError(date)
+        self._updateSchooldays(self._schooldays & ~bit)
 
     def addWeekdays(self, *weekdays):
-        for date in self:
-            if date.weekday() in weekdays:
-                self.add(date)
+        mask = self._rangeMask(self.first, self.last, weekdays)
+        self._updateSchooldays(self._schooldays | mask)
 
     def removeWeekdays(self, *weekdays):
-        for date in self:
-            if date.weekday() in weekdays and self.isSchoolday(date):
-                self.remove(date)
+        mask = self._rangeMask(self.first, self.last, weekdays)
+        self._updateSchooldays(self._schooldays & ~mask)
 
     def toggleWeekdays(self, *weekdays):
-        for date in self:
-            if date.weekday() in weekdays:
-                if self.isSchoolday(date):
-                    self.remove(date)
-                else:
-                    self.add(date)
+        mask = self._rangeMask(self.first, self.last, weekdays)
+        self._updateSchooldays(self._schooldays ^ mask)
+
+    def addDates(self, dates):
+        """Mark all days of the term within `dates` as schooldays."""
+        mask = self._rangeMask(max(self.first, dates.first),
+                               min(self.last, dates.last))
+        self._updateSchooldays(self._schooldays | mask)
+
+    def removeDates(self, dates):
+        """Mark all days of the term within `dates` as holidays."""
+        mask = self._rangeMask(max(self.first, dates.first),
+                               min(self.last, dates.last))
+        self._updateSchooldays(self._schooldays & ~mask)
 
     def reset(self, first, last):
         if last < first:
@@ -164,7 +233,9 @@ class Term(DateRange, contained.Contained, persistent.Persistent):
                              (last, first))
         self.first = first
         self.last = last
-        self._schooldays.clear()
+        self._schooldays_origin = first
+        self._schooldays = 0
+        self.schooldays_version += 1
 
 
 class TermContainer(btree.BTreeContainer):
@@ -40,6 +40,7 @@ from schooltool.term.term import getTermContainer
 from schooltool.term.interfaces import ITermContainer
 from schooltool.term import interfaces, term
 from schooltool.testing import setup
+from schooltool.common import DateRange
 
 
 class TermStub(Contained):
@@ -141,6 +142,47 @@ class TestTerm(unittest.TestCase):
             self.assert_(not cal.isSchoolday(date(2003, 9, day+1)))
             self.assert_(cal.isSchoolday(date(2003, 9, day+2)))
 
+    def testMarkWeekdayVersion(self):
+        cal = term.Term('Sample', date(2003, 9, 1), date(2003, 12, 24))
+        version = cal.schooldays_version
+        cal.addWeekdays(0, 1, 2, 3, 4)
+        self.assertEqual(cal.schooldays_version, version + 1)
+        cal.addWeekdays(0)
+        self.assertEqual(cal.schooldays_version, version + 1)
+        cal.toggleWeekdays(0, 6)
+        self.assertEqual(cal.schooldays_version, version + 2)
+        expected = [d for d in cal if d.weekday() in (1, 2, 3, 4, 6)]
+        self.assertEqual(list(cal.iterSchooldays()), expected)
+
+    def testDates(self):
+        cal = term.Term('Sample', date(2003, 9, 1), date(2003, 9, 30))
+        cal.addDates(DateRange(date(2003, 8, 25), date(2003, 9, 3)))
+        cal.addDates(DateRange(date(2003, 9, 20), date(2003, 10, 5)))
+        cal.removeDates(DateRange(date(2003, 9, 25), date(2003, 9, 26)))
+        self.assertEqual(
+            list(cal.iterSchooldays(DateRange(date(2003, 9, 2),
+                                              date(2003, 9, 21)))),
+            [date(2003, 9, 2), date(2003, 9, 3),
+             date(2003, 9, 20), date(2003, 9, 21)])
+        self.assertEqual(len(list(cal.iterSchooldays())), 12)
+        self.assertEqual(
+            list(cal.iterSchooldays(DateRange(date(2003, 10, 1),
+                                              date(2003, 10, 5)))),
+            [])
+
+    def testMoveFirst(self):
+        cal = term.Term('Sample', date(2003, 9, 10), date(2003, 9, 30))
+        cal.add(date(2003, 9, 10))
+        cal.add(date(2003, 9, 12))
+        cal.first = date(2003, 9, 1)
+        cal.add(date(2003, 9, 1))
+        self.assertEqual(list(cal.iterSchooldays()),
+                         [date(2003, 9, 1), date(2003, 9, 10),
+                          date(2003, 9, 12)])
+        cal.first = date(2003, 9, 11)
+        self.assertEqual(list(cal.iterSchooldays()), [date(2003, 9, 12)])
+        self.assertRaises(KeyError, cal.remove, date(2003, 9, 11))
+
     def test_contains(self):
         cal = term.Term('Sample', date(2003, 9, 1), date(2003, 9, 16))
         self.assert_(date(2003, 8, 31) not in cal)
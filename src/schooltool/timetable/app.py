@@ -31,7 +31,7 @@ from zope.intid.interfaces import IIntIds
 from schooltool.app.app import InitBase, StartUpBase
 from schooltool.app.interfaces import ISchoolToolApplication
 from schooltool.app.interfaces import IApplicationPreferences
-from schooltool.common import DateRange
+from schooltool.common import DateRange, IDateRange
 from schooltool.course.section import InstructorsCrowd, LearnersCrowd
 from schooltool.course.parent import ParentsOfLearnersCrowd
 from schooltool.course.interfaces import ISection
@@ -142,6 +142,11 @@ class UpdateSelectedPeriodsSchedules(ObjectEventAdapterSubscriber):
 
     def __call__(self):
         app = ISchoolToolApplication(None)
+        # Pass on the modified date range, if the timetable change has one.
+        dates = [d for d in self.event.descriptions
+                 if interfaces.IScheduleDates.providedBy(d)]
+        if len(dates) != len(self.event.descriptions):
+            dates = []
         # XXX: extremely nasty loop through all schedules.
         schedule_containers = app[SCHEDULES_KEY]
         for container in schedule_containers.values():
@@ -151,7 +156,7 @@ class UpdateSelectedPeriodsSchedules(ObjectEventAdapterSubscriber):
                     sameProxiedObjects(schedule.timetable, self.object)):
                     notify_container = True
             if notify_container:
-                zope.lifecycleevent.modified(container)
+                zope.lifecycleevent.modified(container, *dates)
 
 
 class RemoveRelatedSelectedPeriodsSchedules(ObjectEventAdapterSubscriber):
@@ -193,10 +198,22 @@ class SchooldaysForSchedule(object):
         return self.iterDates(dates)
 
     def iterDates(self, dates):
+        if IDateRange.providedBy(dates):
+            terms = sorted(self.schoolyear.values(),
+                           key=lambda term: term.first)
+            for term in terms:
+                for date in term.iterSchooldays(dates):
+                    yield date
+            return
         for date in dates:
             if date in self:
                 yield date
 
+    def cacheKey(self):
+        return tuple([(getattr(term, '_p_oid', None), term.first, term.last,
+                       term.schooldays_version)
+                      for term in self.schoolyear.values()])
+
 
 class SchooldaysForTimetable(SchooldaysForSchedule):
     adapts(interfaces.ITimetable)
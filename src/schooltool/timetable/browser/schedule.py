@@ -44,7 +44,7 @@ from schooltool.schoolyear.interfaces import ISchoolYear
 from schooltool.skin import flourish
 from schooltool.term.interfaces import ITerm
 from schooltool.term.term import getTermForDate
-from schooltool.timetable.schedule import MeetingException
+from schooltool.timetable.schedule import MeetingException, ScheduleDates
 from schooltool.timetable.interfaces import IHaveSchedule
 
 from schooltool.common import SchoolToolMessage as _
@@ -200,7 +200,7 @@ class SpecialDayView(BrowserView):
         # XXX: broken permissions with PersistentDict
         exceptions = removeSecurityProxy(self.schedule.exceptions)
         exceptions[self.date] = template
-        zope.lifecycleevent.modified(self.schedule)
+        zope.lifecycleevent.modified(self.schedule, ScheduleDates(self.date))
 
     def update(self):
         """Read and validate form data, and update model if necessary.
@@ -18,6 +18,7 @@
 """
 Synchronisation between timetables and calendars.
 """
+import datetime
 import pytz
 
 import zope.lifecycleevent.interfaces
@@ -74,9 +75,13 @@ class ImmutableScheduleCalendar(ImmutableCalendar):
     implements(interfaces.IImmutableScheduleCalendar)
 
     schedule = None
+    first = None
+    last = None
 
-    def __init__(self, schedule):
+    def __init__(self, schedule, first=None, last=None):
         self.schedule = schedule
+        self.first = first
+        self.last = last
         events = tuple(self.createEvents())
         super(ImmutableScheduleCalendar, self).__init__(events=events)
 
@@ -99,7 +104,16 @@ class ImmutableScheduleCalendar(ImmutableCalendar):
             schedule.last is None):
             return # Empty schedule
 
-        meetings = schedule.iterMeetings(schedule.first, schedule.last)
+        first = schedule.first
+        if self.first is not None:
+            first = max(first, self.first)
+        last = schedule.last
+        if self.last is not None:
+            last = min(last, self.last)
+        if first > last:
+            return # Requested dates are not scheduled
+
+        meetings = schedule.iterMeetings(first, last)
 
         for meeting in meetings:
             # We need to convert dtstart to UTC, because calendar
@@ -136,16 +150,45 @@ class ScheduleCalendar(Calendar):
                 changed = True
         return changed
 
-    def updateSchedule(self, schedule):
+    def iterScheduleEvents(self, schedule, first, last):
+        """Iterate events of the schedule that start on given dates.
+
+        Dates are in schedule's timezone.  Event unique ids start
+        with the UTC date of the meeting (see makeGUID), so events
+        that fall outside the date range are not even loaded.
+        """
+        tz = pytz.timezone(schedule.timezone)
+        lo = (first - datetime.timedelta(days=1)).isoformat()
+        hi = (last + datetime.timedelta(days=1)).isoformat()
+        for unique_id in list(self.events.keys()):
+            if not (lo <= unique_id[:10] <= hi):
+                continue
+            event = self.events[unique_id]
+            if event.schedule is not schedule:
+                continue
+            date = event.dtstart.astimezone(tz).date()
+            if first <= date <= last:
+                yield event
+
+    def updateSchedule(self, schedule, first=None, last=None):
         schedule = removeSecurityProxy(schedule)
-        schedule_cal = interfaces.IImmutableScheduleCalendar(schedule)
-        if schedule_cal is None:
-            self.removeSchedule(schedule)
-            return
-
-        old_events = dict(
-            [(e.unique_id, e) for e in removeSecurityProxy(self)
-              if e.schedule is schedule])
+        if first is None and last is None:
+            schedule_cal = interfaces.IImmutableScheduleCalendar(schedule)
+            if schedule_cal is None:
+                self.removeSchedule(schedule)
+                return
+            old_events = [e for e in removeSecurityProxy(self)
+                          if e.schedule is schedule]
+        else:
+            if first is None:
+                first = last
+            if last is None:
+                last = first
+            schedule_cal = ImmutableScheduleCalendar(
+                schedule, first=first, last=last)
+            old_events = list(self.iterScheduleEvents(schedule, first, last))
+
+        old_events = dict([(e.unique_id, e) for e in old_events])
 
         new_events = dict([(e.unique_id, e) for e in schedule_cal])
 
@@ -192,7 +235,22 @@ class UpdateScheduleCalendar(ObjectEventAdapterSubscriber):
         if container is None:
             return
 
-        calendar.updateSchedule(container)
+        first, last = self.getModifiedDates()
+        calendar.updateSchedule(container, first=first, last=last)
+
+    def getModifiedDates(self):
+        """Date range affected by the event, or (None, None) if unknown."""
+        if not zope.lifecycleevent.interfaces.IObjectModifiedEvent.providedBy(
+            self.event):
+            return None, None
+        descriptions = self.event.descriptions
+        if (not descriptions or
+            not all([interfaces.IScheduleDates.providedBy(d)
+                     for d in descriptions])):
+            return None, None
+        first = min([d.first for d in descriptions])
+        last = max([d.last for d in descriptions])
+        return first, last
 
 
 class RemoveScheduleCalendar(ObjectEventAdapterSubscriber):
@@ -20,6 +20,8 @@ Period and time slot schedule templates.
 Template scheduling over dates.
 """
 
+import array
+
 from persistent import Persistent
 from zope.interface import implements, implementer
 from zope.component import adapter
@@ -138,19 +140,41 @@ class SchoolDayTemplates(DayTemplateSchedule):
 
     starting_index = 0
 
+    def getSchooldayOrdinals(self, schedule, schooldays):
+        """Return numbers of schooldays between schedule.first and dates.
+
+        The n-th item is the number of schooldays in n days starting
+        from schedule.first.  Computed once and kept until schedule
+        dates or schooldays change.
+        """
+        key = (schedule.first, schedule.last, schooldays.cacheKey())
+        cached = getattr(self, '_v_schoolday_ordinals', None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        ordinals = array.array('l')
+        count = 0
+        for date in DateRange(schedule.first, schedule.last):
+            ordinals.append(count)
+            if date in schooldays:
+                count += 1
+        self._v_schoolday_ordinals = (key, ordinals)
+        return ordinals
+
     def getDayIndex(self, schedule, schooldays, date):
         assert self.templates
         day_index = self.starting_index
         if date == schedule.first:
             return day_index
 
-        if date > schedule.first:
+        if schedule.first < date <= schedule.last:
+            ordinals = self.getSchooldayOrdinals(schedule, schooldays)
+            skipped_schooldays = ordinals[(date - schedule.first).days]
+        elif date > schedule.first:
             skip_dates = DateRange(schedule.first, date - date.resolution)
+            skipped_schooldays = len(list(schooldays.iterDates(skip_dates)))
         else:
             skip_dates = DateRange(date + date.resolution, schedule.first)
-        skipped_schooldays = len(list(schooldays.iterDates(skip_dates)))
-        if date < schedule.first:
-            skipped_schooldays = -skipped_schooldays
+            skipped_schooldays = -len(list(schooldays.iterDates(skip_dates)))
 
         day_index = (day_index + skipped_schooldays) % len(self.templates)
         return day_index
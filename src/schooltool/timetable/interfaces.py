@@ -146,6 +146,22 @@ class IScheduleWithExceptions(ISchedule, IScheduleExceptions):
     """Schedule with exception days."""
 
 
+class IScheduleDates(Interface):
+    """Description of a schedule modification limited to a date range.
+
+    Passed along with IObjectModifiedEvent to tell subscribers that
+    meetings outside this range are unaffected by the change.
+    """
+
+    first = zope.schema.Date(
+        title=u"First affected date",
+        required=True)
+
+    last = zope.schema.Date(
+        title=u"Last affected date",
+        required=True)
+
+
 class IScheduleContainer(IContainer, IScheduleWithExceptions):
     """A container of schedules.
 
@@ -241,6 +257,9 @@ class ISchooldays(Interface):
     def __contains__(date):
         """Return whether the date is a schoolday."""
 
+    def cacheKey():
+        """Return a hashable value that changes whenever schooldays change."""
+
 
 class ISchoolDayTemplates(IDayTemplateSchedule):
     """Iterator that rotates on schooldays (as opposed to rotating on
@@ -345,8 +364,12 @@ class IImmutableScheduleCalendar(ICalendar):
 class IScheduleCalendar(ISchoolToolCalendar):
     """Persistent calendar of a schedule."""
 
-    def updateSchedule(schedule):
-        """Update calendar with events from this schedule."""
+    def updateSchedule(schedule, first=None, last=None):
+        """Update calendar with events from this schedule.
+
+        If first and last dates are given, only meetings and events
+        on those dates (in schedule's timezone) are synchronised.
+        """
 
     def removeSchedule(schedule):
         """Remove events generated by this schedule."""
@@ -114,6 +114,21 @@ class Schedule(Contained):
         return iter([])
 
 
+class ScheduleDates(object):
+    """Modification description of a date range in a schedule."""
+    implements(interfaces.IScheduleDates)
+
+    def __init__(self, first, last=None):
+        if last is None:
+            last = first
+        self.first = first
+        self.last = last
+
+    def __repr__(self):
+        return '<%s %s..%s>' % (
+            self.__class__.__name__, self.first, self.last)
+
+
 def date_timespan(date, tzinfo=pytz.UTC):
     starts = datetime.datetime.combine(date, datetime.time.min)
     starts = tzinfo.localize(starts)
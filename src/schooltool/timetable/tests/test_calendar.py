@@ -30,7 +30,11 @@ from zope.component import provideUtility, provideAdapter
 from test_schedule import ScheduleStub
 
 from schooltool.timetable.calendar import ImmutableScheduleCalendar
+from schooltool.timetable.calendar import ScheduleCalendar
+from schooltool.timetable.calendar import UpdateScheduleCalendar
 from schooltool.timetable.interfaces import IHaveSchedule
+from schooltool.timetable.interfaces import IImmutableScheduleCalendar
+from schooltool.timetable.schedule import Meeting, ScheduleDates
 
 
 class ImmutableScheduleCalendarForTest(ImmutableScheduleCalendar):
@@ -91,6 +95,118 @@ def test_ImmutableScheduleCalendar():
     """
 
 
+class PeriodStub(object):
+
+    def __init__(self, title):
+        self.title = title
+
+
+class IntIdsStub(object):
+
+    def __init__(self):
+        self.ids = {}
+
+    def getId(self, obj):
+        return self.ids.setdefault(id(obj), len(self.ids) + 1)
+
+
+class PeriodScheduleStub(ScheduleStub):
+
+    periods = (PeriodStub('A'), PeriodStub('B'), PeriodStub('C'))
+
+    def iterMeetings(self, start_date, until_date=None):
+        meetings = ScheduleStub.iterMeetings(self, start_date, until_date)
+        for n, meeting in enumerate(meetings):
+            yield meeting.clone(period=self.periods[n % len(self.periods)])
+
+
+def test_ScheduleCalendar_updateSchedule():
+    """Tests for ScheduleCalendar.updateSchedule.
+
+        >>> provideUtility(IntIdsStub(), IIntIds)
+        >>> provideAdapter(ImmutableScheduleCalendar,
+        ...                (PeriodScheduleStub, ), IImmutableScheduleCalendar)
+        >>> class Math(object):
+        ...     title = 'Math'
+        >>> provideAdapter(lambda s: Math(), (PeriodScheduleStub, ),
+        ...                IHaveSchedule)
+
+        >>> schedule = PeriodScheduleStub(timezone='Europe/Vilnius')
+        >>> calendar = ScheduleCalendar(None)
+
+    Full update fills the calendar with all events of the schedule.
+
+        >>> calendar.updateSchedule(schedule)
+        >>> len(calendar)
+        9
+
+    Let's shift meetings of one day.  Update limited to that day only
+    touches events on that day.
+
+        >>> schedule.meeting_times = (time(1, 0), time(5, 0), time(23, 0))
+
+        >>> calendar.updateSchedule(schedule,
+        ...     first=date(2011, 10, 30), last=date(2011, 10, 30))
+
+        >>> for event in sorted(calendar, key=lambda e: e.dtstart):
+        ...     local = event.dtstart.astimezone(pytz.timezone('Europe/Vilnius'))
+        ...     print local.strftime('%Y-%m-%d %H:%M'), event.period.title
+        2011-10-29 00:05 A
+        2011-10-29 05:00 B
+        2011-10-29 23:55 C
+        2011-10-30 01:00 A
+        2011-10-30 05:00 B
+        2011-10-30 23:00 C
+        2011-10-31 00:05 A
+        2011-10-31 05:00 B
+        2011-10-31 23:55 C
+
+    Events outside the requested dates are not even looked at.
+
+        >>> outside = [e for e in calendar
+        ...            if e.dtstart.date() < date(2011, 10, 29)]
+        >>> outside[0].schedule = None
+        >>> list(calendar.iterScheduleEvents(
+        ...     schedule, date(2011, 10, 30), date(2011, 10, 30)))
+        [<...ScheduleCalendarEvent object at ...>,
+         <...ScheduleCalendarEvent object at ...>,
+         <...ScheduleCalendarEvent object at ...>]
+
+    """
+
+
+def test_UpdateScheduleCalendar_getModifiedDates():
+    """Tests for UpdateScheduleCalendar.getModifiedDates.
+
+        >>> from zope.lifecycleevent import ObjectModifiedEvent
+        >>> from zope.lifecycleevent import ObjectCreatedEvent, Attributes
+
+        >>> def dates(event):
+        ...     return UpdateScheduleCalendar(event, None).getModifiedDates()
+
+    Modifications that carry the affected dates limit the update.
+
+        >>> dates(ObjectModifiedEvent(None,
+        ...     ScheduleDates(date(2011, 10, 30)),
+        ...     ScheduleDates(date(2011, 10, 10), date(2011, 10, 12))))
+        (datetime.date(2011, 10, 10), datetime.date(2011, 10, 30))
+
+    Anything else requests full update.
+
+        >>> dates(ObjectModifiedEvent(None))
+        (None, None)
+
+        >>> dates(ObjectModifiedEvent(None,
+        ...     ScheduleDates(date(2011, 10, 30)),
+        ...     Attributes(IHaveSchedule, 'title')))
+        (None, None)
+
+        >>> dates(ObjectCreatedEvent(None))
+        (None, None)
+
+    """
+
+
 def setUp(test=None):
     setup.placelessSetUp()
     provideUtility(object(), IIntIds)
@@ -33,6 +33,7 @@ from zope.container.contained import containedEvent
 from schooltool.common import DateRange
 from schooltool.timetable.daytemplates import DayTemplate
 from schooltool.timetable.daytemplates import DayTemplateSchedule
+from schooltool.timetable.daytemplates import SchoolDayTemplates
 from schooltool.timetable.daytemplates import TimeSlot
 from schooltool.timetable.schedule import Meeting
 from schooltool.timetable.schedule import Period
@@ -219,6 +220,73 @@ def test_Timetable_duplicate_time_slot():
     """
 
 
+def test_SchoolDayTemplates_getDayIndex():
+    """Tests for SchoolDayTemplates.getDayIndex.
+
+        >>> class SchooldaysStub(object):
+        ...     version = 0
+        ...     lookups = 0
+        ...     def __contains__(self, date):
+        ...         self.lookups += 1
+        ...         return date.weekday() < 5
+        ...     def iterDates(self, dates):
+        ...         return [date for date in dates if date in self]
+        ...     def cacheKey(self):
+        ...         return self.version
+
+        >>> schedule = ScheduleStub(first=date(2011, 9, 1),
+        ...                         last=date(2011, 12, 31))
+        >>> schooldays = SchooldaysStub()
+        >>> day_templates = SchoolDayTemplates()
+        >>> day_templates.templates = ['A', 'B', 'C']
+        >>> day_templates.starting_index = 1
+
+    Day index rotates on school days.
+
+        >>> for day in DateRange(date(2011, 9, 1), date(2011, 9, 7)):
+        ...     print day, day_templates.getDayIndex(schedule, schooldays, day)
+        2011-09-01 1
+        2011-09-02 2
+        2011-09-03 0
+        2011-09-04 0
+        2011-09-05 0
+        2011-09-06 1
+        2011-09-07 2
+
+    Schooldays are counted only once, further lookups are constant time.
+
+        >>> lookups = schooldays.lookups
+        >>> day_templates.getDayIndex(schedule, schooldays, date(2011, 12, 30))
+        0
+        >>> schooldays.lookups == lookups
+        True
+
+        >>> def count_index(day):
+        ...     skipped = len(schooldays.iterDates(
+        ...         DateRange(schedule.first, day - day.resolution)))
+        ...     return (day_templates.starting_index + skipped) % 3
+        >>> [day for day in DateRange(date(2011, 9, 2), schedule.last)
+        ...  if (day_templates.getDayIndex(schedule, schooldays, day) !=
+        ...      count_index(day))]
+        []
+
+    When schooldays change, they are counted again.
+
+        >>> schooldays.version += 1
+        >>> lookups = schooldays.lookups
+        >>> day_templates.getDayIndex(schedule, schooldays, date(2011, 12, 30))
+        0
+        >>> schooldays.lookups - lookups
+        122
+
+    Dates before the schedule starts are counted backwards.
+
+        >>> day_templates.getDayIndex(schedule, schooldays, date(2011, 8, 31))
+        0
+
+    """
+
+
 def setUp(test=None):
     setup.placelessSetUp()
     provideUtility(object(), IIntIds)